@@ -3,49 +3,46 @@
 """
 Common dependencies for API endpoints.
 """
-from typing import Generator, Optional
+from typing import AsyncGenerator, Optional
 from fastapi import Depends, HTTPException, status
+from fastapi.requests import HTTPConnection
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
-from sqlalchemy.orm import Session
-from ..db.base import SessionLocal
+from ..crud.shard import get_user_shard
+from ..crud.user import UserSnapshot, get_user_by_username, user_cache
+from ..db.base import AsyncDB, get_async_db, get_shard_count, shard_session
+from ..core.config import settings
+from ..core.events import EventBroker
+from ..core.profiling import span
 from ..core.security import verify_token
-from ..models.user import User
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
-def get_db() -> Generator:
-    """
-    Get database session.
-
-    Yields:
-        Session: Database session
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 async def get_current_user(
-        db: Session = Depends(get_db),
+        db: AsyncDB = Depends(get_async_db),
         token: str = Depends(oauth2_scheme)
-) -> User:
+) -> UserSnapshot:
     """
     Get current authenticated user.
 
+    Lookups are served from the in-process user cache when possible, so
+    most requests do not touch the database here. With several shards the
+    user's shard is looked up too; users being moved between shards are
+    refused and not cached, so their requests wait for the move.
+
     Args:
-        db (Session): Database session
+        db (AsyncDB): Database session
         token (str): JWT token from request
 
     Returns:
-        User: Current authenticated user
+        UserSnapshot: Current authenticated user
 
     Raises:
-        HTTPException: If credentials are invalid or user not found
+        HTTPException: If credentials are invalid or user not found, or
+            503 while the user is being moved to another shard or lives in
+            a shard that is not configured
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,14 +50,94 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = verify_token(token)
+        with span("jwt"):
+            payload = verify_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except InvalidTokenError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+    user = user_cache.get(username)
     if user is None:
-        raise credentials_exception
+        with span("user_lookup"):
+            db_user = await db.run_sync(get_user_by_username, username)
+        if db_user is None:
+            raise credentials_exception
+        shard = 0
+        if get_shard_count() > 1:
+            shard, moving = await db.run_sync(get_user_shard, db_user.id)
+            if shard >= get_shard_count():
+                # The map points at a shard removed from DB_SHARD_URLS
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="User data shard is not configured",
+                )
+            if moving:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="User data is being moved, please retry later",
+                    headers={"Retry-After": "1"},
+                )
+        user = UserSnapshot.from_user(db_user, shard)
+        user_cache.set(username, user)
     return user
+
+
+async def get_user_db(
+        current_user: UserSnapshot = Depends(get_current_user),
+        db: AsyncDB = Depends(get_async_db),
+) -> AsyncGenerator[AsyncDB, None]:
+    """
+    Get a database session on the shard holding the current user's tasks.
+
+    Users of shard 0 get the same session as get_async_db.
+
+    Args:
+        current_user (UserSnapshot): Authenticated user
+        db (AsyncDB): Session on the main database
+
+    Yields:
+        AsyncDB: Session for the user's task data
+    """
+    if current_user.shard == 0:
+        yield db
+    else:
+        async with shard_session(current_user.shard) as shard_db:
+            yield shard_db
+
+
+async def get_current_admin(
+        current_user: UserSnapshot = Depends(get_current_user),
+) -> UserSnapshot:
+    """
+    Get the current user, requiring them to be an administrator.
+
+    Args:
+        current_user (UserSnapshot): Authenticated user
+
+    Returns:
+        UserSnapshot: Current user, listed in ADMIN_USERNAMES
+
+    Raises:
+        HTTPException: If the user is not an administrator
+    """
+    if current_user.username not in settings.ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator privileges required",
+        )
+    return current_user
+
+
+def get_event_broker(connection: HTTPConnection) -> EventBroker:
+    """
+    Get the application's task event broker.
+
+    Args:
+        connection (HTTPConnection): Incoming request or WebSocket
+
+    Returns:
+        EventBroker: Broker set up by create_application
+    """
+    return connection.app.state.event_broker
@@ -0,0 +1,40 @@
+# app/api/endpoints/admin.py
+"""
+Administrative endpoints, restricted to the users in ADMIN_USERNAMES.
+"""
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.api.deps import get_current_admin
+from app.crud.user import UserSnapshot
+from app.db import base as db_base
+
+router = APIRouter()
+
+
+@router.get("/slow-queries")
+async def read_slow_queries(
+        current_user: UserSnapshot = Depends(get_current_admin),
+) -> List[dict]:
+    """
+    List the statements seen by the slow query log with their query plans.
+
+    Statements whose plan scans a whole table come first, then the rest by
+    total time spent in slow executions.
+
+    Args:
+        current_user: Authenticated administrator
+
+    Returns:
+        Statements with plan, scanned tables and slow execution stats
+
+    Raises:
+        HTTPException: If the slow query log is disabled
+    """
+    if db_base.slow_query_log is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Slow query log is disabled"
+        )
+    return db_base.slow_query_log.report()
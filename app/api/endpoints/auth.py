@@ -4,29 +4,65 @@ Authentication endpoints for user registration and login.
 """
 from datetime import timedelta
 from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 
+from app.api.deps import get_current_user
 from app.core.config import settings
-from app.core.security import create_access_token, get_password_hash, verify_password
-from app.db.base import get_db
-from app.models.user import User
-from app.schemas.user import UserCreate, User as UserSchema
+from app.core.ratelimit import check_username
+from app.core.security import create_access_token, hash_password_async, verify_and_update_async
+from app.crud.refresh_token import issue_refresh_token, rotate_refresh_token
+from app.crud.shard import create_shard_user, set_user_shard
+from app.crud.user import (
+    UserSnapshot,
+    change_password,
+    create_user,
+    get_user_by_username,
+    update_password_hash,
+)
+from app.db.base import AsyncDB, get_async_db, get_shard_count, place_user, shard_session
+from app.schemas.token import RefreshTokenRequest
+from app.schemas.user import PasswordChange, UserCreate, User as UserSchema
 
 router = APIRouter()
 
 
+def token_response(username: str, refresh_token: str) -> dict:
+    """
+    Build the token endpoint response for a user.
+
+    Args:
+        username: Subject of the access token
+        refresh_token: Refresh token to hand out
+
+    Returns:
+        Dict with access token, refresh token and token type
+    """
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": username}, expires_delta=access_token_expires
+    )
+
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+
 @router.post("/register", response_model=UserSchema)
-def register_user(
+async def register_user(
         *,
-        db: Session = Depends(get_db),
+        request: Request,
+        db: AsyncDB = Depends(get_async_db),
         user_in: UserCreate,
 ) -> Any:
     """
     Register a new user.
 
     Args:
+        request: Incoming request
         db: Database session
         user_in: User registration data
 
@@ -35,61 +71,160 @@ def register_user(
 
     Raises:
         HTTPException: If username already exists
+        RateLimitedError: If the username has no attempts left
     """
+    await check_username(request, user_in.username)
+
     # Check if user exists
-    user = db.query(User).filter(User.username == user_in.username).first()
+    user = await db.run_sync(get_user_by_username, user_in.username)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
 
-    # Create new user
-    user = User(
-        username=user_in.username,
-        hashed_password=get_password_hash(user_in.password)
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    # Create new user; bcrypt runs in the hashing process pool
+    hashed_password = await hash_password_async(user_in.password)
+    try:
+        user = await db.run_sync(create_user, user_in.username, hashed_password)
+    except IntegrityError:
+        # Registered concurrently, or missed by a stale username filter
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered"
+        )
+
+    if get_shard_count() > 1:
+        # Until the map row exists the user lives in shard 0, so a failure
+        # here leaves a working account
+        shard = place_user(user.id)
+        if shard != 0:
+            async with shard_session(shard) as shard_db:
+                await shard_db.run_sync(create_shard_user, user.id, user.username)
+            await db.run_sync(set_user_shard, user.id, shard)
 
     return user
 
 
 @router.post("/login")
-def login(
-        db: Session = Depends(get_db),
+async def login(
+        request: Request,
+        db: AsyncDB = Depends(get_async_db),
         form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login.
 
     Args:
+        request: Incoming request
         db: Database session
         form_data: Login credentials
 
     Returns:
-        Dict with access token and token type
+        Dict with access token, refresh token and token type
 
     Raises:
         HTTPException: If credentials are invalid
+        RateLimitedError: If the username has no attempts left
     """
+    await check_username(request, form_data.username)
+
     # Authenticate user
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.run_sync(get_user_by_username, form_data.username)
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await verify_and_update_async(
+            form_data.password, user.hashed_password
+        )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash is not None:
+        # Hashed with another scheme or cost than the current policy's
+        await db.run_sync(update_password_hash, user.id, user.hashed_password, new_hash)
 
-    # Create access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    refresh_token = await db.run_sync(issue_refresh_token, user.id)
 
-    return {
-        "access_token": access_token,
-        "token_type": "bearer"
-    } 
+    return token_response(user.username, refresh_token)
+
+
+@router.post("/token/refresh")
+async def refresh_access_token(
+        *,
+        db: AsyncDB = Depends(get_async_db),
+        token_in: RefreshTokenRequest,
+) -> Any:
+    """
+    Exchange a refresh token for a new access token and refresh token.
+
+    The presented refresh token is rotated and cannot be used again.
+
+    Args:
+        db: Database session
+        token_in: Refresh token
+
+    Returns:
+        Dict with access token, refresh token and token type
+
+    Raises:
+        HTTPException: If the refresh token is unknown, expired or reused
+    """
+    rotated = await db.run_sync(rotate_refresh_token, token_in.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    username, refresh_token = rotated
+
+    return token_response(username, refresh_token)
+
+
+@router.post("/password", status_code=status.HTTP_204_NO_CONTENT)
+async def change_user_password(
+        *,
+        request: Request,
+        db: AsyncDB = Depends(get_async_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        password_in: PasswordChange,
+) -> Response:
+    """
+    Change the current user's password.
+
+    Every refresh token of the user is revoked, so other sessions must log
+    in again once their access token expires.
+
+    Args:
+        request: Incoming request
+        db: Database session
+        current_user: Authenticated user
+        password_in: Current and new password
+
+    Returns:
+        Empty 204 response
+
+    Raises:
+        HTTPException: If the current password is wrong
+        RateLimitedError: If the username has no attempts left
+    """
+    await check_username(request, current_user.username)
+
+    user = await db.run_sync(get_user_by_username, current_user.username)
+    verified = False
+    if user:
+        verified, _ = await verify_and_update_async(
+            password_in.current_password, user.hashed_password
+        )
+    if not verified:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Incorrect password"
+        )
+
+    new_hash = await hash_password_async(password_in.new_password)
+    await db.run_sync(change_password, user.id, new_hash)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,23 @@
+# app/api/endpoints/debug.py
+"""
+Debugging endpoints, only mounted when request profiling is enabled.
+"""
+from typing import List
+
+from fastapi import APIRouter, Request
+
+router = APIRouter()
+
+
+@router.get("/slow-requests")
+async def read_slow_requests(request: Request) -> List[dict]:
+    """
+    List the slowest requests profiled since startup, slowest first.
+
+    Args:
+        request: Incoming request, used to reach the application state
+
+    Returns:
+        Requests with their method, path, status, total time and spans
+    """
+    return request.app.state.slow_requests.snapshot()
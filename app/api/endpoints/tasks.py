@@ -1 +1,828 @@
- 
+# app/api/endpoints/tasks.py
+"""
+Task management endpoints for the authenticated user.
+"""
+import asyncio
+import hashlib
+from typing import Any, List, Literal, Optional
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.api.deps import get_current_user, get_event_broker, get_user_db
+from app.core.config import settings
+from app.core.etag import etag_matches, make_etag
+from app.core.events import EventBroker, sse_stream, websocket_stream
+from app.core.responses import RowsJSONResponse
+from app.core.task_io import (
+    EXPORT_ENCODERS,
+    EXPORT_MEDIA_TYPES,
+    ImportFormatError,
+    TaskImportParser,
+)
+from app.crud import task as crud_task
+from app.crud.user import UserSnapshot, get_tasks_version
+from app.db.base import AsyncDB, get_async_db
+from app.db.search import build_match_query
+from app.models.task import Task
+from app.schemas.task import (
+    TaskBulkResult,
+    TaskBulkUpdate,
+    TaskChanges,
+    TaskCreate,
+    TaskImportResult,
+    TaskSearchResult,
+    TaskStats,
+    TaskUpdate,
+    Task as TaskSchema,
+)
+
+router = APIRouter()
+
+# Response header carrying the keyset cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Response header carrying the offset of the next page of search results
+NEXT_OFFSET_HEADER = "X-Next-Offset"
+
+
+async def get_user_task(db: AsyncDB, task_id: int, user: UserSnapshot) -> Task:
+    """
+    Load a single task owned by the given user.
+
+    Args:
+        db: Database session
+        task_id: Task primary key
+        user: Owner of the task
+
+    Returns:
+        Task owned by the user
+
+    Raises:
+        HTTPException: If the task does not exist or belongs to another user
+    """
+    task = await db.run_sync(crud_task.get_user_task, task_id, user.id)
+    if task is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    return task
+
+
+def task_etag(task: Task) -> str:
+    """
+    Build the ETag of a single task from its id and row version.
+
+    Args:
+        task: Task to tag
+
+    Returns:
+        Quoted entity tag
+    """
+    return make_etag(task.id, task.version)
+
+
+def check_if_match(if_match: Optional[str], task: Task) -> None:
+    """
+    Enforce an If-Match precondition against the task's current ETag.
+
+    Args:
+        if_match: If-Match header value, if sent
+        task: Task the request modifies
+
+    Raises:
+        HTTPException: If the task no longer matches any listed tag
+    """
+    if if_match is not None and not etag_matches(if_match, task_etag(task), weak=False):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Task has been modified"
+        )
+
+
+def task_event(event_type: str, task: Any) -> dict:
+    """
+    Build a task change event.
+
+    Args:
+        event_type: "task.created" or "task.updated"
+        task: Task model or row mapping
+
+    Returns:
+        Event with the serialized task
+    """
+    schema = TaskSchema.from_orm(task) if isinstance(task, Task) else TaskSchema.parse_obj(task)
+    return {"type": event_type, "task": schema.dict()}
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Build an empty 304 response carrying the given ETag.
+
+    Args:
+        etag: Current entity tag
+
+    Returns:
+        304 Not Modified response
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def check_bulk_size(items: list) -> None:
+    """
+    Reject bulk requests larger than the configured maximum.
+
+    Args:
+        items: Items of the bulk request
+
+    Raises:
+        HTTPException: If there are too many items
+    """
+    if len(items) > settings.TASKS_MAX_BULK_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Bulk requests are limited to {settings.TASKS_MAX_BULK_SIZE} items"
+        )
+
+
+@router.get("", response_model=List[TaskSchema])
+async def read_tasks(
+        response: Response,
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        completed: Optional[bool] = None,
+        description_prefix: Optional[str] = Query(None, min_length=1),
+        after_id: Optional[int] = Query(None, ge=0),
+        limit: int = Query(
+            settings.TASKS_DEFAULT_PAGE_SIZE, ge=1, le=settings.TASKS_MAX_PAGE_SIZE
+        ),
+        if_none_match: Optional[str] = Header(None),
+) -> Any:
+    """
+    List the current user's tasks, one keyset page at a time.
+
+    Tasks are ordered by id. When more tasks follow, the id to pass as
+    ``after_id`` for the next page is returned in the ``X-Next-Cursor`` header.
+
+    The ETag is derived from the user's task collection version and the
+    query parameters, so a matching ``If-None-Match`` is answered with 304
+    without loading any task.
+
+    With ``TASKS_FAST_JSON`` the page is read as Core rows and encoded with
+    orjson, bypassing ``response_model`` validation.
+
+    Args:
+        response: Outgoing response, used to set the cursor and ETag headers
+        db: Database session
+        current_user: Authenticated user
+        completed: Only return tasks with this completion status
+        description_prefix: Only return tasks whose description starts with this
+        after_id: Only return tasks with an id greater than this cursor
+        limit: Maximum number of tasks to return
+        if_none_match: ETags the client already holds
+
+    Returns:
+        List of tasks, or an empty 304 response
+    """
+    # Read the version first: a change racing with the page load then yields
+    # a stale tag, which only costs the client one extra full response
+    version = await db.run_sync(get_tasks_version, current_user.id)
+    query_key = hashlib.sha256(
+        repr((completed, description_prefix, after_id, limit)).encode()
+    ).hexdigest()[:16]
+    etag = make_etag(current_user.id, version, query_key)
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    # Fetch one extra row to learn whether another page exists
+    tasks = await db.run_sync(
+        crud_task.list_task_rows if settings.TASKS_FAST_JSON else crud_task.list_tasks,
+        current_user.id,
+        completed=completed,
+        description_prefix=description_prefix,
+        after_id=after_id,
+        limit=limit + 1,
+    )
+    headers = {"ETag": etag}
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        headers[NEXT_CURSOR_HEADER] = str(tasks[-1].id)
+
+    if settings.TASKS_FAST_JSON:
+        return RowsJSONResponse(tasks, crud_task.TASK_ROW_FIELDS, headers=headers)
+    response.headers.update(headers)
+    return tasks
+
+
+@router.post("", response_model=TaskSchema)
+async def create_task(
+        *,
+        response: Response,
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        broker: EventBroker = Depends(get_event_broker),
+        task_in: TaskCreate,
+) -> Any:
+    """
+    Create a new task for the current user.
+
+    Args:
+        response: Outgoing response, used to set the ETag header
+        db: Database session
+        current_user: Authenticated user
+        broker: Broker notified of the change
+        task_in: Task creation data
+
+    Returns:
+        Newly created task
+    """
+    task = await db.run_sync(
+        crud_task.create_task, current_user.id, task_in.description
+    )
+    await broker.publish(current_user.id, task_event("task.created", task))
+    response.headers["ETag"] = task_etag(task)
+    return task
+
+
+@router.post("/bulk", response_model=List[TaskBulkResult])
+async def create_tasks_bulk(
+        *,
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        broker: EventBroker = Depends(get_event_broker),
+        tasks_in: List[TaskCreate],
+) -> Any:
+    """
+    Create many tasks for the current user in a single transaction.
+
+    Args:
+        db: Database session
+        current_user: Authenticated user
+        broker: Broker notified of the change
+        tasks_in: Tasks to create
+
+    Returns:
+        One result per input item, in input order
+    """
+    check_bulk_size(tasks_in)
+    rows = await db.run_sync(
+        crud_task.create_tasks_bulk,
+        current_user.id,
+        [task_in.description for task_in in tasks_in],
+    )
+    if rows:
+        # One event per call: a bulk call may exceed a subscriber's queue
+        await broker.publish(
+            current_user.id, {"type": "tasks.bulk_created", "ids": [row["id"] for row in rows]}
+        )
+
+    return [{"id": row["id"], "status": "created", "task": row} for row in rows]
+
+
+@router.patch("/bulk", response_model=List[TaskBulkResult])
+async def update_tasks_bulk(
+        *,
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        broker: EventBroker = Depends(get_event_broker),
+        tasks_in: List[TaskBulkUpdate],
+) -> Any:
+    """
+    Update many tasks of the current user in a single transaction.
+
+    Args:
+        db: Database session
+        current_user: Authenticated user
+        broker: Broker notified of the change
+        tasks_in: Task ids with the fields to update
+
+    Returns:
+        One result per input item, in input order
+    """
+    check_bulk_size(tasks_in)
+    rows = await db.run_sync(
+        crud_task.update_tasks_bulk,
+        current_user.id,
+        [
+            (task_in.id, task_in.dict(exclude={"id"}, exclude_none=True))
+            for task_in in tasks_in
+        ],
+    )
+    if rows:
+        await broker.publish(current_user.id, {"type": "tasks.bulk_updated", "ids": list(rows)})
+
+    return [
+        {"id": task_in.id, "status": "updated", "task": rows[task_in.id]}
+        if task_in.id in rows else {"id": task_in.id, "status": "not_found"}
+        for task_in in tasks_in
+    ]
+
+
+@router.delete("/bulk", response_model=List[TaskBulkResult])
+async def delete_tasks_bulk(
+        *,
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        broker: EventBroker = Depends(get_event_broker),
+        task_ids: List[int] = Body(...),
+) -> Any:
+    """
+    Delete many tasks of the current user in a single transaction.
+
+    Args:
+        db: Database session
+        current_user: Authenticated user
+        broker: Broker notified of the change
+        task_ids: Ids of the tasks to delete
+
+    Returns:
+        One result per input id, in input order
+    """
+    check_bulk_size(task_ids)
+    deleted_ids = await db.run_sync(
+        crud_task.delete_tasks_bulk, current_user.id, task_ids
+    )
+    if deleted_ids:
+        await broker.publish(
+            current_user.id, {"type": "tasks.bulk_deleted", "ids": sorted(deleted_ids)}
+        )
+
+    return [
+        {"id": task_id, "status": "deleted" if task_id in deleted_ids else "not_found"}
+        for task_id in task_ids
+    ]
+
+
+@router.get("/changes", response_model=TaskChanges)
+async def read_task_changes(
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        since: int = Query(0, ge=0),
+        limit: int = Query(
+            settings.TASKS_DEFAULT_PAGE_SIZE, ge=1, le=settings.TASKS_MAX_PAGE_SIZE
+        ),
+) -> Any:
+    """
+    Get the current user's task changes after a sync cursor.
+
+    Start with ``since=0`` and pass the returned ``cursor`` next time; keep
+    going while ``has_more`` is true. Each task appears at most once, with
+    its latest state, or as deleted. The work done is proportional to the
+    number of changes, not to the number of tasks.
+
+    Args:
+        db: Database session
+        current_user: Authenticated user
+        since: Cursor returned by the previous sync, 0 for a full sync
+        limit: Maximum number of changes to return
+
+    Returns:
+        Page of changes in change order and the cursor to continue from
+
+    Raises:
+        HTTPException: 410 if deletions after the cursor were already
+            compacted away; the client must sync again from 0
+    """
+    if since > 0 and since < await db.run_sync(crud_task.get_compacted_seq):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync cursor has expired, sync again from 0"
+        )
+
+    # Fetch one extra row to learn whether another page exists
+    rows = await db.run_sync(crud_task.list_changes, current_user.id, since, limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "changes": [
+            {
+                "change_seq": row["change_seq"],
+                "id": row["id"],
+                "deleted": bool(row["deleted"]),
+                "task": None if row["deleted"] else row,
+            }
+            for row in rows
+        ],
+        "cursor": rows[-1]["change_seq"] if rows else since,
+        "has_more": has_more,
+    }
+
+
+@router.get("/stats", response_model=TaskStats)
+async def read_task_stats(
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+) -> Any:
+    """
+    Get the current user's total, completed and pending task counts.
+
+    Counts come from a summary row maintained on every task change, so
+    this costs the same however many tasks the user has.
+
+    Args:
+        db: Database session
+        current_user: Authenticated user
+
+    Returns:
+        Task counters
+    """
+    return await db.run_sync(crud_task.get_task_stats, current_user.id)
+
+
+@router.get("/search", response_model=List[TaskSearchResult])
+async def search_tasks(
+        response: Response,
+        q: str = Query(..., min_length=1, max_length=200),
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        offset: int = Query(0, ge=0, le=settings.TASKS_SEARCH_MAX_OFFSET),
+        limit: int = Query(
+            settings.TASKS_DEFAULT_PAGE_SIZE, ge=1, le=settings.TASKS_MAX_PAGE_SIZE
+        ),
+) -> Any:
+    """
+    Full-text search over the current user's task descriptions.
+
+    Every word of ``q`` must occur in a matching task; a word ending in
+    ``*`` matches as a prefix. Results are ranked by relevance and carry a
+    snippet with the matched words wrapped in ``<mark>`` tags. When more
+    results follow, the offset of the next page is returned in the
+    ``X-Next-Offset`` header.
+
+    Args:
+        response: Outgoing response, used to set the next offset header
+        q: Search words
+        db: Database session
+        current_user: Authenticated user
+        offset: Number of results to skip
+        limit: Maximum number of results to return
+
+    Returns:
+        List of matching tasks, best match first
+
+    Raises:
+        HTTPException: If the query contains no searchable words
+    """
+    match = build_match_query(q)
+    if match is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query contains no words"
+        )
+
+    # Fetch one extra row to learn whether another page exists
+    rows = await db.run_sync(
+        crud_task.search_tasks, current_user.id, match, offset=offset, limit=limit + 1
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_OFFSET_HEADER] = str(offset + limit)
+
+    return rows
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_tasks(
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+) -> StreamingResponse:
+    """
+    Download all of the current user's tasks as NDJSON or CSV.
+
+    Rows are streamed from a server-side cursor in batches of
+    TASKS_EXPORT_BATCH_SIZE, so memory use does not grow with the number
+    of tasks.
+
+    Args:
+        db: Database session
+        current_user: Authenticated user
+        export_format: Either "ndjson" or "csv"
+
+    Returns:
+        Streaming response with the encoded tasks
+    """
+    batch_size = settings.TASKS_EXPORT_BATCH_SIZE
+    result = await db.stream(
+        crud_task.export_tasks_statement(current_user.id, batch_size)
+    )
+
+    return StreamingResponse(
+        EXPORT_ENCODERS[export_format](result.partitions(batch_size)),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="tasks.{export_format}"'
+        },
+    )
+
+
+@router.post("/import", response_model=TaskImportResult)
+async def import_tasks(
+        request: Request,
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        broker: EventBroker = Depends(get_event_broker),
+        import_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+        import_key: Optional[str] = Query(None, min_length=1, max_length=200),
+) -> Any:
+    """
+    Import tasks from a streamed NDJSON or CSV request body.
+
+    Each line is validated on its own: invalid lines are reported and
+    skipped, valid ones are inserted in transactions of
+    TASKS_IMPORT_BATCH_SIZE rows. NDJSON lines are objects with a
+    ``description`` and an optional ``completed``; CSV bodies start with a
+    header naming those columns (others, such as ``id``, are ignored), so
+    both export formats can be imported back.
+
+    With an ``import_key``, every batch also records the last line it
+    covers. Sending the same body again with the same key resumes after
+    that line.
+
+    Args:
+        request: Incoming request, read as a stream
+        db: Database session
+        current_user: Authenticated user
+        broker: Broker notified of the change
+        import_format: Either "ndjson" or "csv"
+        import_key: Client-chosen key making the import resumable
+
+    Returns:
+        Counts of imported and rejected lines, the checkpoint reached and
+        the first TASKS_IMPORT_MAX_ERRORS line errors
+
+    Raises:
+        HTTPException: If the body cannot be parsed any further; batches
+            committed before that point are kept
+    """
+    resumed_from = 0
+    if import_key is not None:
+        resumed_from = await db.run_sync(
+            crud_task.get_import_checkpoint, current_user.id, import_key
+        )
+    parser = TaskImportParser(
+        import_format, settings.TASKS_IMPORT_MAX_LINE_LENGTH, skip_until=resumed_from
+    )
+
+    batch: List[dict] = []
+    errors: List[dict] = []
+    imported = failed = 0
+    checkpoint = committed = resumed_from
+
+    async def insert_batch(rows: List[dict], line: int) -> None:
+        nonlocal imported, committed
+        await db.run_sync(
+            crud_task.import_tasks_batch, current_user.id, rows, import_key, line
+        )
+        imported += len(rows)
+        committed = line
+
+    # A full batch is inserted in the background while the next one is
+    # parsed. At most one insert is in flight, so the session is never used
+    # concurrently.
+    inserting: Optional[asyncio.Future] = None
+    format_error: Optional[ImportFormatError] = None
+    try:
+        async for parsed in parser.parse(request.stream()):
+            if parsed.error is None:
+                batch.append(parsed.values)
+            else:
+                failed += 1
+                if len(errors) < settings.TASKS_IMPORT_MAX_ERRORS:
+                    errors.append({"line": parsed.line, "error": parsed.error})
+            checkpoint = parsed.line
+            if len(batch) >= settings.TASKS_IMPORT_BATCH_SIZE:
+                if inserting is not None:
+                    await inserting
+                inserting = asyncio.ensure_future(insert_batch(batch, checkpoint))
+                batch = []
+    except ImportFormatError as e:
+        format_error = e
+    finally:
+        if inserting is not None:
+            await inserting
+    if format_error is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{format_error} (imported through line {committed})"
+        )
+
+    if batch or (import_key is not None and checkpoint > committed):
+        await insert_batch(batch, checkpoint)
+    # One summary event rather than one per row; clients reload their tasks
+    if imported:
+        await broker.publish(current_user.id, {"type": "tasks.imported", "count": imported})
+
+    return {
+        "imported": imported,
+        "failed": failed,
+        "resumed_from": resumed_from,
+        "checkpoint": checkpoint,
+        "errors": errors,
+    }
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def stream_task_events(
+        db: AsyncDB = Depends(get_async_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        broker: EventBroker = Depends(get_event_broker),
+) -> StreamingResponse:
+    """
+    Stream the current user's task changes as Server-Sent Events.
+
+    Events are ``task.created`` / ``task.updated`` (with the task),
+    ``task.deleted`` (with its id), ``tasks.bulk_created`` /
+    ``tasks.bulk_updated`` / ``tasks.bulk_deleted`` (with the ids) and
+    ``tasks.imported`` (with a count).
+    A client too slow to keep up gets an ``overflow`` event and the stream
+    ends; it should reload its tasks and reconnect.
+
+    Args:
+        db: Database session, released before streaming starts
+        current_user: Authenticated user
+        broker: Broker to subscribe to
+
+    Returns:
+        Open-ended ``text/event-stream`` response
+    """
+    # The stream may stay open for hours; don't hold a pooled connection
+    await db.close()
+    subscription = broker.subscribe(current_user.id)
+
+    return StreamingResponse(
+        sse_stream(
+            broker, current_user.id, subscription, settings.EVENTS_HEARTBEAT_SECONDS
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/events")
+async def task_events_websocket(
+        websocket: WebSocket,
+        token: Optional[str] = Query(None),
+        db: AsyncDB = Depends(get_async_db),
+        broker: EventBroker = Depends(get_event_broker),
+) -> None:
+    """
+    Send the current user's task changes over a WebSocket.
+
+    Carries the same events as the SSE stream, as JSON messages. Browsers
+    cannot set headers on WebSockets, so the access token may be passed as
+    the ``token`` query parameter instead of a bearer Authorization header.
+    Invalid credentials close the connection with code 1008.
+
+    Args:
+        websocket: Incoming connection
+        token: Access token, if not sent in the Authorization header
+        db: Database session, released once the user is authenticated
+        broker: Broker to subscribe to
+    """
+    if token is None:
+        scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer":
+            token = None
+    try:
+        if not token:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        current_user = await get_current_user(db, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    finally:
+        await db.close()
+
+    await websocket.accept()
+    subscription = broker.subscribe(current_user.id)
+    await websocket_stream(
+        websocket, broker, current_user.id, subscription, settings.EVENTS_HEARTBEAT_SECONDS
+    )
+
+
+@router.get("/{task_id}", response_model=TaskSchema)
+async def read_task(
+        task_id: int,
+        response: Response,
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        if_none_match: Optional[str] = Header(None),
+) -> Any:
+    """
+    Get a single task of the current user.
+
+    Args:
+        task_id: Task id
+        response: Outgoing response, used to set the ETag header
+        db: Database session
+        current_user: Authenticated user
+        if_none_match: ETags the client already holds
+
+    Returns:
+        Requested task, or an empty 304 response
+
+    Raises:
+        HTTPException: If the task is not found
+    """
+    task = await get_user_task(db, task_id, current_user)
+    etag = task_etag(task)
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return task
+
+
+@router.put("/{task_id}", response_model=TaskSchema)
+async def update_task(
+        *,
+        task_id: int,
+        response: Response,
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        broker: EventBroker = Depends(get_event_broker),
+        task_in: TaskUpdate,
+        if_match: Optional[str] = Header(None),
+) -> Any:
+    """
+    Update a task of the current user.
+
+    Args:
+        task_id: Task id
+        response: Outgoing response, used to set the ETag header
+        db: Database session
+        current_user: Authenticated user
+        broker: Broker notified of the change
+        task_in: Fields to update
+        if_match: Only update if the task still has one of these ETags
+
+    Returns:
+        Updated task
+
+    Raises:
+        HTTPException: If the task is not found or was modified concurrently
+    """
+    task = await get_user_task(db, task_id, current_user)
+    check_if_match(if_match, task)
+    try:
+        task = await db.run_sync(
+            crud_task.update_task, task, task_in.dict(exclude_none=True)
+        )
+    except StaleDataError:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Task has been modified"
+        )
+    await broker.publish(current_user.id, task_event("task.updated", task))
+    response.headers["ETag"] = task_etag(task)
+    return task
+
+
+@router.delete("/{task_id}")
+async def delete_task(
+        task_id: int,
+        db: AsyncDB = Depends(get_user_db),
+        current_user: UserSnapshot = Depends(get_current_user),
+        broker: EventBroker = Depends(get_event_broker),
+        if_match: Optional[str] = Header(None),
+) -> Any:
+    """
+    Delete a task of the current user.
+
+    Args:
+        task_id: Task id
+        db: Database session
+        current_user: Authenticated user
+        broker: Broker notified of the change
+        if_match: Only delete if the task still has one of these ETags
+
+    Returns:
+        Dict with a confirmation message
+
+    Raises:
+        HTTPException: If the task is not found or was modified concurrently
+    """
+    task = await get_user_task(db, task_id, current_user)
+    check_if_match(if_match, task)
+    try:
+        await db.run_sync(crud_task.delete_task, task)
+    except StaleDataError:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Task has been modified"
+        )
+    await broker.publish(current_user.id, {"type": "task.deleted", "id": task_id})
+
+    return {"message": "Task deleted successfully"}
@@ -0,0 +1,63 @@
+# app/core/bloom.py
+"""
+Bloom filter for set membership tests that never miss a member.
+"""
+import hashlib
+import math
+import threading
+from typing import Iterator
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings.
+
+    ``item in filter`` is False only for items never added; it may be True
+    for items that were not added, with a probability close to
+    ``error_rate`` while no more than ``capacity`` items are added.
+
+    Attributes:
+        capacity (int): Items the filter is sized for
+        error_rate (float): False positive probability at capacity
+        size (int): Number of bits
+        hashes (int): Bits set per item
+        count (int): Items added so far
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        # Setting a bit is a read-modify-write of its byte
+        self._lock = threading.Lock()
+
+    def _positions(self, item: str) -> Iterator[int]:
+        """Bit positions of an item, by double hashing one 128-bit digest."""
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        """
+        Add an item.
+
+        Args:
+            item (str): Item to add
+        """
+        positions = list(self._positions(item))
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] >> (position & 7) & 1 for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
@@ -4,7 +4,7 @@ Application configuration module.
 Contains settings and configuration variables for the application.
 """
 from pydantic import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 import os
 from dotenv import load_dotenv
 
@@ -22,9 +22,114 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Verified token payloads kept in memory (0 disables the cache)
+    TOKEN_CACHE_SIZE: int = 10000
+
+    # Password hashing pool settings
+    # Worker processes for bcrypt (None: one per CPU, 0: use the threadpool)
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    # Hash/verify calls allowed in flight before answering 503
+    PASSWORD_HASH_QUEUE_LIMIT: int = 64
+    # Seconds sent in Retry-After when the hashing queue is full
+    PASSWORD_HASH_RETRY_AFTER: int = 1
+    # passlib schemes: the first hashes new passwords, the others are only
+    # verified and get rehashed on login
+    PASSWORD_SCHEMES: List[str] = ["bcrypt"]
+    # Cost per scheme (log2 rounds for bcrypt); hashes with another cost are
+    # rehashed on login. Pick values with benchmarks/bench_hashing.py
+    PASSWORD_ROUNDS: Dict[str, int] = {"bcrypt": 12}
+
+    # Token bucket limits on login and registration attempts: each allows
+    # bursts of ATTEMPTS and refills ATTEMPTS per PERIOD_SECONDS
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_IP_ATTEMPTS: int = 30
+    RATE_LIMIT_IP_PERIOD_SECONDS: float = 60.0
+    RATE_LIMIT_USERNAME_ATTEMPTS: int = 10
+    RATE_LIMIT_USERNAME_PERIOD_SECONDS: float = 60.0
+    # Buckets kept in memory, spread over shards with their own locks
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_SHARDS: int = 16
+
+    # Authenticated user lookup cache (size 0 disables it)
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+
+    # Bloom filter of registered usernames, loaded at startup: lookups of
+    # usernames it has never seen skip the database. Sized for at least
+    # CAPACITY users, or twice the users at startup
+    USERNAME_FILTER_ENABLED: bool = True
+    USERNAME_FILTER_CAPACITY: int = 100000
+    USERNAME_FILTER_ERROR_RATE: float = 0.01
+    # How often a filter miss may query users added by other worker processes
+    USERNAME_FILTER_SYNC_SECONDS: float = 5.0
+    # Usernames recently looked up and not found (size 0 disables the cache)
+    USERNAME_NEGATIVE_CACHE_SIZE: int = 10000
+    USERNAME_NEGATIVE_CACHE_TTL_SECONDS: float = 5.0
+
+    # Users allowed to call the /admin endpoints
+    ADMIN_USERNAMES: List[str] = []
 
     # Database settings
     SQLITE_URL: str = "sqlite:///./sql_app.db"
+    # SQLite tuning profile from app.db.sqlite.SQLITE_PROFILES; its pool
+    # sizes take precedence over DB_POOL_SIZE / DB_MAX_OVERFLOW
+    DB_PROFILE: str = "default"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Extra shard databases for users' tasks (see app.db.shards); the main
+    # database SQLITE_URL is shard 0
+    DB_SHARD_URLS: List[str] = []
+    # Serve requests from an aiosqlite engine instead of the threadpool
+    DB_ASYNC: bool = False
+    # Slow query log with query plan capture (see app.db.slow_queries)
+    SLOW_QUERY_LOG_ENABLED: bool = False
+    # Executions slower than this are logged
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    # Distinct statements whose plans and timings are kept in memory
+    SLOW_QUERY_MAX_STATEMENTS: int = 500
+    # JSON lines file read by `python -m app.db.slow_queries` (None: memory only)
+    SLOW_QUERY_LOG_PATH: Optional[str] = None
+
+    @property
+    def SQLITE_ASYNC_URL(self) -> str:
+        """SQLITE_URL rewritten for the aiosqlite driver."""
+        return self.SQLITE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+    # Task endpoint settings
+    TASKS_DEFAULT_PAGE_SIZE: int = 100
+    TASKS_MAX_PAGE_SIZE: int = 1000
+    TASKS_MAX_BULK_SIZE: int = 1000
+    # Encode task lists from Core rows with orjson, skipping response_model
+    # validation of rows that were already validated on write
+    TASKS_FAST_JSON: bool = False
+    # Rows fetched per round trip while streaming an export
+    TASKS_EXPORT_BATCH_SIZE: int = 1000
+    # Valid rows inserted (and checkpointed) per import transaction
+    TASKS_IMPORT_BATCH_SIZE: int = 5000
+    # Longest accepted import line in characters; bounds the parser's buffer
+    TASKS_IMPORT_MAX_LINE_LENGTH: int = 65536
+    # Line errors listed in an import result (the rest are only counted)
+    TASKS_IMPORT_MAX_ERRORS: int = 100
+    # Deepest page reachable through search offsets
+    TASKS_SEARCH_MAX_OFFSET: int = 10000
+    # Days deleted tasks stay visible to delta sync (GET /tasks/changes)
+    TASKS_TOMBSTONE_RETENTION_DAYS: int = 30
+
+    # Prometheus metrics served at /metrics
+    METRICS_ENABLED: bool = True
+
+    # Request profiling (Server-Timing headers and the slow request log at
+    # /debug/slow-requests); adds a little overhead to every request
+    PROFILING_ENABLED: bool = False
+    # Slowest requests kept by the slow request log
+    PROFILING_SLOW_REQUESTS: int = 50
+
+    # Task event stream settings
+    # Events buffered per subscriber before it is dropped as too slow
+    EVENTS_QUEUE_SIZE: int = 256
+    # Idle seconds between heartbeats on event streams
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
 
     class Config:
         case_sensitive = True
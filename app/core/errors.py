@@ -1 +1,45 @@
- 
+# app/core/errors.py
+"""
+Application exceptions and their HTTP exception handlers.
+"""
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.ratelimit import RateLimitedError, rate_limited_response
+
+
+class HashingBusyError(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+async def hashing_busy_handler(request: Request, exc: HashingBusyError) -> JSONResponse:
+    """
+    Turn a saturated hashing queue into a 503 asking the client to retry.
+
+    Args:
+        request (Request): Incoming request
+        exc (HashingBusyError): Raised exception
+
+    Returns:
+        JSONResponse: 503 response with a Retry-After header
+    """
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry later"},
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+
+async def rate_limited_handler(request: Request, exc: RateLimitedError) -> JSONResponse:
+    """
+    Turn a rejected attempt into a 429 telling the client when to retry.
+
+    Args:
+        request (Request): Incoming request
+        exc (RateLimitedError): Raised exception
+
+    Returns:
+        JSONResponse: 429 response with Retry-After and X-RateLimit-* headers
+    """
+    return rate_limited_response(exc.result)
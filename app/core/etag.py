@@ -0,0 +1,44 @@
+# app/core/etag.py
+"""
+Helpers for building and comparing HTTP entity tags.
+"""
+from typing import Any
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a strong ETag from the values identifying a representation.
+
+    Args:
+        *parts: Values that together change whenever the representation does
+
+    Returns:
+        str: Quoted entity tag
+    """
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(header: str, etag: str, weak: bool = True) -> bool:
+    """
+    Check an If-None-Match / If-Match header value against an ETag.
+
+    Args:
+        header (str): Header value, a comma separated list of tags or "*"
+        etag (str): Current strong ETag of the resource
+        weak (bool): Use weak comparison (If-None-Match); strong comparison
+            (If-Match) never matches W/ tags
+
+    Returns:
+        bool: True if any listed tag matches
+    """
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,211 @@
+# app/core/events.py
+"""
+Task change events and the pub/sub broker fanning them out to subscribers.
+
+The application holds one EventBroker on ``app.state.event_broker``.
+InProcessBroker only reaches subscribers connected to the same worker
+process; multi-worker deployments plug in an implementation backed by a
+shared channel through ``create_application(event_broker=...)``.
+"""
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Optional, Set
+
+from starlette.websockets import WebSocket
+
+# Sent once to a subscriber that fell too far behind; it must resync
+OVERFLOW_EVENT = {"type": "overflow"}
+
+
+class Subscription:
+    """
+    Bounded queue of events for one connected client.
+
+    A subscriber that does not keep up is never waited for: when its queue
+    is full it is dropped, and after draining what was queued it receives
+    OVERFLOW_EVENT instead of silently missing events.
+    """
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, event: dict) -> bool:
+        """
+        Queue an event without waiting.
+
+        Args:
+            event (dict): Event to deliver
+
+        Returns:
+            bool: False if the queue was full and the subscription overflowed
+        """
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+        return True
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """
+        Wait for the next event.
+
+        Args:
+            timeout (float): Seconds to wait before giving up
+
+        Returns:
+            Optional[dict]: Next event, or None if none arrived in time
+        """
+        if self.overflowed and self.queue.empty():
+            return OVERFLOW_EVENT
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker(ABC):
+    """Pub/sub of task events, partitioned by user."""
+
+    @abstractmethod
+    async def publish(self, user_id: int, event: dict) -> None:
+        """
+        Deliver an event to every current subscriber of a user.
+
+        Args:
+            user_id (int): User whose tasks changed
+            event (dict): JSON-serializable event
+        """
+
+    @abstractmethod
+    def subscribe(self, user_id: int) -> Subscription:
+        """
+        Start receiving a user's events.
+
+        Args:
+            user_id (int): User to follow
+
+        Returns:
+            Subscription: Queue the events are delivered to
+        """
+
+    @abstractmethod
+    def unsubscribe(self, user_id: int, subscription: Subscription) -> None:
+        """
+        Stop delivering events to a subscription.
+
+        Args:
+            user_id (int): User the subscription follows
+            subscription (Subscription): Subscription to remove
+        """
+
+
+class InProcessBroker(EventBroker):
+    """Broker delivering events to subscribers of the current process."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+
+    async def publish(self, user_id: int, event: dict) -> None:
+        for subscription in list(self._subscribers.get(user_id, ())):
+            if not subscription.put(event):
+                self.unsubscribe(user_id, subscription)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id: int, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[user_id]
+
+    def subscriber_count(self, user_id: int) -> int:
+        """Number of live subscriptions of a user."""
+        return len(self._subscribers.get(user_id, ()))
+
+
+async def sse_stream(
+        broker: EventBroker, user_id: int, subscription: Subscription, heartbeat: float
+) -> AsyncIterator[bytes]:
+    """
+    Encode a subscription as a Server-Sent Events stream.
+
+    A comment line is sent after ``heartbeat`` idle seconds, which keeps
+    proxies from closing the connection and surfaces dead clients. The
+    stream ends after an overflow; the subscription is removed however the
+    stream ends, including on client disconnect.
+
+    Args:
+        broker (EventBroker): Broker the subscription belongs to
+        user_id (int): User the subscription follows
+        subscription (Subscription): Subscription to stream
+        heartbeat (float): Idle seconds between heartbeats
+
+    Yields:
+        bytes: SSE messages
+    """
+    try:
+        while True:
+            event = await subscription.get(heartbeat)
+            if event is None:
+                yield b": ping\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+            if event is OVERFLOW_EVENT:
+                break
+    finally:
+        broker.unsubscribe(user_id, subscription)
+
+
+async def websocket_stream(
+        websocket: WebSocket,
+        broker: EventBroker,
+        user_id: int,
+        subscription: Subscription,
+        heartbeat: float,
+) -> None:
+    """
+    Send a subscription's events over an accepted WebSocket as JSON.
+
+    A ``{"type": "ping"}`` message is sent after ``heartbeat`` idle
+    seconds. Messages from the client are ignored; the loop ends when the
+    client disconnects or after an overflow, and the subscription is
+    removed either way.
+
+    Args:
+        websocket (WebSocket): Accepted connection
+        broker (EventBroker): Broker the subscription belongs to
+        user_id (int): User the subscription follows
+        subscription (Subscription): Subscription to stream
+        heartbeat (float): Idle seconds between heartbeats
+    """
+    receiving = asyncio.ensure_future(websocket.receive())
+    try:
+        while True:
+            getting = asyncio.ensure_future(subscription.get(heartbeat))
+            done, _ = await asyncio.wait(
+                {receiving, getting}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if getting not in done:
+                getting.cancel()
+                if receiving.result()["type"] == "websocket.disconnect":
+                    break
+                receiving = asyncio.ensure_future(websocket.receive())
+                continue
+
+            event = getting.result()
+            await websocket.send_json({"type": "ping"} if event is None else event)
+            if event is OVERFLOW_EVENT:
+                await websocket.close()
+                break
+    finally:
+        receiving.cancel()
+        broker.unsubscribe(user_id, subscription)
@@ -0,0 +1,170 @@
+# app/core/hashing.py
+"""
+Password hashing policy shared by the application and the User model.
+
+The policy is a list of passlib schemes, the first one used for new hashes
+and the others only accepted for verification, plus a cost per scheme
+(``rounds``). Hashes made with another scheme or cost are flagged by
+verify_and_update so login can rehash them in place; changing
+PASSWORD_SCHEMES or PASSWORD_ROUNDS therefore migrates users as they log in.
+
+Hashing pool workers import this module to run these functions, so it
+depends on nothing but passlib, which is itself only imported when the
+first password is hashed or verified. That keeps both application import
+and worker spawn fast. Workers get the policy from the parent through
+warm_up rather than by loading the application settings.
+"""
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.lazy import Lazy
+
+# Policy set by configure; None means read it from the settings
+_policy: Optional[Tuple[List[str], Dict[str, int]]] = None
+
+
+def hash_policy() -> Tuple[List[str], Dict[str, int]]:
+    """
+    Get the hashing policy in effect.
+
+    Returns:
+        Tuple[List[str], Dict[str, int]]: Schemes, preferred first, and the
+        rounds of each scheme that has a configured cost
+    """
+    if _policy is not None:
+        return _policy
+    from app.core.config import settings
+
+    return list(settings.PASSWORD_SCHEMES), dict(settings.PASSWORD_ROUNDS)
+
+
+def configure(schemes: List[str], rounds: Dict[str, int]) -> None:
+    """
+    Set the hashing policy, replacing the settings for this process.
+
+    Args:
+        schemes (List[str]): passlib scheme names, the preferred one first
+        rounds (Dict[str, int]): Cost per scheme
+    """
+    global _policy
+    _policy = (list(schemes), dict(rounds))
+    _pwd_context.reset()
+
+
+def context_options(schemes: List[str], rounds: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Build CryptContext keyword arguments for a policy.
+
+    A scheme's rounds are both its default and the only accepted cost, so a
+    hash with fewer or more rounds needs an update.
+
+    Args:
+        schemes (List[str]): passlib scheme names, the preferred one first
+        rounds (Dict[str, int]): Cost per scheme
+
+    Returns:
+        Dict[str, Any]: Options for passlib's CryptContext
+    """
+    options: Dict[str, Any] = {"schemes": schemes, "deprecated": "auto"}
+    for scheme, cost in rounds.items():
+        if scheme in schemes:
+            for option in ("default_rounds", "min_rounds", "max_rounds"):
+                options[f"{scheme}__{option}"] = cost
+    return options
+
+
+def _build_pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(**context_options(*hash_policy()))
+
+
+# The single CryptContext of the process
+_pwd_context = Lazy("crypt_context", _build_pwd_context)
+
+
+def get_pwd_context():
+    """
+    Get the process-wide CryptContext, creating it on first use.
+
+    Returns:
+        CryptContext: Password hashing context
+    """
+    return _pwd_context.get()
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password against its hash.
+
+    Args:
+        plain_password (str): Password to verify
+        hashed_password (str): Hashed password to compare against
+
+    Returns:
+        bool: True if password matches, False otherwise
+    """
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def get_password_hash(password: str) -> str:
+    """
+    Hash a password.
+
+    Args:
+        password (str): Password to hash
+
+    Returns:
+        str: Hashed password
+    """
+    return get_pwd_context().hash(password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if its hash does not follow the policy.
+
+    Args:
+        plain_password (str): Password to verify
+        hashed_password (str): Hashed password to compare against
+
+    Returns:
+        Tuple[bool, Optional[str]]: Whether the password matches, and a
+        replacement hash when it matches but used another scheme or cost
+    """
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+def needs_update(hashed_password: str) -> bool:
+    """
+    Check whether a hash was made with another scheme or cost than the policy's.
+
+    Args:
+        hashed_password (str): Stored password hash
+
+    Returns:
+        bool: True if the hash should be replaced on next login
+    """
+    return get_pwd_context().needs_update(hashed_password)
+
+
+def timed_call(fn: Callable[..., Any], *args: Any) -> Tuple[float, float, Any]:
+    """Run fn in a hashing worker; return its wall clock start, duration and result."""
+    start = time.time()
+    result = fn(*args)
+    return start, time.time() - start, result
+
+
+def warm_up(policy: Optional[Tuple[List[str], Dict[str, int]]] = None) -> None:
+    """
+    Import passlib and load the preferred scheme's backend ahead of the first request.
+
+    Args:
+        policy: Schemes and rounds to use in this process, as returned by
+            hash_policy in the parent; None keeps the current policy
+    """
+    if policy is not None:
+        configure(*policy)
+    handler = get_pwd_context().handler()
+    if hasattr(handler, "get_backend"):
+        handler.get_backend()
@@ -0,0 +1,50 @@
+# app/core/lazy.py
+"""
+Lazily created, process-wide singletons.
+"""
+import threading
+import time
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Seconds each singleton took to create, for the startup report
+init_timings: Dict[str, float] = {}
+
+
+class Lazy(Generic[T]):
+    """
+    Value built by a factory on first use, exactly once even across threads.
+
+    Attributes:
+        name (str): Name the creation time is reported under
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._created = False
+        self._lock = threading.Lock()
+
+    @property
+    def created(self) -> bool:
+        """Whether the value has been built."""
+        return self._created
+
+    def get(self) -> T:
+        """Return the value, building it on the first call."""
+        if not self._created:
+            with self._lock:
+                if not self._created:
+                    start = time.perf_counter()
+                    self._value = self._factory()
+                    init_timings[self.name] = time.perf_counter() - start
+                    self._created = True
+        return self._value
+
+    def reset(self) -> None:
+        """Forget the value, so the next get builds a new one."""
+        with self._lock:
+            self._value = None
+            self._created = False
@@ -0,0 +1,350 @@
+# app/core/metrics.py
+"""
+Application metrics in the Prometheus text exposition format.
+
+Gauges and histograms are updated on the request path under a
+per-metric lock, which costs a few microseconds per request. Values that
+already live elsewhere (pool occupancy, cache counters) are read by
+collectors only when ``/metrics`` is scraped.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Sequence, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import TTLCache
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans cache hits (sub-millisecond) up to bcrypt under load
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+class MetricFamily(NamedTuple):
+    """Samples of one metric, ready to be rendered."""
+    name: str
+    kind: str
+    documentation: str
+    samples: List[Tuple[str, Dict[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base of metrics holding one value (or histogram) per label set."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def _labels(self, values: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    def clear(self) -> None:
+        """Reset every label set."""
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(_Metric):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            cell = self._values.setdefault(labels, [0])
+            cell[0] += amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            items = [(values, cell[0]) for values, cell in self._values.items()]
+        return MetricFamily(self.name, self.kind, self.documentation, [
+            (self.name, self._labels(values), value) for values, value in items
+        ])
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Record one observation.
+
+        Args:
+            value (float): Observed value, in seconds for durations
+            *labels (str): Label values in labelnames order
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            cell = self._values.get(labels)
+            if cell is None:
+                # Per-bucket (non-cumulative) counts, +Inf bucket, sum
+                cell = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            cell[0][index] += 1
+            cell[1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observe the duration of the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            items = [(values, list(cell[0]), cell[1]) for values, cell in self._values.items()]
+        samples = []
+        for values, counts, total in items:
+            labels = self._labels(values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((
+                    self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+                ))
+            samples.append((self.name + "_sum", labels, total))
+            samples.append((self.name + "_count", labels, cumulative))
+        return MetricFamily(self.name, self.kind, self.documentation, samples)
+
+
+class MetricsRegistry:
+    """Metrics and scrape-time collectors rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[MetricFamily]]] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric; returns it so definitions can be one-liners."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, key: str, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """
+        Add (or replace) a function called on every scrape.
+
+        Args:
+            key (str): Identifies the collector, so registering again replaces it
+            collector (Callable): Returns the metric families to expose
+        """
+        self._collectors[key] = collector
+
+    def collect(self) -> List[MetricFamily]:
+        families = [metric.collect() for metric in self._metrics.values()]
+        for collector in list(self._collectors.values()):
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        lines = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for name, labels, value in family.samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"),
+))
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", ("method",),
+))
+DB_POOL_WAIT = REGISTRY.register(Histogram(
+    "db_pool_wait_seconds", "Time requests waited for a database connection slot",
+))
+DB_CONNECTION_HELD = REGISTRY.register(Histogram(
+    "db_connection_held_seconds", "Time connections stayed checked out of the pool",
+    ("engine",),
+))
+PASSWORD_HASH_QUEUE = REGISTRY.register(Histogram(
+    "password_hash_queue_seconds", "Time bcrypt calls waited for a free worker",
+))
+PASSWORD_HASH_DURATION = REGISTRY.register(Histogram(
+    "password_hash_duration_seconds", "Time bcrypt calls spent hashing",
+))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request.
+
+    Requests are labelled with the matched route's path template, so
+    ``/tasks/1`` and ``/tasks/2`` share ``/api/v1/tasks/{task_id}`` and
+    label cardinality stays bounded; unmatched paths share ``unmatched``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec(method)
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method,
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            )
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    connection_record.info["metrics_checkout"] = time.perf_counter()
+
+
+def instrument_pool(engine: Engine, label: str) -> None:
+    """
+    Time how long connections of an engine stay checked out.
+
+    Args:
+        engine (Engine): Sync engine (``async_engine.sync_engine`` for aiosqlite)
+        label (str): Value of the ``engine`` label
+    """
+    def on_checkin(dbapi_connection, connection_record) -> None:
+        start = connection_record.info.pop("metrics_checkout", None)
+        if start is not None:
+            DB_CONNECTION_HELD.observe(time.perf_counter() - start, label)
+
+    if not event.contains(engine, "checkout", _on_checkout):
+        event.listen(engine, "checkout", _on_checkout)
+        event.listen(engine, "checkin", on_checkin)
+
+
+def pool_families(engines: Dict[str, Tuple[Engine, int]]) -> List[MetricFamily]:
+    """
+    Read the current occupancy of connection pools.
+
+    Args:
+        engines (Dict[str, Tuple[Engine, int]]): Engine and its pool capacity
+            (pool size plus max overflow) by label
+
+    Returns:
+        List[MetricFamily]: Checked out connections, capacity and utilization
+    """
+    checked_out, capacity, utilization = [], [], []
+    for label, (engine, size) in engines.items():
+        labels = {"engine": label}
+        in_use = engine.pool.checkedout()
+        checked_out.append(("db_pool_checked_out", labels, in_use))
+        capacity.append(("db_pool_capacity", labels, size))
+        utilization.append(("db_pool_utilization", labels, in_use / size if size else 0.0))
+    return [
+        MetricFamily("db_pool_checked_out", "gauge", "Connections currently checked out", checked_out),
+        MetricFamily("db_pool_capacity", "gauge", "Pool size plus max overflow", capacity),
+        MetricFamily(
+            "db_pool_utilization", "gauge", "Checked out connections over capacity", utilization
+        ),
+    ]
+
+
+def cache_families(caches: Dict[str, TTLCache]) -> List[MetricFamily]:
+    """
+    Read the counters of in-process caches.
+
+    Args:
+        caches (Dict[str, TTLCache]): Caches by ``cache`` label
+
+    Returns:
+        List[MetricFamily]: Hits, misses, hit ratio and size per cache
+    """
+    hits, misses, ratios, sizes = [], [], [], []
+    for label, cache in caches.items():
+        labels = {"cache": label}
+        stats = cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hits.append(("cache_hits_total", labels, stats["hits"]))
+        misses.append(("cache_misses_total", labels, stats["misses"]))
+        ratios.append(("cache_hit_ratio", labels, stats["hits"] / lookups if lookups else 0.0))
+        sizes.append(("cache_size", labels, stats["size"]))
+    return [
+        MetricFamily("cache_hits_total", "counter", "Lookups answered from the cache", hits),
+        MetricFamily("cache_misses_total", "counter", "Lookups that found nothing usable", misses),
+        MetricFamily("cache_hit_ratio", "gauge", "Hits over lookups since startup", ratios),
+        MetricFamily("cache_size", "gauge", "Entries currently cached", sizes),
+    ]
+
+
+def install_metrics(app: FastAPI, registry: MetricsRegistry = REGISTRY) -> None:
+    """
+    Time every request of an application and serve ``GET /metrics``.
+
+    Args:
+        app (FastAPI): Application to instrument
+        registry (MetricsRegistry): Registry rendered by the endpoint
+    """
+    @app.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+    app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,295 @@
+# app/core/profiling.py
+"""
+Opt-in per-request timing breakdown.
+
+ProfilingMiddleware gives every HTTP request a RequestProfile held in a
+context variable. Code on the request path adds named spans to it with
+``span`` (bcrypt, JWT, pool wait, ...), SQLAlchemy engine events add the
+time spent executing SQL, and wrapped endpoint functions mark where the
+handler starts and ends. The breakdown is sent back in a ``Server-Timing``
+header and the slowest requests are kept in a SlowRequestLog.
+
+Without the middleware no profile is ever set, so ``span`` only costs one
+context variable lookup.
+"""
+import asyncio
+import functools
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar(
+    "request_profile", default=None
+)
+
+
+class RequestProfile:
+    """
+    Timing breakdown of one request.
+
+    Attributes:
+        method (str): HTTP method
+        path (str): Request path without the query string
+        spans (Dict[str, List[float]]): Seconds and call count per span name
+        handler_start (Optional[float]): perf_counter when the endpoint started
+        handler_end (Optional[float]): perf_counter when the endpoint returned
+    """
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}
+        self.handler_start: Optional[float] = None
+        self.handler_end: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        """
+        Add time to a span, counting the call.
+
+        Args:
+            name (str): Span name, e.g. "sql"
+            seconds (float): Time spent
+        """
+        totals = self.spans.get(name)
+        if totals is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            totals[0] += seconds
+            totals[1] += 1
+
+    def breakdown(self, now: float) -> List[Tuple[str, float, int]]:
+        """
+        List every span, including the stages derived from the handler marks.
+
+        ``deps`` is the time before the endpoint started (body parsing and
+        dependencies), ``encode`` the time from its return to ``now``
+        (response validation and rendering) and ``total`` the time since the
+        request arrived.
+
+        Args:
+            now (float): perf_counter at which the breakdown is taken
+
+        Returns:
+            List[Tuple[str, float, int]]: (name, seconds, count) entries
+        """
+        stages = []
+        if self.handler_start is not None:
+            stages.append(("deps", self.handler_start - self.start, 1))
+            if self.handler_end is not None:
+                stages.append(("handler", self.handler_end - self.handler_start, 1))
+                stages.append(("encode", now - self.handler_end, 1))
+        spans = [(name, seconds, int(count)) for name, (seconds, count) in self.spans.items()]
+        return stages + spans + [("total", now - self.start, 1)]
+
+
+def server_timing(breakdown: List[Tuple[str, float, int]]) -> str:
+    """
+    Format a breakdown as a Server-Timing header value.
+
+    Args:
+        breakdown (List[Tuple[str, float, int]]): Entries of RequestProfile.breakdown
+
+    Returns:
+        str: e.g. ``deps;dur=1.2, sql;dur=0.8;desc="3 calls", total;dur=4.0``
+    """
+    entries = []
+    for name, seconds, count in breakdown:
+        entry = f"{name};dur={seconds * 1000:.2f}"
+        if count > 1:
+            entry += f';desc="{count} calls"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time the enclosed block into the current request's profile, if any.
+
+    Args:
+        name (str): Span name
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+
+class SlowRequestLog:
+    """
+    Thread-safe bounded log keeping only the slowest requests seen.
+
+    Attributes:
+        maxsize (int): Number of requests kept
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # Min-heap on duration, so the fastest kept request is evicted first
+        self._heap: List[Tuple[float, int, dict]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, entry: dict) -> None:
+        """
+        Keep a request if it is among the slowest seen.
+
+        Args:
+            seconds (float): Request duration
+            entry (dict): Details reported for the request
+        """
+        if self.maxsize <= 0:
+            return
+        item = (seconds, next(self._counter), entry)
+        with self._lock:
+            if len(self._heap) < self.maxsize:
+                heapq.heappush(self._heap, item)
+            elif seconds > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+
+    def snapshot(self) -> List[dict]:
+        """Return the kept requests, slowest first."""
+        with self._lock:
+            items = sorted(self._heap, reverse=True)
+        return [entry for _, _, entry in items]
+
+    def clear(self) -> None:
+        """Forget every kept request."""
+        with self._lock:
+            self._heap.clear()
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling every HTTP request.
+
+    The Server-Timing header is added when the response starts, so for
+    streaming responses it covers the time up to the first byte; the slow
+    request log records the full duration.
+    """
+
+    def __init__(self, app: ASGIApp, slow_log: SlowRequestLog):
+        self.app = app
+        self.slow_log = slow_log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(
+                    profile.breakdown(time.perf_counter())
+                ))
+            await send(message)
+
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            breakdown = profile.breakdown(time.perf_counter())
+            total = breakdown[-1][1]
+            self.slow_log.record(total, {
+                "method": profile.method,
+                "path": profile.path,
+                "status_code": status_code,
+                "timestamp": time.time(),
+                "total_ms": round(total * 1000, 2),
+                "spans": {
+                    name: {"ms": round(seconds * 1000, 2), "count": count}
+                    for name, seconds, count in breakdown[:-1]
+                },
+            })
+
+
+def _profiled_endpoint(call: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap an endpoint function so it marks the handler stage of the profile."""
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def profiled(*args: Any, **kwargs: Any) -> Any:
+            profile = _current_profile.get()
+            if profile is None:
+                return await call(*args, **kwargs)
+            profile.handler_start = time.perf_counter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                profile.handler_end = time.perf_counter()
+    else:
+        @functools.wraps(call)
+        def profiled(*args: Any, **kwargs: Any) -> Any:
+            profile = _current_profile.get()
+            if profile is None:
+                return call(*args, **kwargs)
+            profile.handler_start = time.perf_counter()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                profile.handler_end = time.perf_counter()
+    return profiled
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current_profile.get() is not None:
+        context._profiling_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current_profile.get()
+    start = getattr(context, "_profiling_start", None)
+    if profile is not None and start is not None:
+        profile.add("sql", time.perf_counter() - start)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Count SQL execution time into the current request's profile.
+
+    Args:
+        engine (Engine): Sync engine (``async_engine.sync_engine`` for aiosqlite)
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def install_profiling(app: FastAPI, slow_log: SlowRequestLog) -> None:
+    """
+    Profile every request of an application.
+
+    Call after all routers are included, so every endpoint gets wrapped.
+    SQL time is only measured on engines passed to instrument_engine.
+
+    Args:
+        app (FastAPI): Application to profile
+        slow_log (SlowRequestLog): Log of the slowest requests
+    """
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            route.dependant.call = _profiled_endpoint(route.dependant.call)
+    app.add_middleware(ProfilingMiddleware, slow_log=slow_log)
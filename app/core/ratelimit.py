@@ -0,0 +1,273 @@
+# app/core/ratelimit.py
+"""
+Token bucket rate limiting for the authentication endpoints.
+
+Every login or registration attempt takes a token from the bucket of the
+client IP and from the bucket of the username. A bucket holds up to
+``attempts`` tokens and refills at ``attempts`` per ``period_seconds``, so
+bursts are allowed while the sustained rate is capped. Both checks are a
+single O(1) bucket update and run before any password hashing or database
+work: the IP check in RateLimitMiddleware before the request body is read,
+the username check at the top of the endpoint.
+
+Buckets live in a RateLimitStore. MemoryRateLimitStore keeps them in this
+process only; multi-worker deployments plug in an implementation backed by
+a shared store (e.g. Redis) through ``create_application(rate_limit_store=...)``.
+"""
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Iterable, List, NamedTuple
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+
+class RateLimit(NamedTuple):
+    """
+    Capacity and refill rate of a token bucket.
+
+    Attributes:
+        attempts (int): Bucket capacity, also refilled once per period
+        period_seconds (float): Time to refill an empty bucket
+    """
+    attempts: int
+    period_seconds: float
+
+
+class RateLimitResult(NamedTuple):
+    """
+    Outcome of taking a token from a bucket.
+
+    Attributes:
+        allowed (bool): Whether a token was available
+        limit (int): Bucket capacity
+        remaining (int): Whole tokens left after this attempt
+        retry_after (float): Seconds until the next token, 0 when allowed
+        reset (float): Seconds until the bucket is full again
+    """
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+    reset: float
+
+
+class RateLimitedError(Exception):
+    """Raised when a rate limit rejects an attempt."""
+
+    def __init__(self, result: RateLimitResult):
+        super().__init__("Too many attempts")
+        self.result = result
+
+
+class RateLimitStore(ABC):
+    """Storage of token buckets, keyed by what is limited (e.g. "ip:1.2.3.4")."""
+
+    @abstractmethod
+    async def take(self, key: str, limit: RateLimit) -> RateLimitResult:
+        """
+        Atomically refill a bucket for the time elapsed and take one token.
+
+        Args:
+            key (str): Bucket key
+            limit (RateLimit): Capacity and refill rate of the bucket
+
+        Returns:
+            RateLimitResult: Whether the attempt is allowed, with header values
+        """
+
+    @abstractmethod
+    async def reset(self, key: str) -> None:
+        """
+        Refill a bucket completely.
+
+        Args:
+            key (str): Bucket key
+        """
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    In-process bucket store sharded by key hash to keep lock contention low.
+
+    A bucket idle long enough to refill completely is equivalent to a
+    missing one, so each bucket expires then and is evicted lazily while
+    taking tokens from the same shard. Each shard is also bounded, dropping
+    the least recently used buckets first, so a flood of distinct keys
+    cannot grow memory without limit.
+
+    Attributes:
+        max_keys_per_shard (int): Buckets kept per shard
+    """
+
+    def __init__(
+            self,
+            shards: int = 16,
+            max_keys: int = 100000,
+            timer: Callable[[], float] = time.monotonic,
+    ):
+        self.max_keys_per_shard = max(1, max_keys // shards)
+        self._timer = timer
+        # Per shard: key -> [tokens, updated, expires], least recently used first
+        self._shards: List["OrderedDict[str, List[float]]"] = [
+            OrderedDict() for _ in range(shards)
+        ]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def _shard(self, key: str) -> int:
+        return hash(key) % len(self._shards)
+
+    async def take(self, key: str, limit: RateLimit) -> RateLimitResult:
+        rate = limit.attempts / limit.period_seconds
+        index = self._shard(key)
+        buckets = self._shards[index]
+        with self._locks[index]:
+            now = self._timer()
+            bucket = buckets.get(key)
+            if bucket is None:
+                tokens = float(limit.attempts)
+            else:
+                tokens = min(limit.attempts, bucket[0] + (now - bucket[1]) * rate)
+                buckets.move_to_end(key)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            reset = (limit.attempts - tokens) / rate
+            buckets[key] = [tokens, now, now + reset]
+            self._evict(buckets, now)
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit.attempts,
+            remaining=int(tokens),
+            retry_after=0.0 if allowed else (1 - tokens) / rate,
+            reset=reset,
+        )
+
+    def _evict(self, buckets: "OrderedDict[str, List[float]]", now: float) -> None:
+        """Drop expired buckets from the front of a shard, then any over its bound."""
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if bucket[2] > now and len(buckets) <= self.max_keys_per_shard:
+                break
+            del buckets[key]
+
+    async def reset(self, key: str) -> None:
+        index = self._shard(key)
+        with self._locks[index]:
+            self._shards[index].pop(key, None)
+
+    def clear(self) -> None:
+        """Forget every bucket."""
+        for lock, buckets in zip(self._locks, self._shards):
+            with lock:
+                buckets.clear()
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for buckets in self._shards)
+
+
+def ip_limit() -> RateLimit:
+    """Attempts allowed per client IP, from the settings."""
+    return RateLimit(settings.RATE_LIMIT_IP_ATTEMPTS, settings.RATE_LIMIT_IP_PERIOD_SECONDS)
+
+
+def username_limit() -> RateLimit:
+    """Attempts allowed per username, from the settings."""
+    return RateLimit(
+        settings.RATE_LIMIT_USERNAME_ATTEMPTS, settings.RATE_LIMIT_USERNAME_PERIOD_SECONDS
+    )
+
+
+async def check_username(request: Request, username: str) -> None:
+    """
+    Take an attempt from a username's bucket.
+
+    Args:
+        request (Request): Incoming request, whose application holds the store
+        username (str): Username the attempt is for
+
+    Raises:
+        RateLimitedError: If the username has no attempts left
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    store: RateLimitStore = request.app.state.rate_limit_store
+    result = await store.take(f"user:{username}", username_limit())
+    if not result.allowed:
+        raise RateLimitedError(result)
+
+
+# Headers of rejected attempts, exposed to cross-origin clients
+RATE_LIMIT_HEADERS = ("Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset")
+
+
+def rate_limit_headers(result: RateLimitResult) -> dict:
+    """
+    Headers describing a rejected attempt's bucket.
+
+    Args:
+        result (RateLimitResult): Rejected attempt
+
+    Returns:
+        dict: Retry-After and X-RateLimit-* headers, in whole seconds
+    """
+    return {
+        "Retry-After": str(math.ceil(result.retry_after)),
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(math.ceil(result.reset)),
+    }
+
+
+def rate_limited_response(result: RateLimitResult) -> JSONResponse:
+    """
+    Build the 429 response for a rejected attempt.
+
+    Args:
+        result (RateLimitResult): Rejected attempt
+
+    Returns:
+        JSONResponse: 429 response with the rate limit headers
+    """
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many attempts, please retry later"},
+        headers=rate_limit_headers(result),
+    )
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware limiting attempts per client IP on a set of paths.
+
+    The client address is the one of the connection; behind a reverse proxy
+    the server must be told to trust its forwarded headers.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            store: RateLimitStore,
+            paths: Iterable[str],
+            limit: Callable[[], RateLimit],
+    ):
+        self.app = app
+        self.store = store
+        self.paths = frozenset(paths)
+        self.limit = limit
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.paths:
+            client = scope.get("client")
+            host = client[0] if client else "unknown"
+            result = await self.store.take(f"ip:{host}", self.limit())
+            if not result.allowed:
+                await rate_limited_response(result)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,54 @@
+# app/core/responses.py
+"""
+Response classes for serialization fast paths.
+"""
+from types import ModuleType
+from typing import Any, Sequence
+
+from fastapi.responses import Response
+
+
+def load_orjson() -> ModuleType:
+    """
+    Import orjson, which is only needed with TASKS_FAST_JSON.
+
+    Returns:
+        ModuleType: The orjson module
+
+    Raises:
+        RuntimeError: If orjson is not installed
+    """
+    try:
+        import orjson
+    except ImportError as exc:
+        raise RuntimeError("TASKS_FAST_JSON is enabled but orjson is not installed") from exc
+    return orjson
+
+
+class RowsJSONResponse(Response):
+    """
+    JSON array of objects encoded with orjson straight from result rows.
+
+    Endpoints return it instead of model instances, so FastAPI skips
+    ``response_model`` validation and ``jsonable_encoder``; the rows must
+    already hold exactly what the schema would output. Headers set on an
+    injected ``Response`` parameter are not merged into a returned
+    response, so pass them here.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, rows: Sequence[Sequence[Any]], fields: Sequence[str], **kwargs: Any):
+        """
+        Args:
+            rows: Result rows, one value per field in order
+            fields: Object keys of the row values
+            **kwargs: Response arguments such as ``headers``
+        """
+        self.fields = fields
+        super().__init__(rows, **kwargs)
+
+    def render(self, content: Sequence[Sequence[Any]]) -> bytes:
+        orjson = load_orjson()
+        fields = self.fields
+        return orjson.dumps([dict(zip(fields, row)) for row in content])
@@ -2,16 +2,50 @@
 """
 Security utilities for JWT token handling and password hashing.
 """
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 import jwt
 from jwt.exceptions import InvalidTokenError
-from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.errors import HashingBusyError
+from app.core.hashing import (
+    get_password_hash,
+    hash_policy,
+    timed_call,
+    verify_and_update,
+    verify_password,
+    warm_up,
+)
+from app.core.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_QUEUE
+from app.core.profiling import span
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Process pool for bcrypt work, created on first use
+_hash_executor: Optional[ProcessPoolExecutor] = None
+# Hash/verify calls currently queued or running
+_hash_pending = 0
+
+# Verified token payloads keyed by the SHA-256 digest of the token. Entries
+# expire at the token's own exp; the default TTL only applies without exp.
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+# (SECRET_KEY, ALGORITHM) the cached payloads were verified with
+_token_cache_signer: Optional[Tuple[str, str]] = None
+# Time spent in jwt.decode on misses, and estimated time saved by hits
+_decode_count = 0
+_decode_seconds = 0.0
+_decode_seconds_saved = 0.0
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -47,6 +81,9 @@ def verify_token(token: str) -> dict:
     """
     Verify and decode a JWT token.
 
+    Payloads of verified tokens are cached until the token expires, so a
+    reused token skips signature verification and claim parsing.
+
     Args:
         token (str): JWT token to verify
 
@@ -56,20 +93,175 @@ def verify_token(token: str) -> dict:
     Raises:
         JWTError: If token is invalid or expired
     """
+    global _decode_count, _decode_seconds, _decode_seconds_saved
+    _check_token_signer()
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is not None:
+        if _decode_count:
+            _decode_seconds_saved += _decode_seconds / _decode_count
+        return dict(payload)
+
+    start = time.perf_counter()
     try:
         payload = jwt.decode(
             token,
             settings.SECRET_KEY,
             algorithms=[settings.ALGORITHM]
         )
-        return payload
     except InvalidTokenError:
         raise InvalidTokenError("Could not validate credentials")
+    _decode_seconds += time.perf_counter() - start
+    _decode_count += 1
+
+    exp = payload.get("exp")
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+    if ttl is None or ttl > 0:
+        token_cache.set(digest, payload, ttl)
+    return dict(payload)
+
+
+def generate_refresh_token() -> str:
+    """
+    Generate a new opaque refresh token.
+
+    Returns:
+        str: URL-safe random token with 256 bits of entropy
+    """
+    return secrets.token_urlsafe(32)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def hash_refresh_token(token: str) -> str:
     """
-    Verify a password against its hash.
+    Hash a refresh token for storage and lookup.
+
+    Refresh tokens are random and high-entropy, so a fast hash is enough;
+    bcrypt would put its cost back on the refresh path.
+
+    Args:
+        token (str): Refresh token
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _check_token_signer() -> None:
+    """Clear the token cache when the signing key or algorithm changed."""
+    global _token_cache_signer
+    signer = (settings.SECRET_KEY, settings.ALGORITHM)
+    if signer != _token_cache_signer:
+        token_cache.clear()
+        _token_cache_signer = signer
+
+
+def clear_token_cache() -> None:
+    """Drop all cached token payloads, e.g. after revoking tokens."""
+    token_cache.clear()
+
+
+def token_cache_stats() -> Dict[str, float]:
+    """
+    Get token cache counters.
+
+    Returns:
+        Dict[str, float]: Cache hits, misses and size, plus time spent
+        decoding on misses and the estimated decode time saved by hits
+    """
+    stats: Dict[str, float] = dict(token_cache.stats())
+    stats["decode_seconds"] = _decode_seconds
+    stats["decode_seconds_saved"] = _decode_seconds_saved
+    return stats
+
+
+def get_hash_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    Get the shared process pool used for password hashing.
+
+    Returns:
+        Optional[ProcessPoolExecutor]: The pool, or None when
+        PASSWORD_HASH_WORKERS is 0 and hashing runs in the threadpool
+    """
+    global _hash_executor
+    if settings.PASSWORD_HASH_WORKERS == 0:
+        return None
+    if _hash_executor is None:
+        # Workers import only app.core.hashing and load the hashing backend
+        # as they start, with the policy passed from here
+        _hash_executor = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_up,
+            initargs=(hash_policy(),),
+        )
+    return _hash_executor
+
+
+def start_hash_executor() -> None:
+    """
+    Start the hashing pool's workers in the background.
+
+    Called at startup so the first login does not wait for a worker
+    process to spawn; does not wait for the workers to be ready.
+    """
+    executor = get_hash_executor()
+    if executor is not None:
+        # One call per worker; an unset worker count means one per CPU
+        for _ in range(settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1):
+            executor.submit(int)
+
+
+def shutdown_hash_executor() -> None:
+    """Shut down the password hashing pool if it was started."""
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+
+async def _run_hashing(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a hashing function off the event loop, bounded by the queue limit.
+
+    The time the call waited for a worker and the time it ran are recorded
+    in the password hashing metrics. Wall clock time is used because the
+    worker may be another process.
+
+    Args:
+        fn (Callable): Module level function to run
+        *args: Arguments for fn
+
+    Returns:
+        Any: Return value of fn
+
+    Raises:
+        HashingBusyError: If PASSWORD_HASH_QUEUE_LIMIT calls are already in flight
+    """
+    global _hash_pending
+    if _hash_pending >= settings.PASSWORD_HASH_QUEUE_LIMIT:
+        raise HashingBusyError("Password hashing queue is full")
+    _hash_pending += 1
+    try:
+        with span("bcrypt"):
+            submitted = time.time()
+            executor = get_hash_executor()
+            if executor is None:
+                started, duration, result = await run_in_threadpool(timed_call, fn, *args)
+            else:
+                started, duration, result = await asyncio.get_running_loop().run_in_executor(
+                    executor, timed_call, fn, *args
+                )
+        PASSWORD_HASH_QUEUE.observe(max(0.0, started - submitted))
+        PASSWORD_HASH_DURATION.observe(duration)
+        return result
+    finally:
+        _hash_pending -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password against its hash in the hashing pool.
 
     Args:
         plain_password (str): Password to verify
@@ -77,18 +269,44 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
     Returns:
         bool: True if password matches, False otherwise
+
+    Raises:
+        HashingBusyError: If the hashing queue is full
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return await _run_hashing(verify_password, plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
+async def verify_and_update_async(
+        plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
     """
-    Hash a password.
+    Verify a password in the hashing pool, rehashing it if outdated.
+
+    Args:
+        plain_password (str): Password to verify
+        hashed_password (str): Hashed password to compare against
+
+    Returns:
+        Tuple[bool, Optional[str]]: Whether the password matches, and a new
+        hash to store when the old one does not follow the hashing policy
+
+    Raises:
+        HashingBusyError: If the hashing queue is full
+    """
+    return await _run_hashing(verify_and_update, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a password in the hashing pool.
 
     Args:
         password (str): Password to hash
 
     Returns:
         str: Hashed password
+
+    Raises:
+        HashingBusyError: If the hashing queue is full
     """
-    return pwd_context.hash(password) 
+    return await _run_hashing(get_password_hash, password)
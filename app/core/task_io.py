@@ -0,0 +1,251 @@
+# app/core/task_io.py
+"""
+Streaming encoders for task exports and an incremental parser for imports.
+
+Encoders consume partitions of (id, description, completed) rows and yield
+one encoded chunk per partition; the parser consumes the request body chunk
+by chunk. Either way memory use is bounded by a batch rather than by the
+number of tasks.
+"""
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from pydantic import ValidationError
+
+from app.schemas.task import TaskBase, TaskImportRow
+
+# Columns written by every export format, in order
+EXPORT_FIELDS = ("id", "description", "completed")
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def encode_ndjson(partitions: AsyncIterator[List[Sequence]]) -> AsyncIterator[bytes]:
+    """
+    Encode rows as newline-delimited JSON objects.
+
+    Args:
+        partitions: Lists of rows to encode
+
+    Yields:
+        bytes: One chunk of lines per partition
+    """
+    async for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), separators=(",", ":")) + "\n"
+            for row in rows
+        ).encode()
+
+
+async def encode_csv(partitions: AsyncIterator[List[Sequence]]) -> AsyncIterator[bytes]:
+    """
+    Encode rows as CSV with a header line.
+
+    Args:
+        partitions: Lists of rows to encode
+
+    Yields:
+        bytes: The header, then one chunk of lines per partition
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue().encode()
+    async for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (task_id, description, "true" if completed else "false")
+            for task_id, description, completed in rows
+        )
+        yield buffer.getvalue().encode()
+
+
+EXPORT_ENCODERS: Dict[str, Callable[[AsyncIterator[List[Sequence]]], AsyncIterator[bytes]]] = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+}
+
+
+class ImportFormatError(ValueError):
+    """Raised when an import body cannot be parsed any further."""
+
+
+class ParsedLine(NamedTuple):
+    """One input record: validated column values, or the reason it was rejected."""
+    line: int
+    values: Optional[dict]
+    error: Optional[str]
+
+
+class TaskImportParser:
+    """
+    Incremental NDJSON / CSV parser validating each record as a TaskImportRow.
+
+    Records are numbered by the input line they start on. Records on lines up
+    to ``skip_until`` were handled by an earlier attempt of the same import
+    and are skipped without being validated.
+    """
+
+    def __init__(self, import_format: str, max_line_length: int, skip_until: int = 0):
+        self.import_format = import_format
+        self.max_line_length = max_line_length
+        self.skip_until = skip_until
+        self.line = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._pending = ""
+        # CSV only: header columns and a record continued over several lines
+        self._columns: Optional[List[str]] = None
+        self._record = ""
+        self._record_line = 0
+
+    async def parse(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedLine]:
+        """
+        Parse a body arriving in chunks.
+
+        Args:
+            chunks: Raw body chunks
+
+        Yields:
+            ParsedLine: Each record after ``skip_until``, in input order
+
+        Raises:
+            ImportFormatError: If the body cannot be parsed any further
+        """
+        async for chunk in chunks:
+            for parsed in self.feed(chunk):
+                yield parsed
+        for parsed in self.close():
+            yield parsed
+
+    def feed(self, data: bytes) -> List[ParsedLine]:
+        """
+        Parse the complete lines of the next body chunk.
+
+        Args:
+            data: Next chunk of the body
+
+        Returns:
+            List[ParsedLine]: Records completed by this chunk
+
+        Raises:
+            ImportFormatError: If the body cannot be parsed any further
+        """
+        try:
+            text = self._pending + self._decoder.decode(data)
+        except UnicodeDecodeError:
+            raise ImportFormatError(f"Line {self.line + 1}: invalid UTF-8")
+        lines = text.split("\n")
+        self._pending = lines.pop()
+        if len(self._pending) > self.max_line_length:
+            raise ImportFormatError(
+                f"Line {self.line + len(lines) + 1}: longer than {self.max_line_length} characters"
+            )
+        return self._parse_lines(lines)
+
+    def close(self) -> List[ParsedLine]:
+        """
+        Parse whatever follows the last newline of the body.
+
+        Returns:
+            List[ParsedLine]: Records completed by the end of the body
+
+        Raises:
+            ImportFormatError: If the body ends inside a record
+        """
+        try:
+            text = self._pending + self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise ImportFormatError(f"Line {self.line + 1}: invalid UTF-8")
+        self._pending = ""
+        parsed = self._parse_lines([text] if text else [])
+        if self._record:
+            raise ImportFormatError(f"Line {self._record_line}: unterminated quoted field")
+        return parsed
+
+    def _parse_lines(self, lines: List[str]) -> List[ParsedLine]:
+        parse_line = self._parse_ndjson if self.import_format == "ndjson" else self._parse_csv
+        parsed = []
+        for text in lines:
+            self.line += 1
+            result = parse_line(text.rstrip("\r"))
+            if result is not None:
+                parsed.append(result)
+        return parsed
+
+    def _parse_ndjson(self, text: str) -> Optional[ParsedLine]:
+        if self.line <= self.skip_until or not text.strip():
+            return None
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return ParsedLine(self.line, None, "invalid JSON")
+        if not isinstance(data, dict):
+            return ParsedLine(self.line, None, "expected a JSON object")
+        return self._validate(self.line, data)
+
+    def _parse_csv(self, text: str) -> Optional[ParsedLine]:
+        if self._record:
+            self._record += "\n" + text
+        else:
+            self._record, self._record_line = text, self.line
+        if len(self._record) > self.max_line_length:
+            raise ImportFormatError(
+                f"Line {self._record_line}: longer than {self.max_line_length} characters"
+            )
+        # An odd number of quotes leaves a quoted field open on the next line
+        if self._record.count('"') % 2:
+            return None
+        record, self._record = self._record, ""
+        if not record.strip():
+            return None
+        try:
+            fields = next(csv.reader([record]))
+        except csv.Error as e:
+            if self._columns is None:
+                raise ImportFormatError(f"Line {self._record_line}: {e}")
+            return ParsedLine(self._record_line, None, str(e))
+
+        if self._columns is None:
+            self._columns = [column.strip() for column in fields]
+            if "description" not in self._columns:
+                raise ImportFormatError("CSV header must include a description column")
+            return None
+        if self._record_line <= self.skip_until:
+            return None
+        if len(fields) != len(self._columns):
+            return ParsedLine(
+                self._record_line, None, f"expected {len(self._columns)} fields, got {len(fields)}"
+            )
+        data = dict(zip(self._columns, fields))
+        if data.get("completed") == "":
+            del data["completed"]
+        return self._validate(self._record_line, data)
+
+    @staticmethod
+    def _validate(line: int, data: dict) -> ParsedLine:
+        # Fast path for already well-typed values: apply the description
+        # rules directly instead of building a model per line
+        description = data.get("description")
+        completed = data.get("completed", False)
+        if type(description) is str and type(completed) is bool:
+            try:
+                description = TaskBase.description_not_empty(description)
+            except ValueError as e:
+                return ParsedLine(line, None, f"description: {e}")
+            return ParsedLine(line, {"description": description, "completed": completed}, None)
+
+        try:
+            row = TaskImportRow.parse_obj(data)
+        except ValidationError as e:
+            return ParsedLine(line, None, "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            ))
+        return ParsedLine(line, {"description": row.description, "completed": row.completed}, None)
@@ -0,0 +1,160 @@
+# app/crud/refresh_token.py
+"""
+Database operations for refresh tokens.
+
+Functions take a synchronous Session so they can run either in the
+threadpool or inside ``AsyncSession.run_sync``.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import generate_refresh_token, hash_refresh_token
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+
+def _utcnow() -> datetime:
+    """Current time as naive UTC, matching what SQLite stores."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _add_refresh_token(db: Session, user_id: int, family_id: str) -> str:
+    """Add a new token row to the session and return the plain token."""
+    token = generate_refresh_token()
+    db.add(RefreshToken(
+        token_hash=hash_refresh_token(token),
+        family_id=family_id,
+        user_id=user_id,
+        expires_at=_utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+
+def issue_refresh_token(db: Session, user_id: int) -> str:
+    """
+    Start a new token family for a fresh login and commit.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the token
+
+    Returns:
+        str: Plain refresh token; only its hash is stored
+    """
+    token = _add_refresh_token(db, user_id, uuid.uuid4().hex)
+    db.commit()
+    return token
+
+
+def rotate_refresh_token(db: Session, token: str) -> Optional[Tuple[str, str]]:
+    """
+    Exchange a refresh token for a new one in the same family and commit.
+
+    A token that was already used revokes its whole family, since either
+    the client or an attacker holds a stolen copy.
+
+    Args:
+        db (Session): Database session
+        token (str): Presented refresh token
+
+    Returns:
+        Optional[Tuple[str, str]]: Username and new refresh token, or None if
+        the token is unknown, expired or reused
+    """
+    row = db.execute(
+        select(RefreshToken.id, RefreshToken.family_id, RefreshToken.expires_at,
+               User.username, User.id.label("user_id"))
+        .join(User, User.id == RefreshToken.user_id)
+        .where(RefreshToken.token_hash == hash_refresh_token(token))
+    ).first()
+    if row is None:
+        return None
+
+    # Revoke atomically so two concurrent refreshes cannot both succeed
+    used = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == row.id, RefreshToken.revoked.is_(False))
+        .values(revoked=True)
+    ).rowcount
+    if not used:
+        revoke_token_family(db, row.family_id)
+        return None
+    if row.expires_at <= _utcnow():
+        db.commit()
+        return None
+
+    new_token = _add_refresh_token(db, row.user_id, row.family_id)
+    db.commit()
+    return row.username, new_token
+
+
+def revoke_token_family(db: Session, family_id: str) -> None:
+    """
+    Revoke every token of a family and commit.
+
+    Args:
+        db (Session): Database session
+        family_id (str): Token family to revoke
+    """
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id)
+        .values(revoked=True)
+    )
+    db.commit()
+
+
+def revoke_user_tokens(db: Session, user_id: int) -> int:
+    """
+    Revoke every token family of a user and commit.
+
+    Used when the password changes, so refresh tokens issued before,
+    possibly to whoever learned the old password, stop working.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the tokens
+
+    Returns:
+        int: Tokens revoked
+    """
+    revoked = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked.is_(False))
+        .values(revoked=True)
+    ).rowcount
+    db.commit()
+    return revoked
+
+
+def delete_expired_refresh_tokens(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Delete the refresh tokens that can no longer be used, and commit.
+
+    Every rotation adds a row, so without pruning the table only grows.
+    Expired tokens go, as do all tokens of families without a usable token
+    left. Revoked tokens of live families are kept until they expire:
+    presenting one again is how reuse is detected.
+
+    Args:
+        db (Session): Database session
+        now (Optional[datetime]): Current time as naive UTC, defaults to now
+
+    Returns:
+        int: Tokens deleted
+    """
+    now = now or _utcnow()
+    live_families = select(RefreshToken.family_id).where(
+        RefreshToken.revoked.is_(False), RefreshToken.expires_at > now
+    )
+    deleted = db.execute(
+        delete(RefreshToken).where(
+            (RefreshToken.expires_at <= now) | RefreshToken.family_id.not_in(live_families)
+        )
+    ).rowcount
+    db.commit()
+    return deleted
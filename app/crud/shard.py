@@ -0,0 +1,62 @@
+# app/crud/shard.py
+"""
+Database operations for the user to shard map.
+
+Functions take a synchronous Session so they can run either in the
+threadpool or inside ``AsyncSession.run_sync``.
+"""
+from typing import Tuple
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.shard import UserShard
+from app.models.user import User
+
+
+def get_user_shard(db: Session, user_id: int) -> Tuple[int, bool]:
+    """
+    Look up where a user's tasks live.
+
+    Args:
+        db (Session): Session on the main database
+        user_id (int): User primary key
+
+    Returns:
+        Tuple[int, bool]: Shard index, and whether the user is being moved
+    """
+    row = db.get(UserShard, user_id)
+    if row is None:
+        return 0, False
+    return row.shard, row.moving
+
+
+def set_user_shard(db: Session, user_id: int, shard: int) -> None:
+    """
+    Record the shard of a new user and commit.
+
+    Args:
+        db (Session): Session on the main database
+        user_id (int): User primary key
+        shard (int): Shard index
+    """
+    db.add(UserShard(user_id=user_id, shard=shard, moving=False))
+    db.commit()
+
+
+def create_shard_user(db: Session, user_id: int, username: str) -> None:
+    """
+    Insert the stub user row a shard needs for a user's tasks, and commit.
+
+    The stub has no password; accounts stay in the main database.
+
+    Args:
+        db (Session): Session on the user's shard
+        user_id (int): User primary key
+        username (str): Username
+    """
+    db.execute(
+        sqlite_insert(User.__table__)
+        .values(id=user_id, username=username, hashed_password=None)
+        .on_conflict_do_nothing()
+    )
+    db.commit()
@@ -0,0 +1,550 @@
+# app/crud/task.py
+"""
+Database operations for tasks.
+
+Functions take a synchronous Session so they can run either in the
+threadpool or inside ``AsyncSession.run_sync``. Bulk operations bypass the
+ORM unit of work and run Core statements on the tasks table.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import Select, bindparam, delete, insert, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app.db.changes import reserve_change_seqs
+from app.db.shards import reserve_task_ids
+from app.models.task import Task
+from app.models.task_change import TaskChangeSequence
+from app.models.task_import import TaskImport
+from app.models.user import User
+from app.models.user_task_stats import UserTaskStats
+
+tasks_table = Task.__table__
+users_table = User.__table__
+task_imports_table = TaskImport.__table__
+stats_table = UserTaskStats.__table__
+sequence_table = TaskChangeSequence.__table__
+
+# Columns of list_task_rows rows, matching the fields of the Task schema
+TASK_ROW_FIELDS = ("id", "description", "completed", "user_id")
+
+# Live tasks and tombstones changed after a cursor, merged in sequence order.
+# Both halves are range scans on (user_id, change_seq).
+LIST_CHANGES_SQL = text("""
+    SELECT change_seq, id, description, completed, user_id, deleted FROM (
+        SELECT change_seq, id, description, completed, user_id, 0 AS deleted
+        FROM tasks WHERE user_id = :user_id AND change_seq > :since
+        UNION ALL
+        SELECT change_seq, task_id, NULL, NULL, user_id, 1
+        FROM task_tombstones WHERE user_id = :user_id AND change_seq > :since
+    )
+    ORDER BY change_seq
+    LIMIT :limit
+""")
+
+# Markers placed around matched terms in search snippets
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+
+# bm25() is lower for better matches; ties keep id order so pages are stable
+SEARCH_TASKS_SQL = text("""
+    SELECT tasks.id, tasks.description, tasks.completed, tasks.user_id,
+           snippet(tasks_fts, 0, :open, :close, '...', 16) AS snippet,
+           bm25(tasks_fts) AS rank
+    FROM tasks_fts JOIN tasks ON tasks.id = tasks_fts.rowid
+    WHERE tasks_fts MATCH :match AND tasks.user_id = :user_id
+    ORDER BY rank, tasks.id
+    LIMIT :limit OFFSET :offset
+""")
+
+
+def bump_tasks_version(db: Session, user_id: int) -> None:
+    """
+    Bump the user's task collection version inside the current transaction.
+
+    Every function changing a user's tasks calls this before committing, so
+    collection ETags change with the collection.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the changed tasks
+    """
+    db.execute(
+        update(users_table)
+        .where(users_table.c.id == user_id)
+        .values(tasks_version=users_table.c.tasks_version + 1)
+    )
+
+
+def _list_tasks_filters(
+        user_id: int,
+        completed: Optional[bool],
+        description_prefix: Optional[str],
+        after_id: Optional[int],
+) -> list:
+    """Build the WHERE clauses shared by list_tasks and list_task_rows."""
+    filters = [tasks_table.c.user_id == user_id]
+    if completed is not None:
+        filters.append(tasks_table.c.completed == completed)
+    if description_prefix is not None:
+        filters.append(
+            tasks_table.c.description.startswith(description_prefix, autoescape=True)
+        )
+    if after_id is not None:
+        filters.append(tasks_table.c.id > after_id)
+    return filters
+
+
+def list_tasks(
+        db: Session,
+        user_id: int,
+        *,
+        completed: Optional[bool] = None,
+        description_prefix: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: int,
+) -> List[Task]:
+    """
+    Return one keyset page of a user's tasks ordered by id.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the tasks
+        completed (Optional[bool]): Only tasks with this completion status
+        description_prefix (Optional[str]): Only tasks whose description starts with this
+        after_id (Optional[int]): Only tasks with an id greater than this cursor
+        limit (int): Maximum number of tasks to return
+
+    Returns:
+        List[Task]: Tasks of the page
+    """
+    filters = _list_tasks_filters(user_id, completed, description_prefix, after_id)
+    return db.query(Task).filter(*filters).order_by(Task.id).limit(limit).all()
+
+
+def list_task_rows(
+        db: Session,
+        user_id: int,
+        *,
+        completed: Optional[bool] = None,
+        description_prefix: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: int,
+) -> List[Row]:
+    """
+    Return the same page as list_tasks as plain Core rows.
+
+    Rows carry the TASK_ROW_FIELDS columns in order and skip ORM identity
+    map and instance construction entirely.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the tasks
+        completed (Optional[bool]): Only tasks with this completion status
+        description_prefix (Optional[str]): Only tasks whose description starts with this
+        after_id (Optional[int]): Only tasks with an id greater than this cursor
+        limit (int): Maximum number of tasks to return
+
+    Returns:
+        List[Row]: (id, description, completed, user_id) rows of the page
+    """
+    filters = _list_tasks_filters(user_id, completed, description_prefix, after_id)
+    return db.execute(
+        select(*(tasks_table.c[field] for field in TASK_ROW_FIELDS))
+        .where(*filters)
+        .order_by(tasks_table.c.id)
+        .limit(limit)
+    ).all()
+
+
+def export_tasks_statement(user_id: int, batch_size: int) -> Select:
+    """
+    Build the query streaming all of a user's tasks ordered by id.
+
+    The statement selects plain columns and carries the ``yield_per`` option,
+    so executing it with ``stream`` fetches rows in batches from a
+    server-side cursor instead of loading the whole result.
+
+    Args:
+        user_id (int): Owner of the tasks
+        batch_size (int): Rows fetched per round trip
+
+    Returns:
+        Select: Statement to execute with ``stream``
+    """
+    return (
+        select(tasks_table.c.id, tasks_table.c.description, tasks_table.c.completed)
+        .where(tasks_table.c.user_id == user_id)
+        .order_by(tasks_table.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+
+def search_tasks(
+        db: Session, user_id: int, match: str, *, offset: int, limit: int
+) -> List[dict]:
+    """
+    Return one page of a user's tasks matching a full-text query, best first.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the tasks
+        match (str): FTS5 MATCH expression (see app.db.search.build_match_query)
+        offset (int): Number of matches to skip
+        limit (int): Maximum number of matches to return
+
+    Returns:
+        List[dict]: Task columns plus ``snippet`` and ``rank``
+    """
+    rows = db.execute(SEARCH_TASKS_SQL, {
+        "open": SNIPPET_OPEN,
+        "close": SNIPPET_CLOSE,
+        "match": match,
+        "user_id": user_id,
+        "limit": limit,
+        "offset": offset,
+    })
+    return [dict(row) for row in rows.mappings()]
+
+
+def get_task_stats(db: Session, user_id: int) -> dict:
+    """
+    Read a user's task counters with a single primary key lookup.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the tasks
+
+    Returns:
+        dict: ``total``, ``completed`` and ``pending`` task counts
+    """
+    row = db.execute(
+        select(stats_table.c.total, stats_table.c.completed)
+        .where(stats_table.c.user_id == user_id)
+    ).first()
+    total, completed = row if row is not None else (0, 0)
+    return {"total": total, "completed": completed, "pending": total - completed}
+
+
+def get_compacted_seq(db: Session) -> int:
+    """
+    Return the highest change sequence number whose tombstone was removed.
+
+    Args:
+        db (Session): Database session
+
+    Returns:
+        int: Oldest cursor delta sync can still serve completely
+    """
+    return db.scalar(select(sequence_table.c.compacted_seq)) or 0
+
+
+def list_changes(db: Session, user_id: int, since: int, limit: int) -> List[dict]:
+    """
+    Return a user's task changes after a cursor, in change order.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the tasks
+        since (int): Change sequence number already seen
+        limit (int): Maximum number of changes to return
+
+    Returns:
+        List[dict]: Changes with ``change_seq``, ``id`` and ``deleted``; live
+            tasks also carry their columns
+    """
+    rows = db.execute(LIST_CHANGES_SQL, {"user_id": user_id, "since": since, "limit": limit})
+    return [dict(row) for row in rows.mappings()]
+
+
+def get_user_task(db: Session, task_id: int, user_id: int) -> Optional[Task]:
+    """
+    Load a single task owned by the given user.
+
+    Args:
+        db (Session): Database session
+        task_id (int): Task primary key
+        user_id (int): Expected owner
+
+    Returns:
+        Optional[Task]: The task, or None if missing or owned by someone else
+    """
+    return (
+        db.query(Task)
+        .filter(Task.id == task_id, Task.user_id == user_id)
+        .first()
+    )
+
+
+def create_task(db: Session, user_id: int, description: str) -> Task:
+    """
+    Insert a new task and commit.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the task
+        description (str): Task description
+
+    Returns:
+        Task: Newly created task
+    """
+    task = Task(
+        id=reserve_task_ids(db.connection(), 1), description=description, user_id=user_id
+    )
+    db.add(task)
+    bump_tasks_version(db, user_id)
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+def update_task(db: Session, task: Task, values: dict) -> Task:
+    """
+    Apply field values to a task and commit.
+
+    Args:
+        db (Session): Database session
+        task (Task): Task to update
+        values (dict): Column values to set
+
+    Returns:
+        Task: Updated task
+
+    Raises:
+        StaleDataError: If the task was changed since it was loaded
+    """
+    for field, value in values.items():
+        setattr(task, field, value)
+    if db.is_modified(task):
+        bump_tasks_version(db, task.user_id)
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+def delete_task(db: Session, task: Task) -> None:
+    """
+    Delete a task and commit.
+
+    Args:
+        db (Session): Database session
+        task (Task): Task to delete
+
+    Raises:
+        StaleDataError: If the task was changed since it was loaded
+    """
+    db.delete(task)
+    bump_tasks_version(db, task.user_id)
+    db.commit()
+
+
+def get_owned_task_ids(db: Session, task_ids: Iterable[int], user_id: int) -> Set[int]:
+    """
+    Return the subset of task ids that belong to the given user.
+
+    Args:
+        db (Session): Database session
+        task_ids (Iterable[int]): Task ids to check
+        user_id (int): Expected owner
+
+    Returns:
+        Set[int]: Ids owned by the user
+    """
+    ids = set(task_ids)
+    if not ids:
+        return set()
+    return set(db.scalars(
+        select(tasks_table.c.id).where(
+            tasks_table.c.user_id == user_id, tasks_table.c.id.in_(ids)
+        )
+    ))
+
+
+def create_tasks_bulk(db: Session, user_id: int, descriptions: List[str]) -> List[dict]:
+    """
+    Insert many tasks with a single executemany INSERT ... RETURNING and commit.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the tasks
+        descriptions (List[str]): Descriptions of the new tasks
+
+    Returns:
+        List[dict]: Inserted rows, in input order
+    """
+    if not descriptions:
+        return []
+    first_id = reserve_task_ids(db.connection(), len(descriptions))
+    first_seq = reserve_change_seqs(db.connection(), len(descriptions))
+    rows = db.execute(
+        insert(tasks_table).returning(tasks_table, sort_by_parameter_order=True),
+        [
+            {
+                "id": first_id + i,
+                "description": description,
+                "completed": False,
+                "user_id": user_id,
+                "change_seq": first_seq + i,
+            }
+            for i, description in enumerate(descriptions)
+        ],
+    ).all()
+    bump_tasks_version(db, user_id)
+    db.commit()
+    return [dict(row._mapping) for row in rows]
+
+
+def update_tasks_bulk(
+        db: Session, user_id: int, items: List[Tuple[int, dict]]
+) -> Dict[int, dict]:
+    """
+    Update many tasks of a user and commit.
+
+    Items that touch the same set of fields are applied together with one
+    executemany UPDATE. Items are applied in input order.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the tasks
+        items (List[Tuple[int, dict]]): Task ids with the column values to set
+
+    Returns:
+        Dict[int, dict]: Resulting rows of the updated tasks, keyed by id;
+        tasks of other users and items without values are left out
+    """
+    owned_ids = get_owned_task_ids(db, (task_id for task_id, _ in items), user_id)
+
+    # Group parameter sets by the fields they update
+    batches: Dict[Tuple[str, ...], List[dict]] = {}
+    updated_ids = set()
+    for task_id, values in items:
+        if task_id not in owned_ids or not values:
+            continue
+        updated_ids.add(task_id)
+        fields = tuple(sorted(values))
+        params = {f"b_{field}": value for field, value in values.items()}
+        params["b_id"] = task_id
+        batches.setdefault(fields, []).append(params)
+
+    for fields, params in batches.items():
+        db.execute(
+            update(tasks_table)
+            .where(
+                tasks_table.c.id == bindparam("b_id"),
+                tasks_table.c.user_id == user_id,
+            )
+            .values(
+                {field: bindparam(f"b_{field}") for field in fields}
+            )
+            .values(version=tasks_table.c.version + 1),
+            params,
+        )
+    if batches:
+        bump_tasks_version(db, user_id)
+
+    rows = {}
+    if updated_ids:
+        rows = {
+            row.id: dict(row._mapping)
+            for row in db.execute(
+                select(tasks_table).where(tasks_table.c.id.in_(updated_ids))
+            )
+        }
+    db.commit()
+    return rows
+
+
+def delete_tasks_bulk(db: Session, user_id: int, task_ids: List[int]) -> Set[int]:
+    """
+    Delete many tasks of a user with a single DELETE and commit.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the tasks
+        task_ids (List[int]): Ids of the tasks to delete
+
+    Returns:
+        Set[int]: Ids that were deleted
+    """
+    owned_ids = get_owned_task_ids(db, task_ids, user_id)
+    if owned_ids:
+        db.execute(
+            delete(tasks_table).where(
+                tasks_table.c.user_id == user_id,
+                tasks_table.c.id.in_(owned_ids),
+            )
+        )
+        bump_tasks_version(db, user_id)
+    db.commit()
+    return owned_ids
+
+
+def get_import_checkpoint(db: Session, user_id: int, import_key: str) -> int:
+    """
+    Return the last input line already processed by an import.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the import
+        import_key (str): Client-chosen key of the import
+
+    Returns:
+        int: Checkpoint line, 0 for a new import
+    """
+    return db.scalar(
+        select(task_imports_table.c.checkpoint).where(
+            task_imports_table.c.user_id == user_id,
+            task_imports_table.c.import_key == import_key,
+        )
+    ) or 0
+
+
+def import_tasks_batch(
+        db: Session,
+        user_id: int,
+        rows: List[dict],
+        import_key: Optional[str],
+        checkpoint: int,
+) -> None:
+    """
+    Insert one batch of imported tasks and record the import checkpoint.
+
+    Both happen in one transaction, so after a failure the checkpoint
+    never points past tasks that were not inserted, nor before ones that
+    were.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the tasks
+        rows (List[dict]): Validated description/completed values
+        import_key (Optional[str]): Key of a resumable import, if any
+        checkpoint (int): Last input line covered by this batch
+    """
+    if rows:
+        first_id = reserve_task_ids(db.connection(), len(rows))
+        first_seq = reserve_change_seqs(db.connection(), len(rows))
+        db.execute(
+            insert(tasks_table),
+            [
+                {
+                    **row,
+                    "id": first_id + i,
+                    "user_id": user_id,
+                    "version": 1,
+                    "change_seq": first_seq + i,
+                }
+                for i, row in enumerate(rows)
+            ],
+        )
+        bump_tasks_version(db, user_id)
+    if import_key is not None:
+        db.execute(
+            sqlite_insert(task_imports_table)
+            .values(user_id=user_id, import_key=import_key, checkpoint=checkpoint)
+            .on_conflict_do_update(
+                index_elements=["user_id", "import_key"],
+                set_={"checkpoint": checkpoint},
+            )
+        )
+    db.commit()
@@ -0,0 +1,324 @@
+# app/crud/user.py
+"""
+Database operations for users.
+
+Functions take a synchronous Session so they can run either in the
+threadpool or inside ``AsyncSession.run_sync``.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.bloom import BloomFilter
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.crud.refresh_token import revoke_user_tokens
+from app.models.user import User
+
+# Session.info key collecting usernames to drop from the cache on commit
+_INVALIDATED_USERNAMES = "invalidated_usernames"
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """
+    Immutable, session-independent view of an authenticated user.
+
+    Attributes:
+        id (int): User primary key
+        username (str): Username
+        shard (int): Shard holding the user's tasks
+    """
+    id: int
+    username: str
+    shard: int = 0
+
+    @classmethod
+    def from_user(cls, user: User, shard: int = 0) -> "UserSnapshot":
+        """Build a snapshot from a loaded User row."""
+        return cls(id=user.id, username=user.username, shard=shard)
+
+
+# Authenticated user lookups keyed by username (the token ``sub``)
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+
+# Usernames recently looked up and not found
+negative_username_cache = TTLCache(
+    maxsize=settings.USERNAME_NEGATIVE_CACHE_SIZE,
+    ttl=settings.USERNAME_NEGATIVE_CACHE_TTL_SECONDS,
+)
+
+
+class UsernameFilter:
+    """
+    Bloom filter of the registered usernames, answering "definitely not registered".
+
+    Loaded from the database at startup; until then every username may
+    exist. Users inserted by this process are added as they are flushed.
+    Users inserted by other worker processes are picked up by querying the
+    users with a higher id than any read so far, at most once per
+    USERNAME_FILTER_SYNC_SECONDS and only when a lookup misses the filter,
+    so another worker's new user may be reported unknown here for up to
+    that long. The unique constraint on ``User.username`` stays the source
+    of truth for registration.
+    """
+
+    def __init__(self, timer: Callable[[], float] = time.monotonic):
+        self._timer = timer
+        self._bloom: Optional[BloomFilter] = None
+        self._max_id = 0
+        self._synced = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the filter has been loaded and answers lookups."""
+        return self._bloom is not None
+
+    def load(self, db: Session) -> int:
+        """
+        Build the filter from every registered username.
+
+        Args:
+            db (Session): Database session
+
+        Returns:
+            int: Usernames loaded
+        """
+        count = db.scalar(select(func.count()).select_from(User)) or 0
+        bloom = BloomFilter(
+            max(settings.USERNAME_FILTER_CAPACITY, 2 * count), settings.USERNAME_FILTER_ERROR_RATE
+        )
+        max_id = 0
+        rows = db.execute(
+            select(User.id, User.username).execution_options(yield_per=10000)
+        )
+        for user_id, username in rows:
+            bloom.add(username)
+            max_id = max(max_id, user_id)
+        with self._lock:
+            self._bloom, self._max_id, self._synced = bloom, max_id, self._timer()
+        return len(bloom)
+
+    def reset(self) -> None:
+        """Unload the filter; every username may exist again."""
+        with self._lock:
+            self._bloom, self._max_id, self._synced = None, 0, 0.0
+
+    def add(self, username: str) -> None:
+        """
+        Record a registered username.
+
+        Only sets the filter's bits: the sync watermark moves only with the
+        rows a load or sync actually read, so users committed by other
+        workers with a lower id than a local insert are still picked up.
+
+        Args:
+            username (str): Username to add
+        """
+        bloom = self._bloom
+        if bloom is not None:
+            bloom.add(username)
+
+    def may_exist(self, db: Session, username: str) -> bool:
+        """
+        Check whether a username may be registered.
+
+        Args:
+            db (Session): Database session, used to catch up with other workers
+            username (str): Username to check
+
+        Returns:
+            bool: False only if no user has this username
+        """
+        bloom = self._bloom
+        if bloom is None or username in bloom:
+            return True
+        if self._timer() - self._synced < settings.USERNAME_FILTER_SYNC_SECONDS:
+            return False
+        if len(bloom) > bloom.capacity:
+            # Past capacity the false positive rate climbs; resize
+            self.load(db)
+        else:
+            self._sync(db)
+        return username in self._bloom
+
+    def _sync(self, db: Session) -> None:
+        """Add users inserted since the last sync, e.g. by other worker processes."""
+        with self._lock:
+            max_id = self._max_id
+            self._synced = self._timer()
+        rows = db.execute(select(User.id, User.username).where(User.id > max_id)).all()
+        for user_id, username in rows:
+            self.add(username)
+            max_id = max(max_id, user_id)
+        with self._lock:
+            self._max_id = max(self._max_id, max_id)
+
+
+username_filter = UsernameFilter()
+
+
+def get_user_by_username(db: Session, username: str) -> Optional[User]:
+    """
+    Look up a user by username.
+
+    Usernames recently found missing, or never added to the username
+    filter, are answered without querying the database.
+
+    Args:
+        db (Session): Database session
+        username (str): Username to look up
+
+    Returns:
+        Optional[User]: Matching user, or None
+    """
+    if negative_username_cache.get(username) or not username_filter.may_exist(db, username):
+        return None
+    user = db.query(User).filter(User.username == username).first()
+    if user is None:
+        negative_username_cache.set(username, True)
+    return user
+
+
+def get_tasks_version(db: Session, user_id: int) -> int:
+    """
+    Get the version counter of a user's task collection.
+
+    Args:
+        db (Session): Database session
+        user_id (int): User primary key
+
+    Returns:
+        int: Current tasks version
+    """
+    return db.query(User.tasks_version).filter(User.id == user_id).scalar() or 0
+
+
+def create_user(db: Session, username: str, hashed_password: str) -> User:
+    """
+    Insert a new user and commit.
+
+    Args:
+        db (Session): Database session
+        username (str): Username of the new user
+        hashed_password (str): Already hashed password
+
+    Returns:
+        User: Newly created user
+
+    Raises:
+        IntegrityError: If the username is already taken
+    """
+    user = User(username=username, hashed_password=hashed_password)
+    db.add(user)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    db.refresh(user)
+    return user
+
+
+def update_password_hash(db: Session, user_id: int, old_hash: str, new_hash: str) -> bool:
+    """
+    Replace a password hash, unless it changed since it was read, and commit.
+
+    Used to upgrade outdated hashes on login; a password changed in the
+    meantime is left alone.
+
+    Args:
+        db (Session): Database session
+        user_id (int): User primary key
+        old_hash (str): Hash the new one was computed against
+        new_hash (str): Replacement hash
+
+    Returns:
+        bool: True if the hash was replaced
+    """
+    user = db.get(User, user_id)
+    if user is None or user.hashed_password != old_hash:
+        return False
+    user.hashed_password = new_hash
+    db.commit()
+    return True
+
+
+def change_password(db: Session, user_id: int, new_hash: str) -> bool:
+    """
+    Set a new password hash, revoke the user's refresh tokens and commit.
+
+    Args:
+        db (Session): Database session
+        user_id (int): User primary key
+        new_hash (str): Hash of the new password
+
+    Returns:
+        bool: False if the user does not exist
+    """
+    user = db.get(User, user_id)
+    if user is None:
+        return False
+    user.hashed_password = new_hash
+    db.flush()
+    # Commits the new hash together with the revocation
+    revoke_user_tokens(db, user_id)
+    return True
+
+
+def _invalidate_usernames(session: Optional[Session], usernames: set) -> None:
+    """Drop usernames from the caches now and again once the session commits."""
+    for username in usernames:
+        user_cache.invalidate(username)
+        negative_username_cache.invalidate(username)
+    if session is not None:
+        session.info.setdefault(_INVALIDATED_USERNAMES, set()).update(usernames)
+
+
+@event.listens_for(User, "after_insert")
+def _user_inserted(mapper, connection, target: User) -> None:
+    """
+    Add a new username to the filter before it is committed, and drop a
+    cached "not found" for it now and after the commit.
+    """
+    username_filter.add(target.username)
+    _invalidate_usernames(inspect(target).session, {target.username})
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target: User) -> None:
+    """Invalidate cached lookups when a user's password or username changes."""
+    state = inspect(target)
+    username_history = state.attrs.username.history
+    if not (state.attrs.hashed_password.history.has_changes()
+            or username_history.has_changes()):
+        return
+    if username_history.has_changes():
+        username_filter.add(target.username)
+    usernames = {target.username, *(username_history.deleted or ())}
+    _invalidate_usernames(state.session, usernames)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User) -> None:
+    """Invalidate cached lookups of a deleted user."""
+    _invalidate_usernames(inspect(target).session, {target.username})
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_invalidated_on_commit(session: Session) -> None:
+    """
+    Invalidate again after commit, in case a concurrent request re-cached the
+    old row between the flush and the commit.
+    """
+    for username in session.info.pop(_INVALIDATED_USERNAMES, ()):
+        user_cache.invalidate(username)
+        negative_username_cache.invalidate(username)
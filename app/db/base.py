@@ -1,22 +1,362 @@
 # app/db/base.py
 """
 Database configuration module.
-Sets up SQLAlchemy and creates the database engine.
+Sets up SQLAlchemy and the lazily created database engines.
 """
-from app.models.user import User  
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, List, Optional, Union
+
+from app.db.base_class import Base
+from app.models.user import User
 from app.models.task import Task
+from app.models.refresh_token import RefreshToken
+from app.models.task_import import TaskImport
+from app.models.user_task_stats import UserTaskStats
+from app.models.task_change import TaskChangeSequence, TaskTombstone
+from app.models.shard import TaskIdSequence, UserShard
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine, Result, Row
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
+from app.core.lazy import Lazy
+from app.core.metrics import DB_POOL_WAIT
+from app.core.profiling import span
+from app.db.changes import create_task_changes_triggers, install_task_changes
+from app.db.search import create_task_search, install_task_search
+from app.db.shards import install_task_id_sequence, start_task_id_range
+from app.db.slow_queries import SlowQueryLog
+from app.db.sqlite import apply_sqlite_profile, get_sqlite_profile, optimize_database
+from app.db.stats import create_task_stats_triggers, install_task_stats
+
+# Keep the full-text index, the task counters and the change sequence in
+# step with the tasks table
+install_task_search(Task.__table__)
+install_task_stats(Task.__table__, UserTaskStats.__table__)
+install_task_changes(Task.__table__, TaskTombstone.__table__, TaskChangeSequence.__table__)
+install_task_id_sequence(Task.__table__, TaskIdSequence.__table__)
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.SQLITE_URL, connect_args={"check_same_thread": False}
+# Tuning profile and the pool size it implies
+db_profile = get_sqlite_profile(settings.DB_PROFILE)
+pool_size = settings.DB_POOL_SIZE if db_profile.pool_size is None else db_profile.pool_size
+max_overflow = (
+    settings.DB_MAX_OVERFLOW if db_profile.max_overflow is None else db_profile.max_overflow
 )
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Slow query log on every engine, only built when SLOW_QUERY_LOG_ENABLED is set
+slow_query_log = None
+if settings.SLOW_QUERY_LOG_ENABLED:
+    slow_query_log = SlowQueryLog(
+        settings.SLOW_QUERY_THRESHOLD_MS,
+        settings.SLOW_QUERY_MAX_STATEMENTS,
+        settings.SLOW_QUERY_LOG_PATH,
+    )
+
+
+def _build_engine(url: Optional[str] = None) -> Engine:
+    engine = create_engine(
+        url or settings.SQLITE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+    )
+    apply_sqlite_profile(engine, db_profile)
+    if slow_query_log is not None:
+        slow_query_log.instrument(engine)
+    return engine
+
+
+def _build_async_engine(url: Optional[str] = None) -> AsyncEngine:
+    async_engine = create_async_engine(
+        url or settings.SQLITE_ASYNC_URL,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+    )
+    apply_sqlite_profile(async_engine.sync_engine, db_profile)
+    if slow_query_log is not None:
+        slow_query_log.instrument(async_engine.sync_engine)
+    return async_engine
+
+
+# Engines and session factories are created on first use rather than at
+# import, so importing the app (tests, CLIs, worker spawn) opens nothing.
+# expire_on_commit is off for async sessions because expired attributes
+# cannot be lazy-loaded outside of run_sync.
+_engine = Lazy("engine", _build_engine)
+_session_factory = Lazy("session_factory", lambda: sessionmaker(
+    autocommit=False, autoflush=False, bind=get_engine()
+))
+_async_engine = Lazy("async_engine", _build_async_engine)
+_async_session_factory = Lazy("async_session_factory", lambda: async_sessionmaker(
+    get_async_engine(), autoflush=False, expire_on_commit=False
+))
+
+
+def get_engine() -> Engine:
+    """Get the application's engine, creating it on first use."""
+    return _engine.get()
+
+
+def get_session_factory() -> sessionmaker:
+    """Get the sessionmaker bound to the application's engine."""
+    return _session_factory.get()
+
+
+def get_async_engine() -> Optional[AsyncEngine]:
+    """Get the aiosqlite engine, or None unless DB_ASYNC is enabled."""
+    return _async_engine.get() if settings.DB_ASYNC else None
+
+
+def get_async_session_factory() -> Optional[async_sessionmaker]:
+    """Get the AsyncSession factory, or None unless DB_ASYNC is enabled."""
+    return _async_session_factory.get() if settings.DB_ASYNC else None
+
+
+class Shard:
+    """
+    Engines and session factories of one extra shard database (see app.db.shards).
+
+    Attributes:
+        index (int): Shard index, 1 for the first of DB_SHARD_URLS
+        url (str): Database URL
+        engine (Engine): Engine of the shard
+        session_factory (sessionmaker): Sessions bound to the engine
+        async_engine (Optional[AsyncEngine]): aiosqlite engine when DB_ASYNC is enabled
+        async_session_factory (Optional[async_sessionmaker]): AsyncSessions
+            bound to async_engine
+        slots (asyncio.Semaphore): Connection slots of ThreadedSessions on the shard
+    """
+
+    def __init__(self, index: int, url: str):
+        self.index = index
+        self.url = url
+        self.engine = _build_engine(url)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_engine = None
+        self.async_session_factory = None
+        if settings.DB_ASYNC:
+            self.async_engine = _build_async_engine(
+                url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+            )
+            self.async_session_factory = async_sessionmaker(
+                self.async_engine, autoflush=False, expire_on_commit=False
+            )
+        self.slots = asyncio.Semaphore(pool_size + max_overflow)
+
+
+_shards = Lazy("shards", lambda: [
+    Shard(index, url) for index, url in enumerate(settings.DB_SHARD_URLS, start=1)
+])
+
+
+def get_shard_count() -> int:
+    """Number of shards: the main database plus one per DB_SHARD_URLS entry."""
+    return 1 + len(settings.DB_SHARD_URLS)
+
+
+def get_shard(index: int) -> Shard:
+    """
+    Get an extra shard, creating the engines of every shard on first use.
+
+    Args:
+        index (int): Shard index, from 1
+
+    Returns:
+        Shard: Engines and session factories of the shard
+
+    Raises:
+        ValueError: If DB_SHARD_URLS has no shard of this index
+    """
+    if not 1 <= index < get_shard_count():
+        raise ValueError(f"shard {index} is not configured")
+    return _shards.get()[index - 1]
+
+
+def get_shard_engines() -> List[Engine]:
+    """Engine of every shard by index, the application's engine first."""
+    return [get_engine()] + [
+        get_shard(index).engine for index in range(1, get_shard_count())
+    ]
+
+
+def place_user(user_id: int) -> int:
+    """
+    Choose the shard of a new user.
+
+    Args:
+        user_id (int): Primary key of the user
+
+    Returns:
+        int: Shard index
+    """
+    return user_id % get_shard_count()
+
+
+# Names that used to be module globals, now resolved lazily on access
+_LAZY_ATTRIBUTES = {
+    "engine": get_engine,
+    "SessionLocal": get_session_factory,
+    "async_engine": get_async_engine,
+    "AsyncSessionLocal": get_async_session_factory,
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def dispose_engines() -> None:
+    """
+    Close the pooled connections of every engine that was created.
+
+    Runs PRAGMA optimize first when the tuning profile asks for it.
+    """
+    if _engine.created:
+        if db_profile.optimize_on_shutdown:
+            optimize_database(_engine.get())
+        _engine.get().dispose()
+    if _async_engine.created:
+        await _async_engine.get().dispose()
+    if _shards.created:
+        for shard in _shards.get():
+            if db_profile.optimize_on_shutdown:
+                optimize_database(shard.engine)
+            shard.engine.dispose()
+            if shard.async_engine is not None:
+                await shard.async_engine.dispose()
+
+
+class ThreadedResult:
+    """
+    Sync Result wrapper exposing the ``partitions`` API of AsyncResult.
+
+    Each partition is fetched in the threadpool, so only one partition of
+    rows is held in memory at a time.
+    """
+
+    def __init__(self, result: Result):
+        self.sync_result = result
+
+    async def partitions(self, size: Optional[int] = None) -> AsyncIterator[List[Row]]:
+        """
+        Iterate over the remaining rows in lists of at most ``size`` rows.
+
+        Args:
+            size (Optional[int]): Rows per partition (defaults to yield_per)
+
+        Yields:
+            List[Row]: Next partition of rows
+        """
+        while True:
+            rows = await run_in_threadpool(self.sync_result.fetchmany, size)
+            if not rows:
+                break
+            yield rows
+
+
+class ThreadedSession:
+    """
+    Sync Session wrapper exposing the ``run_sync`` API of AsyncSession.
+
+    Used when DB_ASYNC is disabled so async endpoints can run the same
+    database code without blocking the event loop.
+
+    A session holds its pooled connection between calls, so sessions take a
+    slot before their first call. Waiting for a connection then happens on
+    the event loop instead of inside a worker thread, which would otherwise
+    deadlock once every thread waits on a pool whose holders need a thread
+    to finish.
+    """
+
+    slots = asyncio.Semaphore(pool_size + max_overflow)
+
+    def __init__(self, session: Session, slots: Optional[asyncio.Semaphore] = None):
+        self.sync_session = session
+        self._has_slot = False
+        if slots is not None:
+            # Sessions on another engine share that engine's slots
+            self.slots = slots
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run ``fn(session, *args, **kwargs)`` in the threadpool.
+
+        Args:
+            fn (Callable): Function taking a sync Session as first argument
+
+        Returns:
+            Any: Return value of fn
+        """
+        await self._acquire_slot()
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def stream(self, statement: Any) -> ThreadedResult:
+        """
+        Execute a statement and return a result whose rows are fetched lazily.
+
+        Args:
+            statement: Statement to execute, usually with the yield_per option
+
+        Returns:
+            ThreadedResult: Result to consume with ``partitions``
+        """
+        await self._acquire_slot()
+        result = await run_in_threadpool(
+            self.sync_session.execute,
+            statement,
+            execution_options={"stream_results": True},
+        )
+        return ThreadedResult(result)
+
+    async def _acquire_slot(self) -> None:
+        """Take a connection slot before the first database call."""
+        if not self._has_slot:
+            with span("pool_wait"), DB_POOL_WAIT.time():
+                await self.slots.acquire()
+            self._has_slot = True
+
+    async def close(self) -> None:
+        """Close the wrapped session and give back its slot."""
+        if not self._has_slot:
+            # Never used, so it holds no connection and closing is cheap
+            self.sync_session.close()
+            return
+        try:
+            await run_in_threadpool(self.sync_session.close)
+        finally:
+            if self._has_slot:
+                self._has_slot = False
+                self.slots.release()
+
+
+# Session type handed to async endpoints in either mode
+AsyncDB = Union[AsyncSession, ThreadedSession]
+
+
+def init_database() -> None:
+    """
+    Create all tables (and their indexes) registered on the declarative Base,
+    plus the task search index, counter and change triggers, in every shard.
+    Existing tables are left untouched.
+    """
+    for index, engine in enumerate(get_shard_engines()):
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            create_task_search(connection)
+            create_task_stats_triggers(connection)
+            create_task_changes_triggers(connection)
+            start_task_id_range(connection, index)
+
 
 # Dependency
 def get_db():
@@ -24,9 +364,50 @@ def get_db():
     Generator function to get database session.
     Ensures session is closed after use.
     """
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
         db.close()
+
+
+@asynccontextmanager
+async def shard_session(index: int) -> AsyncIterator[AsyncDB]:
+    """
+    Open a session on an extra shard, of the same kind get_async_db yields.
+
+    Args:
+        index (int): Shard index, from 1
+
+    Yields:
+        AsyncDB: Session on the shard
+    """
+    shard = get_shard(index)
+    if shard.async_session_factory is not None:
+        async with shard.async_session_factory() as session:
+            yield session
+    else:
+        db = ThreadedSession(shard.session_factory(), shard.slots)
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncDB, None]:
+    """
+    Async dependency yielding an AsyncSession on the aiosqlite engine when
+    DB_ASYNC is enabled, otherwise a threadpool-backed ThreadedSession.
+    Database work is done through ``await db.run_sync(fn, ...)``.
+    """
+    async_session_factory = get_async_session_factory()
+    if async_session_factory is not None:
+        async with async_session_factory() as session:
+            yield session
+    else:
+        db = ThreadedSession(get_session_factory()())
+        try:
+            yield db
+        finally:
+            await db.close()
  
@@ -0,0 +1,159 @@
+# app/db/changes.py
+"""
+Global task change sequence and deletion tombstones for delta sync.
+
+Triggers on ``tasks`` stamp every inserted or updated row with the next
+number of a single global sequence, and replace every deleted row with a
+tombstone carrying its own sequence number. Bulk inserts reserve a block of
+numbers up front instead (``reserve_change_seqs``), which skips the
+per-row trigger work. A client holding the highest
+number it has seen can then ask for exactly what changed after it.
+
+Tombstones are kept for TASKS_TOMBSTONE_RETENTION_DAYS. ``compact_tombstones``
+removes older ones and records the highest removed number; cursors below it
+can no longer be served and need a full resync.
+
+Usage:
+    python -m app.db.changes [--retention-days DAYS]
+"""
+import argparse
+import json
+
+from sqlalchemy import Table, event, text
+from sqlalchemy.engine import Connection
+
+# All three tables must exist before the triggers can be created
+CHANGES_TABLES = ("tasks", "task_tombstones", "task_change_sequence")
+
+_NEXT_SEQ = (
+    "UPDATE task_change_sequence SET value = value + 1 WHERE id = 1;"
+)
+_CURRENT_SEQ = "(SELECT value FROM task_change_sequence WHERE id = 1)"
+
+TASK_CHANGES_TRIGGERS = (
+    # Bulk inserts stamp rows themselves with a reserved block of numbers
+    f"""CREATE TRIGGER IF NOT EXISTS task_changes_insert AFTER INSERT ON tasks
+    WHEN new.change_seq IS NULL BEGIN
+        {_NEXT_SEQ}
+        UPDATE tasks SET change_seq = {_CURRENT_SEQ} WHERE id = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_changes_update
+    AFTER UPDATE OF description, completed, user_id ON tasks BEGIN
+        {_NEXT_SEQ}
+        UPDATE tasks SET change_seq = {_CURRENT_SEQ} WHERE id = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_changes_delete AFTER DELETE ON tasks BEGIN
+        {_NEXT_SEQ}
+        INSERT OR REPLACE INTO task_tombstones(task_id, user_id, change_seq, deleted_at)
+        VALUES (old.id, old.user_id, {_CURRENT_SEQ}, CURRENT_TIMESTAMP);
+    END""",
+)
+
+
+def reserve_change_seqs(connection: Connection, count: int) -> int:
+    """
+    Reserve ``count`` consecutive change sequence numbers.
+
+    Args:
+        connection (Connection): Connection inside the inserting transaction
+        count (int): Numbers needed
+
+    Returns:
+        int: First reserved number
+    """
+    last = connection.execute(text(
+        "UPDATE task_change_sequence SET value = value + :count WHERE id = 1 RETURNING value"
+    ), {"count": count}).scalar_one()
+    return last - count + 1
+
+
+def create_task_changes_triggers(connection: Connection) -> None:
+    """
+    Create the sequence row and the change triggers once all tables exist.
+
+    Tasks of a database created before change tracking are stamped with
+    their id, and the sequence continues after the highest one.
+
+    Args:
+        connection (Connection): Connection to run the DDL on
+    """
+    names = {
+        row[0] for row in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        )
+    }
+    if not set(CHANGES_TABLES) <= names or "task_changes_insert" in names:
+        return
+    connection.exec_driver_sql(
+        "INSERT OR IGNORE INTO task_change_sequence(id, value, compacted_seq) VALUES (1, 0, 0)"
+    )
+    connection.exec_driver_sql("UPDATE tasks SET change_seq = id WHERE change_seq IS NULL")
+    connection.exec_driver_sql(
+        "UPDATE task_change_sequence "
+        "SET value = max(value, coalesce((SELECT max(change_seq) FROM tasks), 0)) WHERE id = 1"
+    )
+    for statement in TASK_CHANGES_TRIGGERS:
+        connection.exec_driver_sql(statement)
+
+
+def install_task_changes(*tables: Table) -> None:
+    """
+    Create the change triggers as soon as the tables they need exist.
+
+    Args:
+        *tables (Table): The tasks, task_tombstones and task_change_sequence tables
+    """
+    for table in tables:
+        event.listen(
+            table, "after_create",
+            lambda target, connection, **kw: create_task_changes_triggers(connection),
+        )
+
+
+def compact_tombstones(connection: Connection, retention_days: int) -> int:
+    """
+    Remove tombstones older than the retention window.
+
+    Args:
+        connection (Connection): Connection to run the statements on
+        retention_days (int): Days tombstones are kept
+
+    Returns:
+        int: Number of tombstones removed
+    """
+    cutoff = {"cutoff": f"-{retention_days} days"}
+    horizon = connection.execute(text(
+        "SELECT max(change_seq) FROM task_tombstones "
+        "WHERE deleted_at < datetime('now', :cutoff)"
+    ), cutoff).scalar()
+    if horizon is None:
+        return 0
+    connection.execute(text(
+        "UPDATE task_change_sequence SET compacted_seq = max(compacted_seq, :horizon) "
+        "WHERE id = 1"
+    ), {"horizon": horizon})
+    return connection.execute(text(
+        "DELETE FROM task_tombstones WHERE change_seq <= :horizon"
+    ), {"horizon": horizon}).rowcount
+
+
+def main() -> None:
+    from app.core.config import settings
+    from app.db.base import get_shard_engines
+
+    parser = argparse.ArgumentParser(description="Remove expired task tombstones.")
+    parser.add_argument(
+        "--retention-days", type=int, default=settings.TASKS_TOMBSTONE_RETENTION_DAYS,
+        help="days tombstones are kept",
+    )
+    args = parser.parse_args()
+
+    removed = 0
+    for engine in get_shard_engines():
+        with engine.begin() as connection:
+            removed += compact_tombstones(connection, args.retention_days)
+    print(json.dumps({"removed_tombstones": removed}))
+
+
+if __name__ == "__main__":
+    main()
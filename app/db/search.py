@@ -0,0 +1,103 @@
+# app/db/search.py
+"""
+SQLite FTS5 full-text index over task descriptions.
+
+``tasks_fts`` is an external-content FTS5 table: it stores only the index
+and reads descriptions back from ``tasks`` by rowid. Triggers on ``tasks``
+keep it in sync, so ORM, Core and bulk writes are all indexed.
+"""
+import re
+from typing import Optional
+
+from sqlalchemy import Table, event
+from sqlalchemy.engine import Connection
+
+TASKS_FTS_TABLE = "tasks_fts"
+
+TASKS_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE {TASKS_FTS_TABLE} USING fts5("
+    "description, content='tasks', content_rowid='id', tokenize='unicode61')",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO {TASKS_FTS_TABLE}(rowid, description) VALUES (new.id, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO {TASKS_FTS_TABLE}({TASKS_FTS_TABLE}, rowid, description)
+        VALUES ('delete', old.id, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF description ON tasks BEGIN
+        INSERT INTO {TASKS_FTS_TABLE}({TASKS_FTS_TABLE}, rowid, description)
+        VALUES ('delete', old.id, old.description);
+        INSERT INTO {TASKS_FTS_TABLE}(rowid, description) VALUES (new.id, new.description);
+    END""",
+)
+
+# Words, optionally followed by * for a prefix search
+_TERM_RE = re.compile(r"(\w+)(\*?)")
+
+
+def create_task_search(connection: Connection) -> None:
+    """
+    Create the FTS table and its triggers unless they exist.
+
+    A newly created index is rebuilt from the rows already in ``tasks``,
+    so this also upgrades databases created before search existed.
+
+    Args:
+        connection (Connection): Connection to run the DDL on
+    """
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (TASKS_FTS_TABLE,),
+    ).first()
+    if exists:
+        return
+    for statement in TASKS_FTS_DDL:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql(
+        f"INSERT INTO {TASKS_FTS_TABLE}({TASKS_FTS_TABLE}) VALUES ('rebuild')"
+    )
+
+
+def drop_task_search(connection: Connection) -> None:
+    """
+    Drop the FTS table; its triggers go away with the tasks table.
+
+    Args:
+        connection (Connection): Connection to run the DDL on
+    """
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {TASKS_FTS_TABLE}")
+
+
+def install_task_search(tasks_table: Table) -> None:
+    """
+    Create and drop the search index together with the tasks table.
+
+    Args:
+        tasks_table (Table): The tasks table
+    """
+    event.listen(
+        tasks_table, "after_create",
+        lambda target, connection, **kw: create_task_search(connection),
+    )
+    event.listen(
+        tasks_table, "before_drop",
+        lambda target, connection, **kw: drop_task_search(connection),
+    )
+
+
+def build_match_query(text: str) -> Optional[str]:
+    """
+    Turn user input into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted term, so FTS5 operators and punctuation in
+    the input are never interpreted. A trailing ``*`` makes a term a prefix
+    search. All terms must match.
+
+    Args:
+        text (str): Search input, e.g. ``"buy mil*"``
+
+    Returns:
+        Optional[str]: MATCH expression, or None if the input has no words
+    """
+    terms = [f'"{word}"{star}' for word, star in _TERM_RE.findall(text)]
+    return " ".join(terms) or None
@@ -0,0 +1,399 @@
+# app/db/shards.py
+"""
+Users sharded over several SQLite files, and moving users between them.
+
+Every task query is scoped by user, so a user's tasks, counters, imports
+and change history can live in a database file of its own, each with its
+own writer lock. Shard 0 is the main database (SQLITE_URL), which also
+holds every user's account, refresh tokens and the ``user_shards`` map;
+DB_SHARD_URLS adds shards 1, 2, ... with the same schema. A user without a
+map row lives in shard 0, so enabling sharding moves nothing. Other shards
+hold a stub ``users`` row per user (no password) for the foreign keys and
+the tasks version.
+
+Task ids come from a per-shard range of TASK_ID_SPAN ids
+(``reserve_task_ids``), so they are unique across shards and moved tasks
+keep their id.
+
+Moving users (``move_users``) first marks them as moving, so requests for
+them are refused, and waits for the user caches of running workers to
+expire. Their rows are then copied to the target shard with change
+sequence numbers above any the source handed out, so delta sync clients
+see every moved task and tombstone as changed, the map is switched, and
+the source rows are removed. A move interrupted before the switch is
+redone from scratch by running it again.
+
+Usage:
+    python -m app.db.shards status
+    python -m app.db.shards move USER_ID SHARD [--wait SECONDS]
+    python -m app.db.shards rebalance [--dry-run] [--wait SECONDS]
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import Table, delete, event, func, insert, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.changes import reserve_change_seqs
+from app.models.shard import UserShard
+from app.models.task import Task
+from app.models.task_change import TaskChangeSequence, TaskTombstone
+from app.models.task_import import TaskImport
+from app.models.user import User
+from app.models.user_task_stats import UserTaskStats
+
+# Task ids handed out by shard N start at N * TASK_ID_SPAN
+TASK_ID_SPAN = 1 << 40
+
+# Both tables must exist before the sequence row can be created
+TASK_ID_TABLES = ("tasks", "task_id_sequence")
+
+# Rows copied per statement when moving a user
+MOVE_BATCH_SIZE = 5000
+
+users_table = User.__table__
+user_shards_table = UserShard.__table__
+tasks_table = Task.__table__
+tombstones_table = TaskTombstone.__table__
+task_imports_table = TaskImport.__table__
+stats_table = UserTaskStats.__table__
+sequence_table = TaskChangeSequence.__table__
+
+
+def create_task_id_sequence(connection: Connection) -> None:
+    """
+    Create the task id sequence row once both tables exist.
+
+    The sequence continues after the highest existing task id.
+
+    Args:
+        connection (Connection): Connection to run the statements on
+    """
+    names = {
+        row[0] for row in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+    if set(TASK_ID_TABLES) <= names:
+        connection.exec_driver_sql(
+            "INSERT OR IGNORE INTO task_id_sequence(id, value) "
+            "SELECT 1, coalesce(max(id), 0) FROM tasks"
+        )
+
+
+def install_task_id_sequence(*tables: Table) -> None:
+    """
+    Create the task id sequence row as soon as the tables it needs exist.
+
+    Args:
+        *tables (Table): The tasks and task_id_sequence tables
+    """
+    for table in tables:
+        event.listen(
+            table, "after_create",
+            lambda target, connection, **kw: create_task_id_sequence(connection),
+        )
+
+
+def start_task_id_range(connection: Connection, shard: int) -> None:
+    """
+    Move a shard's task id sequence into the shard's range, if still below it.
+
+    Args:
+        connection (Connection): Connection to the shard's database
+        shard (int): Shard index
+    """
+    create_task_id_sequence(connection)
+    connection.execute(text(
+        "UPDATE task_id_sequence SET value = max(value, :start) WHERE id = 1"
+    ), {"start": shard * TASK_ID_SPAN})
+
+
+def reserve_task_ids(connection: Connection, count: int) -> int:
+    """
+    Reserve ``count`` consecutive task ids.
+
+    Args:
+        connection (Connection): Connection inside the inserting transaction
+        count (int): Ids needed
+
+    Returns:
+        int: First reserved id
+    """
+    last = connection.execute(text(
+        "UPDATE task_id_sequence SET value = value + :count WHERE id = 1 RETURNING value"
+    ), {"count": count}).scalar_one()
+    return last - count + 1
+
+
+def get_shard_map(connection: Connection) -> Dict[int, Tuple[int, bool]]:
+    """
+    Read where every user lives.
+
+    Args:
+        connection (Connection): Connection to the main database
+
+    Returns:
+        Dict[int, Tuple[int, bool]]: Shard and moving flag by user id
+    """
+    rows = connection.execute(
+        select(users_table.c.id, user_shards_table.c.shard, user_shards_table.c.moving)
+        .select_from(users_table.outerjoin(
+            user_shards_table, user_shards_table.c.user_id == users_table.c.id
+        ))
+    )
+    return {user_id: (shard or 0, bool(moving)) for user_id, shard, moving in rows}
+
+
+def check_shard_map(connection: Connection, shard_count: int) -> None:
+    """
+    Check that every shard a user is mapped to is configured.
+
+    Args:
+        connection (Connection): Connection to the main database
+        shard_count (int): Number of configured shards
+
+    Raises:
+        ValueError: If users live in shards that are not configured
+    """
+    missing = connection.execute(
+        select(user_shards_table.c.shard).distinct()
+        .where(user_shards_table.c.shard >= shard_count)
+    ).scalars().all()
+    if missing:
+        raise ValueError(
+            f"users live in shards {sorted(missing)} but DB_SHARD_URLS configures "
+            f"only {shard_count - 1} extra shards"
+        )
+
+
+def _set_shard(connection: Connection, user_id: int, shard: int, moving: bool) -> None:
+    connection.execute(
+        sqlite_insert(user_shards_table)
+        .values(user_id=user_id, shard=shard, moving=moving)
+        .on_conflict_do_update(
+            index_elements=["user_id"], set_={"shard": shard, "moving": moving}
+        )
+    )
+
+
+def _remove_user_data(connection: Connection, user_id: int, keep_user: bool) -> None:
+    """Delete a user's task data from a shard, and its stub user row unless kept."""
+    connection.execute(delete(tasks_table).where(tasks_table.c.user_id == user_id))
+    # Deleting tasks left tombstones and zeroed counters behind
+    connection.execute(delete(tombstones_table).where(tombstones_table.c.user_id == user_id))
+    connection.execute(delete(task_imports_table).where(task_imports_table.c.user_id == user_id))
+    connection.execute(delete(stats_table).where(stats_table.c.user_id == user_id))
+    if not keep_user:
+        connection.execute(delete(users_table).where(users_table.c.id == user_id))
+
+
+def _copy_user(
+        source: Connection, target: Connection, user_id: int, username: str, to_main: bool
+) -> Dict[str, int]:
+    """Copy a user's task data between shards; the target must hold none of it."""
+    tasks_version = source.execute(
+        select(users_table.c.tasks_version).where(users_table.c.id == user_id)
+    ).scalar() or 0
+    # The collection changes for the client, so its version must too
+    if to_main:
+        target.execute(
+            update(users_table).where(users_table.c.id == user_id)
+            .values(tasks_version=func.max(users_table.c.tasks_version, tasks_version) + 1)
+        )
+    else:
+        target.execute(insert(users_table).values(
+            id=user_id, username=username, hashed_password=None,
+            tasks_version=tasks_version + 1,
+        ))
+
+    # Renumber every moved row above any number the source handed out, so
+    # sync cursors from the source still see all of them as changed
+    source_seq = source.execute(
+        select(sequence_table.c.value).where(sequence_table.c.id == 1)
+    ).scalar() or 0
+    target.execute(
+        update(sequence_table).where(sequence_table.c.id == 1)
+        .values(value=func.max(sequence_table.c.value, source_seq))
+    )
+
+    task_columns = [column for column in tasks_table.c if column.name != "change_seq"]
+    tasks = source.execute(
+        select(*task_columns).where(tasks_table.c.user_id == user_id)
+        .execution_options(yield_per=MOVE_BATCH_SIZE)
+    )
+    copied = {"tasks": 0, "tombstones": 0, "imports": 0}
+    for rows in tasks.partitions():
+        first_seq = reserve_change_seqs(target, len(rows))
+        target.execute(insert(tasks_table), [
+            {**row._mapping, "change_seq": first_seq + i} for i, row in enumerate(rows)
+        ])
+        copied["tasks"] += len(rows)
+
+    tombstones = source.execute(
+        select(tombstones_table.c.task_id, tombstones_table.c.user_id,
+               tombstones_table.c.deleted_at)
+        .where(tombstones_table.c.user_id == user_id)
+        .execution_options(yield_per=MOVE_BATCH_SIZE)
+    )
+    for rows in tombstones.partitions():
+        first_seq = reserve_change_seqs(target, len(rows))
+        target.execute(insert(tombstones_table), [
+            {**row._mapping, "change_seq": first_seq + i} for i, row in enumerate(rows)
+        ])
+        copied["tombstones"] += len(rows)
+
+    imports = source.execute(
+        select(task_imports_table.c.user_id, task_imports_table.c.import_key,
+               task_imports_table.c.checkpoint)
+        .where(task_imports_table.c.user_id == user_id)
+    ).all()
+    if imports:
+        target.execute(insert(task_imports_table), [dict(row._mapping) for row in imports])
+        copied["imports"] = len(imports)
+    return copied
+
+
+def move_users(
+        main: Engine,
+        shards: Sequence[Engine],
+        moves: Dict[int, int],
+        wait_seconds: float = 0.0,
+        sleep: Callable[[float], None] = time.sleep,
+) -> List[dict]:
+    """
+    Move users to other shards.
+
+    Args:
+        main (Engine): Engine of the main database (shard 0)
+        shards (Sequence[Engine]): Engine of every shard, by index
+        moves (Dict[int, int]): Target shard by user id
+        wait_seconds (float): Time to wait after marking the users as moving,
+            for cached shard lookups of running workers to expire
+        sleep (Callable[[float], None]): Waits, replaced in tests
+
+    Returns:
+        List[dict]: User, source and target shard and rows copied per move
+
+    Raises:
+        ValueError: If a user or a shard does not exist
+    """
+    if not moves:
+        return []
+    for target in moves.values():
+        if not 0 <= target < len(shards):
+            raise ValueError(f"no shard {target}")
+    with main.begin() as connection:
+        shard_map = get_shard_map(connection)
+        usernames = dict(connection.execute(
+            select(users_table.c.id, users_table.c.username)
+            .where(users_table.c.id.in_(list(moves)))
+        ).all())
+        for user_id in moves:
+            if user_id not in usernames:
+                raise ValueError(f"no user {user_id}")
+            _set_shard(connection, user_id, shard_map[user_id][0], True)
+    if wait_seconds > 0:
+        sleep(wait_seconds)
+
+    results = []
+    for user_id, target in moves.items():
+        source = shard_map[user_id][0]
+        result = {"user_id": user_id, "from": source, "to": target}
+        if source != target:
+            with shards[source].connect() as src, shards[target].begin() as dst:
+                # Leftovers of an interrupted move to the same target
+                _remove_user_data(dst, user_id, keep_user=target == 0)
+                result.update(_copy_user(src, dst, user_id, usernames[user_id], target == 0))
+        with main.begin() as connection:
+            _set_shard(connection, user_id, target, False)
+        if source != target:
+            with shards[source].begin() as src:
+                _remove_user_data(src, user_id, keep_user=source == 0)
+        results.append(result)
+    return results
+
+
+def plan_rebalance(shard_map: Dict[int, Tuple[int, bool]], shard_count: int) -> Dict[int, int]:
+    """
+    Choose moves leaving every shard with the same number of users, give or take one.
+
+    Users are moved from the fullest shard to the emptiest one, newest first.
+
+    Args:
+        shard_map (Dict[int, Tuple[int, bool]]): Shard and moving flag by user id
+        shard_count (int): Number of shards
+
+    Returns:
+        Dict[int, int]: Target shard by user id
+
+    Raises:
+        ValueError: If users live in a shard that is no longer configured
+    """
+    users: Dict[int, List[int]] = defaultdict(list)
+    for user_id, (shard, _) in sorted(shard_map.items()):
+        if shard >= shard_count:
+            raise ValueError(f"user {user_id} lives in unconfigured shard {shard}")
+        users[shard].append(user_id)
+    moves: Dict[int, int] = {}
+    while True:
+        counts = [len(users[shard]) for shard in range(shard_count)]
+        fullest = max(range(shard_count), key=counts.__getitem__)
+        emptiest = min(range(shard_count), key=counts.__getitem__)
+        if counts[fullest] - counts[emptiest] <= 1:
+            return moves
+        user_id = users[fullest].pop()
+        users[emptiest].append(user_id)
+        moves[user_id] = emptiest
+
+
+def main() -> None:
+    from app.core.config import settings
+    from app.db.base import get_engine, get_shard_engines, init_database
+
+    parser = argparse.ArgumentParser(description="Inspect and rebalance user shards.")
+    parser.add_argument(
+        "--wait", type=float, default=settings.USER_CACHE_TTL_SECONDS + 1,
+        help="seconds to wait for running workers to see users as moving",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="count users per shard")
+    move = commands.add_parser("move", help="move one user")
+    move.add_argument("user_id", type=int)
+    move.add_argument("shard", type=int)
+    rebalance = commands.add_parser("rebalance", help="even out users per shard")
+    rebalance.add_argument("--dry-run", action="store_true", help="only print the moves")
+    args = parser.parse_args()
+
+    init_database()
+    shards = get_shard_engines()
+    with get_engine().connect() as connection:
+        shard_map = get_shard_map(connection)
+
+    if args.command == "status":
+        counts: Dict[int, int] = defaultdict(int)
+        for shard, moving in shard_map.values():
+            counts[shard] += 1
+        print(json.dumps({
+            "shards": len(shards),
+            "users": {str(shard): counts[shard] for shard in sorted(counts)},
+            "moving": sorted(user_id for user_id, (_, moving) in shard_map.items() if moving),
+        }))
+        return
+    if args.command == "move":
+        moves = {args.user_id: args.shard}
+    else:
+        moves = plan_rebalance(shard_map, len(shards))
+        if args.dry_run:
+            print(json.dumps({"moves": moves}))
+            return
+    for result in move_users(get_engine(), shards, moves, args.wait):
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# app/db/slow_queries.py
+"""
+Slow query log with EXPLAIN QUERY PLAN capture.
+
+Engine events time every statement. Executions slower than the threshold
+are logged with the shape of their parameters (types and counts, never
+values). The first time a distinct statement runs, its query plan is
+captured and full table scans are flagged, so a query that lost its index
+shows up even while tables are still small enough for it to be fast.
+
+Entries are kept in memory for the admin endpoint and, with a log path,
+appended as JSON lines for the CLI report.
+
+Usage:
+    python -m app.db.slow_queries [--path FILE] [--top N]
+"""
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Statements EXPLAIN QUERY PLAN is run for
+_EXPLAINED_RE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+# A plan step reading every row of a table: "SCAN tasks", but not
+# "SCAN tasks USING INDEX ...", virtual tables or "SCAN CONSTANT ROW"
+_FULL_SCAN_RE = re.compile(r"^SCAN (\w+)$")
+
+
+def parameters_shape(parameters: Any, executemany: bool) -> Any:
+    """
+    Describe statement parameters without their values.
+
+    Args:
+        parameters: DBAPI parameters of the execution
+        executemany (bool): Whether ``parameters`` is a list of parameter sets
+
+    Returns:
+        Any: Type names in the parameters' structure, e.g. ``["int", "str"]``,
+            or the row count and the shape of the first row for executemany
+    """
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "row": parameters_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """
+    Find the tables a query plan reads in full.
+
+    Args:
+        plan (List[str]): Detail column of EXPLAIN QUERY PLAN
+
+    Returns:
+        List[str]: Scanned tables, leaving out SQLite's own catalog tables
+    """
+    return [match.group(1) for match in map(_FULL_SCAN_RE.match, plan)
+            if match and match.group(1) != "CONSTANT"
+            and not match.group(1).startswith("sqlite_")]
+
+
+class SlowQueryLog:
+    """
+    Per-statement record of slow executions and query plans.
+
+    Attributes:
+        threshold (float): Seconds above which an execution is slow
+        max_statements (int): Distinct statements tracked; the least recently
+            seen ones are dropped first
+        path (Optional[str]): JSON lines file entries are appended to
+    """
+
+    def __init__(self, threshold_ms: float, max_statements: int, path: Optional[str] = None):
+        self.threshold = threshold_ms / 1000
+        self.max_statements = max_statements
+        self.path = path
+        self._statements: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def instrument(self, engine: Engine) -> None:
+        """
+        Time the statements of an engine.
+
+        Args:
+            engine (Engine): Sync engine (``async_engine.sync_engine`` for aiosqlite)
+        """
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def uninstrument(self, engine: Engine) -> None:
+        """
+        Stop timing the statements of an engine.
+
+        Args:
+            engine (Engine): Engine passed to instrument
+        """
+        event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._slow_query_start
+        with self._lock:
+            entry = self._statements.get(statement)
+            if entry is not None:
+                self._statements.move_to_end(statement)
+        if entry is None:
+            entry = self._explain(conn, statement, parameters, executemany)
+        if elapsed >= self.threshold:
+            self._record_slow(entry, elapsed, parameters_shape(parameters, executemany))
+
+    def _explain(self, conn, statement: str, parameters: Any, executemany: bool) -> dict:
+        """Capture the plan of a newly seen statement and start tracking it."""
+        entry = {
+            "statement": statement,
+            "plan": [],
+            "full_scans": [],
+            "slow_count": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "last_parameters": None,
+        }
+        if _EXPLAINED_RE.match(statement):
+            if executemany:
+                parameters = parameters[0] if parameters else ()
+            try:
+                # A raw DBAPI cursor keeps this out of the engine events
+                cursor = conn.connection.dbapi_connection.cursor()
+                try:
+                    cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+                    entry["plan"] = [row[-1] for row in cursor.fetchall()]
+                finally:
+                    cursor.close()
+            except Exception as exc:
+                entry["plan_error"] = str(exc)
+            entry["full_scans"] = full_scans(entry["plan"])
+            if entry["full_scans"]:
+                logger.warning(
+                    "Full table scan of %s: %s", ", ".join(entry["full_scans"]), statement
+                )
+
+        with self._lock:
+            stored = self._statements.setdefault(statement, entry)
+            while len(self._statements) > self.max_statements:
+                self._statements.popitem(last=False)
+        if stored is entry:
+            self._append({"type": "plan", **{
+                key: entry[key] for key in ("statement", "plan", "full_scans")
+            }})
+        return stored
+
+    def _record_slow(self, entry: dict, elapsed: float, shape: Any) -> None:
+        elapsed_ms = round(elapsed * 1000, 3)
+        with self._lock:
+            entry["slow_count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["last_parameters"] = shape
+        logger.warning("Slow query (%.1f ms, parameters %s): %s", elapsed_ms, shape, entry["statement"])
+        self._append({
+            "type": "slow",
+            "statement": entry["statement"],
+            "ms": elapsed_ms,
+            "parameters": shape,
+            "timestamp": time.time(),
+        })
+
+    def _append(self, record: dict) -> None:
+        if self.path is None:
+            return
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def report(self) -> List[dict]:
+        """
+        List tracked statements, those with full scans first, then by slow time.
+
+        Returns:
+            List[dict]: Statement, plan, scanned tables and slow execution stats
+        """
+        with self._lock:
+            entries = [dict(entry) for entry in self._statements.values()]
+        return sort_report(entries)
+
+    def clear(self) -> None:
+        """Forget every tracked statement."""
+        with self._lock:
+            self._statements.clear()
+
+
+def sort_report(entries: List[dict]) -> List[dict]:
+    """Order report entries: full scans first, then by total slow time."""
+    return sorted(entries, key=lambda entry: (not entry["full_scans"], -entry["total_ms"]))
+
+
+def read_log(path: str) -> List[dict]:
+    """
+    Aggregate a JSON lines slow query log into report entries.
+
+    Args:
+        path (str): File written by SlowQueryLog
+
+    Returns:
+        List[dict]: Entries shaped like SlowQueryLog.report
+    """
+    entries: Dict[str, dict] = {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            entry = entries.setdefault(record["statement"], {
+                "statement": record["statement"],
+                "plan": [],
+                "full_scans": [],
+                "slow_count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "last_parameters": None,
+            })
+            if record["type"] == "plan":
+                entry["plan"] = record["plan"]
+                entry["full_scans"] = record["full_scans"]
+            else:
+                entry["slow_count"] += 1
+                entry["total_ms"] += record["ms"]
+                entry["max_ms"] = max(entry["max_ms"], record["ms"])
+                entry["last_parameters"] = record["parameters"]
+    return sort_report(list(entries.values()))
+
+
+def main() -> None:
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Summarize the slow query log.")
+    parser.add_argument(
+        "--path", default=settings.SLOW_QUERY_LOG_PATH,
+        help="log file (default: SLOW_QUERY_LOG_PATH)",
+    )
+    parser.add_argument("--top", type=int, default=20, help="statements to show")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("no log file: pass --path or set SLOW_QUERY_LOG_PATH")
+
+    entries = read_log(args.path)
+    for entry in entries[:args.top]:
+        print(json.dumps(entry))
+    print(json.dumps({
+        "statements": len(entries),
+        "with_full_scans": sum(1 for entry in entries if entry["full_scans"]),
+        "with_slow_executions": sum(1 for entry in entries if entry["slow_count"]),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# app/db/stats.py
+"""
+Incrementally maintained per-user task counters.
+
+Triggers on ``tasks`` adjust ``user_task_stats`` for every inserted, deleted
+or updated row, so ORM, Core, bulk and import writes all keep the counters
+current without any extra code on those paths. ``reconcile_task_stats``
+recomputes them from scratch.
+
+Usage:
+    python -m app.db.stats [--user-id ID]
+"""
+import argparse
+import json
+from typing import List, Optional
+
+from sqlalchemy import Table, event, text
+from sqlalchemy.engine import Connection
+
+# Both tables must exist before the triggers can be created
+STATS_TABLES = ("tasks", "user_task_stats")
+
+TASK_STATS_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS user_task_stats_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO user_task_stats(user_id, total, completed)
+        VALUES (new.user_id, 1, coalesce(new.completed, 0))
+        ON CONFLICT(user_id) DO UPDATE SET
+            total = total + 1, completed = completed + excluded.completed;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_task_stats_delete AFTER DELETE ON tasks BEGIN
+        UPDATE user_task_stats
+        SET total = total - 1, completed = completed - coalesce(old.completed, 0)
+        WHERE user_id = old.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_task_stats_update
+    AFTER UPDATE OF completed, user_id ON tasks BEGIN
+        UPDATE user_task_stats
+        SET total = total - 1, completed = completed - coalesce(old.completed, 0)
+        WHERE user_id = old.user_id;
+        INSERT INTO user_task_stats(user_id, total, completed)
+        VALUES (new.user_id, 1, coalesce(new.completed, 0))
+        ON CONFLICT(user_id) DO UPDATE SET
+            total = total + 1, completed = completed + excluded.completed;
+    END""",
+)
+
+# Counters as they should be, computed from the tasks themselves
+_ACTUAL_STATS_SQL = """
+    SELECT user_id, count(*) AS total, coalesce(sum(completed), 0) AS completed
+    FROM tasks WHERE user_id IS NOT NULL {where} GROUP BY user_id
+"""
+
+
+def create_task_stats_triggers(connection: Connection) -> None:
+    """
+    Create the counter triggers once both tables exist.
+
+    Counters of a database that had tasks before the triggers existed are
+    reconciled right away.
+
+    Args:
+        connection (Connection): Connection to run the DDL on
+    """
+    names = {
+        row[0] for row in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        )
+    }
+    if not set(STATS_TABLES) <= names or "user_task_stats_insert" in names:
+        return
+    for statement in TASK_STATS_TRIGGERS:
+        connection.exec_driver_sql(statement)
+    reconcile_task_stats(connection)
+
+
+def install_task_stats(*tables: Table) -> None:
+    """
+    Create the counter triggers as soon as the tables they need exist.
+
+    Args:
+        *tables (Table): The tasks and user_task_stats tables
+    """
+    for table in tables:
+        event.listen(
+            table, "after_create",
+            lambda target, connection, **kw: create_task_stats_triggers(connection),
+        )
+
+
+def reconcile_task_stats(connection: Connection, user_id: Optional[int] = None) -> List[dict]:
+    """
+    Recompute task counters from the tasks table.
+
+    Args:
+        connection (Connection): Connection to run the statements on
+        user_id (Optional[int]): Only reconcile this user
+
+    Returns:
+        List[dict]: Users whose stored counters were wrong, with the stored
+            and the actual values
+    """
+    where = "" if user_id is None else "AND user_id = :user_id"
+    params = {} if user_id is None else {"user_id": user_id}
+    user_filter = "" if user_id is None else "WHERE user_id = :user_id"
+
+    drift = [dict(row) for row in connection.execute(text(f"""
+        SELECT coalesce(actual.user_id, stored.user_id) AS user_id,
+               coalesce(stored.total, 0) AS stored_total,
+               coalesce(actual.total, 0) AS total,
+               coalesce(stored.completed, 0) AS stored_completed,
+               coalesce(actual.completed, 0) AS completed
+        FROM ({_ACTUAL_STATS_SQL.format(where=where)}) AS actual
+        FULL OUTER JOIN (SELECT * FROM user_task_stats {user_filter}) AS stored
+            ON stored.user_id = actual.user_id
+        WHERE coalesce(stored.total, 0) != coalesce(actual.total, 0)
+           OR coalesce(stored.completed, 0) != coalesce(actual.completed, 0)
+    """), params).mappings()]
+
+    connection.execute(text(f"DELETE FROM user_task_stats {user_filter}"), params)
+    connection.execute(text(
+        "INSERT INTO user_task_stats(user_id, total, completed) "
+        + _ACTUAL_STATS_SQL.format(where=where)
+    ), params)
+    return drift
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recompute per-user task counters.")
+    parser.add_argument("--user-id", type=int, help="only reconcile this user")
+    args = parser.parse_args()
+
+    from app.db.base import get_shard_engines
+
+    drifted = 0
+    for shard, engine in enumerate(get_shard_engines()):
+        with engine.begin() as connection:
+            drift = reconcile_task_stats(connection, args.user_id)
+        for row in drift:
+            print(json.dumps({"shard": shard, **row}))
+        drifted += len(drift)
+    print(json.dumps({"reconciled": True, "drifted_users": drifted}))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,184 @@
 Main application module.
 Creates and configures the FastAPI application.
 """
+import time
+
+# Everything imported below counts towards the import time of the startup report
+_IMPORT_STARTED = time.perf_counter()
+
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from .api.endpoints import admin, auth, debug, tasks
 from .core.config import settings
+from .core.errors import HashingBusyError, hashing_busy_handler, rate_limited_handler
+from .core.events import EventBroker, InProcessBroker
+from .core.metrics import REGISTRY, cache_families, install_metrics, instrument_pool, pool_families
+from .core.lazy import init_timings
+from .core.ratelimit import (
+    RATE_LIMIT_HEADERS,
+    MemoryRateLimitStore,
+    RateLimitedError,
+    RateLimitMiddleware,
+    RateLimitStore,
+    ip_limit,
+)
+from .core.profiling import SlowRequestLog, install_profiling, instrument_engine
+from .core.responses import load_orjson
+from .core.security import shutdown_hash_executor, start_hash_executor, token_cache
+from .crud.refresh_token import delete_expired_refresh_tokens
+from .crud.user import negative_username_cache, user_cache, username_filter
+from .db.base import (
+    dispose_engines,
+    get_async_engine,
+    get_engine,
+    get_session_factory,
+    get_shard,
+    get_shard_count,
+    get_shard_engines,
+    init_database,
+    max_overflow,
+    pool_size,
+)
+from .db.changes import compact_tombstones
+from .db.shards import check_shard_map
+from sqlalchemy.engine import Engine
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+logger = logging.getLogger(__name__)
+
+
+def active_engines() -> Dict[str, Engine]:
+    """
+    Sync engines in use by label: "sync", plus "async" when DB_ASYNC is
+    enabled, and "shardN" / "shardN_async" for the extra shards.
+    """
+    engines = {"sync": get_engine()}
+    async_engine = get_async_engine()
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+    for index in range(1, get_shard_count()):
+        shard = get_shard(index)
+        engines[f"shard{index}"] = shard.engine
+        if shard.async_engine is not None:
+            engines[f"shard{index}_async"] = shard.async_engine.sync_engine
+    return engines
+
+
+def pool_capacities() -> Dict[str, Tuple[Engine, int]]:
+    """Engines in use with the capacity of their pools, for the pool metrics."""
+    return {
+        label: (engine, pool_size + max_overflow) for label, engine in active_engines().items()
+    }
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Start and stop the application's shared resources.
+
+    Engines and the crypt context are created on first use; startup only
+    forces what every worker needs anyway and times each stage. The report
+    is logged and kept on ``app.state.startup_report``.
+
+    Args:
+        app: Application being served
+    """
+    stages: Dict[str, float] = {}
+    started = time.perf_counter()
+
+    def stage(name: str, stage_started: float) -> float:
+        now = time.perf_counter()
+        stages[name] = round((now - stage_started) * 1000, 2)
+        return now
+
+    engines = active_engines()
+    for label, engine in engines.items():
+        if settings.PROFILING_ENABLED:
+            instrument_engine(engine)
+        if settings.METRICS_ENABLED:
+            instrument_pool(engine, label)
+    now = stage("engines", started)
+    init_database()
+    now = stage("init_database", now)
+    with get_engine().connect() as connection:
+        # Refuse to serve users whose shard was removed from DB_SHARD_URLS
+        check_shard_map(connection, get_shard_count())
+    now = stage("check_shards", now)
+    for engine in get_shard_engines():
+        with engine.begin() as connection:
+            compact_tombstones(connection, settings.TASKS_TOMBSTONE_RETENTION_DAYS)
+    now = stage("compact_tombstones", now)
+    with get_session_factory()() as db:
+        delete_expired_refresh_tokens(db)
+    now = stage("prune_refresh_tokens", now)
+    if settings.USERNAME_FILTER_ENABLED:
+        with get_session_factory()() as db:
+            username_filter.load(db)
+        now = stage("username_filter", now)
+    # Spawns hashing workers in the background; the first login no longer waits
+    start_hash_executor()
+    now = stage("hash_pool", now)
+
+    app.state.startup_report = {
+        "import_ms": round(IMPORT_SECONDS * 1000, 2),
+        "startup_ms": round((now - started) * 1000, 2),
+        "stages_ms": stages,
+        "lazy_init_ms": {
+            name: round(seconds * 1000, 2) for name, seconds in init_timings.items()
+        },
+    }
+    logger.info("Startup report: %s", json.dumps(app.state.startup_report))
+    try:
+        yield
+    finally:
+        shutdown_hash_executor()
+        await dispose_engines()
 
-def create_application() -> FastAPI:
+
+def create_application(
+        event_broker: Optional[EventBroker] = None,
+        rate_limit_store: Optional[RateLimitStore] = None,
+) -> FastAPI:
     """
     Factory function that creates and configures the FastAPI application.
+
+    Args:
+        event_broker: Broker for task change events; defaults to an
+            in-process broker, which only reaches clients of this worker
+        rate_limit_store: Token buckets of the login and registration rate
+            limits; defaults to an in-process store, local to this worker
+
+    Raises:
+        RuntimeError: If TASKS_FAST_JSON is enabled without orjson installed
     """
+    if settings.TASKS_FAST_JSON:
+        # Fail at startup rather than on the first task list
+        load_orjson()
     app = FastAPI(
         title=settings.PROJECT_NAME,
-        openapi_url=f"{settings.API_V1_STR}/openapi.json"
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        lifespan=lifespan,
+    )
+    app.state.event_broker = event_broker or InProcessBroker(settings.EVENTS_QUEUE_SIZE)
+    app.state.rate_limit_store = rate_limit_store or MemoryRateLimitStore(
+        settings.RATE_LIMIT_SHARDS, settings.RATE_LIMIT_MAX_KEYS
     )
 
+    if settings.RATE_LIMIT_ENABLED:
+        # Rejects before the body is read, so before any hashing or database work.
+        # Added before CORS so its 429 responses still carry the CORS headers
+        app.add_middleware(
+            RateLimitMiddleware,
+            store=app.state.rate_limit_store,
+            paths=[f"{settings.API_V1_STR}/login", f"{settings.API_V1_STR}/register"],
+            limit=ip_limit,
+        )
+
     # Set all CORS enabled origins
     app.add_middleware(
         CORSMiddleware,
@@ -22,10 +187,39 @@ def create_application() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Let browser clients read the rate limit headers of 429 responses
+        expose_headers=list(RATE_LIMIT_HEADERS),
+    )
+
+    app.add_exception_handler(HashingBusyError, hashing_busy_handler)
+    app.add_exception_handler(RateLimitedError, rate_limited_handler)
+
+    app.include_router(auth.router, prefix=settings.API_V1_STR, tags=["auth"])
+    app.include_router(
+        tasks.router, prefix=f"{settings.API_V1_STR}/tasks", tags=["tasks"]
     )
+    app.include_router(
+        admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["admin"]
+    )
+
+    if settings.PROFILING_ENABLED:
+        app.state.slow_requests = SlowRequestLog(settings.PROFILING_SLOW_REQUESTS)
+        app.include_router(
+            debug.router, prefix=f"{settings.API_V1_STR}/debug", tags=["debug"]
+        )
+        install_profiling(app, app.state.slow_requests)
+
+    if settings.METRICS_ENABLED:
+        install_metrics(app)
+        REGISTRY.register_collector("db_pool", lambda: pool_families(pool_capacities()))
+        REGISTRY.register_collector(
+            "caches", lambda: cache_families({
+                "token": token_cache,
+                "user": user_cache,
+                "username_negative": negative_username_cache,
+            })
+        )
 
-    # Add API routes here later
-    
     @app.get("/")
     async def root():
         return {"message": "Welcome to Task Management System API"}
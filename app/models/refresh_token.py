@@ -0,0 +1,38 @@
+"""
+Refresh token database model.
+Defines the structure of the refresh_tokens table in the database.
+"""
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+
+from ..db.base_class import Base
+
+
+class RefreshToken(Base):
+    """
+    Refresh token model. Only a SHA-256 hash of the token is stored.
+
+    Each use rotates the token: the presented row is revoked and a new one is
+    issued in the same family. Presenting a revoked token again means it
+    leaked, so the whole family is revoked.
+
+    Attributes:
+        id (int): Primary key
+        token_hash (str): SHA-256 hex digest of the token
+        family_id (str): Identifier shared by all rotations of one login
+        user_id (int): Foreign key to users table
+        expires_at (datetime): Expiry time (naive UTC)
+        revoked (bool): Whether the token was used or revoked
+        owner (relationship): Relationship to User object
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String, unique=True, index=True, nullable=False)
+    family_id = Column(String, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked = Column(Boolean, default=False, nullable=False)
+
+    # Relationship with User model
+    owner = relationship("User", back_populates="refresh_tokens")
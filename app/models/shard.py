@@ -0,0 +1,46 @@
+"""
+Sharding database models.
+Defines the user_shards and task_id_sequence tables in the database.
+"""
+from sqlalchemy import Boolean, CheckConstraint, Column, ForeignKey, Integer
+
+from ..db.base_class import Base
+
+
+class UserShard(Base):
+    """
+    Shard holding a user's tasks, kept in the main database.
+
+    Users without a row live in shard 0, the main database itself.
+
+    Attributes:
+        user_id (int): Primary key, foreign key to users table
+        shard (int): Index of the shard (see app.db.shards)
+        moving (bool): Set while the user's tasks are being moved to another
+            shard; their requests are refused until the move completes
+    """
+    __tablename__ = "user_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    shard = Column(Integer, nullable=False, index=True)
+    moving = Column(Boolean, nullable=False, default=False)
+
+
+class TaskIdSequence(Base):
+    """
+    Single-row table handing out task ids, one range per shard.
+
+    Task ids stay unique across shards, so tasks keep their id when their
+    owner is moved to another shard.
+
+    Attributes:
+        id (int): Primary key, always 1
+        value (int): Last task id handed out
+    """
+    __tablename__ = "task_id_sequence"
+    __table_args__ = (
+        CheckConstraint("id = 1"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
@@ -2,10 +2,10 @@
 Task database model.
 Defines the structure of the tasks table in the database.
 """
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
-from ..db.base import Base
+from ..db.base_class import Base
 
 
 class Task(Base):
@@ -17,14 +17,30 @@ class Task(Base):
         description (str): Task description
         completed (bool): Task completion status
         user_id (int): Foreign key to users table
+        version (int): Row version, bumped on every update; also used by the
+            ORM to reject updates and deletes of a row changed concurrently
+        change_seq (int): Global change sequence number of the last change,
+            set by a trigger (see app.db.changes)
         owner (relationship): Relationship to User object
+
+    Listing is keyset-paginated on (user_id, id), so both indexes below end in
+    ``id``: page N is a range scan starting at the cursor, just like page 1.
     """
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_user_id_id", "user_id", "id"),
+        Index("ix_tasks_user_id_completed_id", "user_id", "completed", "id"),
+        Index("ix_tasks_user_id_change_seq", "user_id", "change_seq"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     description = Column(String, index=True)
     completed = Column(Boolean, default=False)
     user_id = Column(Integer, ForeignKey("users.id"))
+    version = Column(Integer, nullable=False, default=1)
+    change_seq = Column(Integer)
 
     # Relationship with User model
     owner = relationship("User", back_populates="tasks")
+
+    __mapper_args__ = {"version_id_col": version}
@@ -0,0 +1,51 @@
+"""
+Task change tracking database models.
+Defines the task_tombstones and task_change_sequence tables in the database.
+"""
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, CheckConstraint
+
+from ..db.base_class import Base
+
+
+class TaskTombstone(Base):
+    """
+    Marker left behind by a deleted task so delta sync can report the deletion.
+
+    Tombstones are written by a trigger and removed once they are older than
+    the retention window.
+
+    Attributes:
+        task_id (int): Primary key, id of the deleted task
+        user_id (int): Foreign key to users table
+        change_seq (int): Change sequence number of the deletion
+        deleted_at (datetime): Deletion time (UTC)
+    """
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_user_id_change_seq", "user_id", "change_seq"),
+    )
+
+    task_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, index=True)
+
+
+class TaskChangeSequence(Base):
+    """
+    Single-row table holding the global task change sequence.
+
+    Attributes:
+        id (int): Primary key, always 1
+        value (int): Last change sequence number handed out
+        compacted_seq (int): Highest sequence number of a removed tombstone;
+            cursors below it can no longer be served
+    """
+    __tablename__ = "task_change_sequence"
+    __table_args__ = (
+        CheckConstraint("id = 1"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    compacted_seq = Column(Integer, nullable=False, default=0)
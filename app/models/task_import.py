@@ -0,0 +1,32 @@
+"""
+Task import checkpoint database model.
+Defines the structure of the task_imports table in the database.
+"""
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
+
+from ..db.base_class import Base
+
+
+class TaskImport(Base):
+    """
+    Progress of a resumable task import, identified by a client-chosen key.
+
+    The checkpoint is written in the same transaction as each inserted batch,
+    so a retried import with the same key continues after the last committed
+    line without duplicating tasks.
+
+    Attributes:
+        id (int): Primary key
+        user_id (int): Foreign key to users table
+        import_key (str): Client-chosen key of the import
+        checkpoint (int): Last input line already processed
+    """
+    __tablename__ = "task_imports"
+    __table_args__ = (
+        UniqueConstraint("user_id", "import_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    import_key = Column(String, nullable=False)
+    checkpoint = Column(Integer, nullable=False, default=0)
@@ -5,12 +5,9 @@ Defines the structure of the users table in the database.
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.hybrid import hybrid_property
-from passlib.context import CryptContext
 
-from ..db.base import Base
-
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from ..core import hashing
+from ..db.base_class import Base
 
 
 class User(Base):
@@ -21,16 +18,22 @@ class User(Base):
         id (int): Primary key
         username (str): Unique username
         hashed_password (str): Bcrypt hashed password
+        tasks_version (int): Counter bumped by every change to the user's tasks
         tasks (relationship): Relationship to associated Task objects
+        refresh_tokens (relationship): Relationship to issued RefreshToken objects
     """
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)
+    tasks_version = Column(Integer, nullable=False, default=0)
 
     # Relationship with Task model (will be defined later)
     tasks = relationship("Task", back_populates="owner", cascade="all, delete-orphan")
+    refresh_tokens = relationship(
+        "RefreshToken", back_populates="owner", cascade="all, delete-orphan"
+    )
 
     @hybrid_property
     def password(self):
@@ -40,7 +43,7 @@ class User(Base):
     @password.setter
     def password(self, password: str):
         """Hash password on set."""
-        self.hashed_password = pwd_context.hash(password)
+        self.hashed_password = hashing.get_password_hash(password)
 
     def verify_password(self, password: str) -> bool:
         """Verify password against hash.
@@ -51,4 +54,4 @@ class User(Base):
         Returns:
             bool: True if password matches, False otherwise
         """
-        return pwd_context.verify(password, self.hashed_password) 
+        return hashing.verify_password(password, self.hashed_password) 
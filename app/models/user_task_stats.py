@@ -0,0 +1,23 @@
+"""
+User task statistics database model.
+Defines the structure of the user_task_stats table in the database.
+"""
+from sqlalchemy import Column, Integer, ForeignKey
+
+from ..db.base_class import Base
+
+
+class UserTaskStats(Base):
+    """
+    Task counters of one user, kept current by triggers on the tasks table.
+
+    Attributes:
+        user_id (int): Primary key, foreign key to users table
+        total (int): Number of tasks
+        completed (int): Number of completed tasks
+    """
+    __tablename__ = "user_task_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
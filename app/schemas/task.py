@@ -2,7 +2,8 @@
 """
 Pydantic schemas for task data validation and serialization.
 """
-from pydantic import BaseModel, validator
+from typing import List, Literal, Optional
+from pydantic import BaseModel, root_validator, validator
 
 class TaskBase(BaseModel):
     """Base task schema with common attributes."""
@@ -24,6 +25,13 @@ class TaskUpdate(BaseModel):
     description: str | None = None
     completed: bool | None = None
 
+    @validator('description')
+    def description_not_empty(cls, v):
+        """Validate description is not empty, when given."""
+        if v is None:
+            return v
+        return TaskBase.description_not_empty(v)
+
 class Task(TaskBase):
     """Schema for task responses."""
     id: int
@@ -33,3 +41,61 @@ class Task(TaskBase):
     class Config:
         """Pydantic configuration."""
         orm_mode = True
+
+class TaskBulkUpdate(TaskUpdate):
+    """Schema for one item of a bulk task update."""
+    id: int
+
+    @root_validator(skip_on_failure=True)
+    def fields_given(cls, values):
+        """Validate the item updates at least one field."""
+        if values.get("description") is None and values.get("completed") is None:
+            raise ValueError("Item must update description or completed")
+        return values
+
+class TaskBulkResult(BaseModel):
+    """Schema for the outcome of one item of a bulk task operation."""
+    id: int
+    status: Literal["created", "updated", "deleted", "not_found"]
+    task: Task | None = None
+
+class TaskImportRow(TaskCreate):
+    """Schema for one line of a task import."""
+    completed: bool = False
+
+class TaskImportError(BaseModel):
+    """Schema for a rejected line of a task import."""
+    line: int
+    error: str
+
+class TaskImportResult(BaseModel):
+    """Schema for the outcome of a task import."""
+    imported: int
+    failed: int
+    resumed_from: int
+    checkpoint: int
+    errors: List[TaskImportError]
+
+class TaskSearchResult(Task):
+    """Schema for a task matching a search, with highlighted context."""
+    snippet: str
+    rank: float
+
+class TaskStats(BaseModel):
+    """Schema for a user's task counters."""
+    total: int
+    completed: int
+    pending: int
+
+class TaskChange(BaseModel):
+    """Schema for one change of a delta sync; deletions carry no task."""
+    change_seq: int
+    id: int
+    deleted: bool
+    task: Optional[Task] = None
+
+class TaskChanges(BaseModel):
+    """Schema for one page of changes and the cursor to continue from."""
+    changes: List[TaskChange]
+    cursor: int
+    has_more: bool
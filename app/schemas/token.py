@@ -0,0 +1,34 @@
+# app/schemas/token.py
+"""
+Pydantic schemas for authentication tokens.
+"""
+from typing import Optional
+from pydantic import BaseModel, validator
+
+class Token(BaseModel):
+    """Schema for access token responses."""
+    access_token: str
+    token_type: str
+    refresh_token: Optional[str] = None
+
+    @validator('token_type')
+    def token_type_bearer(cls, v):
+        """Validate token type is bearer (case insensitive)."""
+        if v.lower() != "bearer":
+            raise ValueError("Token type must be bearer")
+        return v.lower()
+
+class TokenData(BaseModel):
+    """Schema for data carried inside a token."""
+    username: Optional[str] = None
+
+    @validator('username')
+    def username_not_empty(cls, v):
+        """Validate username is not blank when present."""
+        if v is not None and not v.strip():
+            raise ValueError("Username cannot be empty")
+        return v
+
+class RefreshTokenRequest(BaseModel):
+    """Schema for exchanging a refresh token."""
+    refresh_token: str
@@ -18,6 +18,18 @@ class UserBase(BaseModel):
             raise ValueError("Username must be at least 3 characters long")
         return v
 
+def check_password_strength(v: str) -> str:
+    """Validate password strength."""
+    if len(v) < 8:
+        raise ValueError("Password must be at least 8 characters long")
+    if not re.search("[A-Z]", v):
+        raise ValueError("Password must contain at least one uppercase letter")
+    if not re.search("[a-z]", v):
+        raise ValueError("Password must contain at least one lowercase letter")
+    if not re.search("[0-9]", v):
+        raise ValueError("Password must contain at least one number")
+    return v
+
 class UserCreate(UserBase):
     """Schema for creating a new user."""
     password: str
@@ -25,15 +37,17 @@ class UserCreate(UserBase):
     @validator('password')
     def password_strong(cls, v):
         """Validate password strength."""
-        if len(v) < 8:
-            raise ValueError("Password must be at least 8 characters long")
-        if not re.search("[A-Z]", v):
-            raise ValueError("Password must contain at least one uppercase letter")
-        if not re.search("[a-z]", v):
-            raise ValueError("Password must contain at least one lowercase letter")
-        if not re.search("[0-9]", v):
-            raise ValueError("Password must contain at least one number")
-        return v
+        return check_password_strength(v)
+
+class PasswordChange(BaseModel):
+    """Schema for changing the current user's password."""
+    current_password: str
+    new_password: str
+
+    @validator('new_password')
+    def password_strong(cls, v):
+        """Validate password strength."""
+        return check_password_strength(v)
 
 class User(UserBase):
     """Schema for user responses."""
@@ -0,0 +1,108 @@
+# benchmarks/bench_db_mode.py
+"""
+Compare request latency of the sync (threadpool) and async (aiosqlite)
+database modes under concurrent load.
+
+Each mode runs in its own process because the engine is chosen from
+Settings at import time. The app is driven in-process through httpx's
+ASGI transport against a seeded SQLite file.
+
+Usage:
+    python -m benchmarks.bench_db_mode --clients 200 --requests 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the pct-th percentile of samples (nearest rank)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_load(clients: int, requests: int, tasks: int) -> dict:
+    """Seed the database and fire concurrent GET /tasks requests."""
+    import httpx
+    from app.core.config import settings
+    from app.core.security import create_access_token, get_password_hash
+    from app.db.base import SessionLocal, init_database
+    from app.main import app
+    from app.models.task import Task
+    from app.models.user import User
+
+    init_database()
+    with SessionLocal() as db:
+        user = User(username="benchuser", hashed_password=get_password_hash("BenchPass123"))
+        db.add(user)
+        db.flush()
+        db.add_all(Task(description=f"Task {i}", user_id=user.id) for i in range(tasks))
+        db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'benchuser'})}"}
+
+    latencies: List[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker() -> None:
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = await client.get(f"{settings.API_V1_STR}/tasks", headers=headers)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "mode": "async" if settings.DB_ASYNC else "sync",
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def run_mode(db_async: bool, args: argparse.Namespace) -> dict:
+    """Run one mode in a child process against a fresh database file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DB_ASYNC=str(db_async).lower(),
+            SQLITE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        )
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_db_mode", "--child",
+             "--clients", str(args.clients), "--requests", str(args.requests),
+             "--tasks", str(args.tasks)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=200, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--tasks", type=int, default=100, help="tasks seeded for the user")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_load(args.clients, args.requests, args.tasks))))
+        return
+
+    for db_async in (False, True):
+        print(json.dumps(run_mode(db_async, args)))
+
+
+if __name__ == "__main__":
+    main()
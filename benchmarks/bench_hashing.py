@@ -0,0 +1,102 @@
+# benchmarks/bench_hashing.py
+"""
+Calibrate password hashing cost to a target login latency on this host.
+
+For each scheme, times one hash at a time with increasing rounds and picks
+the highest cost whose median time stays under ``--target-ms``. Costs grow
+by one for log2 schemes such as bcrypt and are extrapolated from a probe
+for linear ones such as pbkdf2_sha256. The result is printed as the
+PASSWORD_ROUNDS setting to use, e.g.::
+
+    {"PASSWORD_ROUNDS": {"bcrypt": 12}}
+
+Run it on the production hardware, with the other services it shares the
+CPU with, since the cost applies to every login.
+
+Usage:
+    python -m benchmarks.bench_hashing --target-ms 250 --schemes bcrypt pbkdf2_sha256
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Dict
+
+from passlib.context import CryptContext
+
+from app.core.hashing import context_options
+
+PASSWORD = "CalibratePass123"
+
+
+def time_hash(scheme: str, rounds: int, repeat: int) -> float:
+    """
+    Median seconds to hash a password with a scheme at a cost.
+
+    Verification recomputes the hash, so it costs the same.
+    """
+    context = CryptContext(**context_options([scheme], {scheme: rounds}))
+    context.hash(PASSWORD)  # load the backend outside the measurement
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        context.hash(PASSWORD)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def calibrate_rounds(scheme: str, target: float, repeat: int = 3) -> Dict[str, float]:
+    """
+    Find the highest cost of a scheme whose hashing stays under a target time.
+
+    Args:
+        scheme (str): passlib scheme with a rounds setting
+        target (float): Seconds a hash may take
+        repeat (int): Hashes timed per cost
+
+    Returns:
+        Dict[str, float]: Chosen rounds and their measured milliseconds
+    """
+    handler = CryptContext(schemes=[scheme]).handler()
+    if not hasattr(handler, "rounds_cost"):
+        raise ValueError(f"{scheme} has no tunable cost")
+    low, high = handler.min_rounds, handler.max_rounds or 2 ** 31
+
+    if handler.rounds_cost == "log2":
+        rounds = low
+        seconds = time_hash(scheme, rounds, repeat)
+        # Each extra round doubles the work
+        while rounds < high:
+            candidate = time_hash(scheme, rounds + 1, repeat)
+            if candidate > target:
+                break
+            rounds, seconds = rounds + 1, candidate
+    else:
+        probe = max(low, handler.default_rounds // 10)
+        probe_seconds = time_hash(scheme, probe, repeat)
+        rounds = int(min(high, max(low, probe * target / probe_seconds)))
+        seconds = time_hash(scheme, rounds, repeat)
+        # Linear extrapolation ignores fixed overhead; back off until under target
+        while seconds > target and rounds > low:
+            rounds = max(low, int(rounds * target / seconds * 0.95))
+            seconds = time_hash(scheme, rounds, repeat)
+    return {"rounds": rounds, "ms": round(seconds * 1000, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--target-ms", type=float, default=250.0, help="time one hash may take")
+    parser.add_argument("--schemes", nargs="+", default=["bcrypt"], help="passlib schemes")
+    parser.add_argument("--repeat", type=int, default=3, help="hashes timed per cost")
+    args = parser.parse_args()
+
+    rounds: Dict[str, int] = {}
+    for scheme in args.schemes:
+        result = calibrate_rounds(scheme, args.target_ms / 1000, args.repeat)
+        print(json.dumps({"scheme": scheme, **result}))
+        rounds[scheme] = int(result["rounds"])
+    print(json.dumps({"PASSWORD_ROUNDS": rounds}))
+
+
+if __name__ == "__main__":
+    main()
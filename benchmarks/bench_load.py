@@ -0,0 +1,260 @@
+# benchmarks/bench_load.py
+"""
+Load-test the auth and task endpoints with weighted request mixes.
+
+The app is built with ``create_application`` and its lifespan startup runs
+against a fresh SQLite file seeded with ``--users`` users owning ``--tasks``
+tasks each. ``--concurrency`` virtual clients, each acting as one seeded
+user, then send ``--requests`` requests apiece through httpx's ASGI
+transport, picking every operation at random from the mix weights.
+
+Throughput and p50/p95/p99 latency are reported per operation and overall,
+and saved as JSON with the commit they were measured at. ``--compare``
+prints the change between two saved results.
+
+Usage:
+    python -m benchmarks.bench_load --mix mixed --concurrency 50 --requests 100 \\
+        --output results/mixed.json
+    python -m benchmarks.bench_load --mix list=90,create=10
+    python -m benchmarks.bench_load --compare results/before.json results/after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from benchmarks.bench_db_mode import percentile
+
+OPERATIONS = ("register", "login", "list", "create", "update", "delete")
+
+# Relative operation weights of the predefined mixes
+MIXES: Dict[str, Dict[str, int]] = {
+    "auth": {"register": 20, "login": 80},
+    "read": {"list": 80, "create": 10, "update": 5, "delete": 5},
+    "write": {"list": 10, "create": 40, "update": 30, "delete": 20},
+    "mixed": {"register": 2, "login": 8, "list": 50, "create": 15, "update": 15, "delete": 10},
+}
+
+PASSWORD = "BenchPass123"
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Parse a mix name or ``op=weight,...`` into operation weights."""
+    if value in MIXES:
+        return MIXES[value]
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS or not weight.isdigit():
+            raise argparse.ArgumentTypeError(f"invalid mix entry: {item!r}")
+        weights[name] = int(weight)
+    return weights
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    """Reduce one operation's latencies to throughput and percentiles."""
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def current_commit() -> str:
+    """Return the checked-out commit, or "unknown" outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def seed(users: int, tasks: int) -> List[dict]:
+    """Create users with their tasks; return each one's name, token and task ids."""
+    from app.core.security import create_access_token, get_password_hash
+    from app.crud import task as crud_task
+    from app.db.base import SessionLocal
+    from app.models.user import User
+
+    # One bcrypt hash shared by every seeded user keeps seeding fast
+    hashed_password = get_password_hash(PASSWORD)
+    seeded = []
+    with SessionLocal() as db:
+        for i in range(users):
+            user = User(username=f"loaduser{i}", hashed_password=hashed_password)
+            db.add(user)
+            db.commit()
+            rows = crud_task.create_tasks_bulk(
+                db, user.id, [f"Load task {n}" for n in range(tasks)]
+            ) if tasks else []
+            seeded.append({
+                "username": user.username,
+                "token": create_access_token({"sub": user.username}),
+                "task_ids": [row["id"] for row in rows],
+            })
+    return seeded
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    """Start the app, seed it and drive the mix; return the summarized results."""
+    import httpx
+    from app.core.config import settings
+    from app.main import create_application
+
+    # Every virtual client shares one address and logs in repeatedly, which
+    # the login rate limits exist to stop; measure the endpoints instead
+    settings.RATE_LIMIT_ENABLED = False
+    app = create_application()
+    async with app.router.lifespan_context(app):
+        users = seed(args.users, args.tasks)
+        weights = args.mix
+        names, cum_weights = list(weights), []
+        for name in names:
+            cum_weights.append((cum_weights[-1] if cum_weights else 0) + weights[name])
+
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        errors: Dict[str, int] = defaultdict(int)
+        api = settings.API_V1_STR
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def request(client_id: int, n: int, user: dict, operation: str):
+                headers = {"Authorization": f"Bearer {user['token']}"}
+                if operation == "register":
+                    return await client.post(f"{api}/register", json={
+                        "username": f"loadclient{client_id}-{n}", "password": PASSWORD,
+                    })
+                if operation == "login":
+                    return await client.post(f"{api}/login", data={
+                        "username": user["username"], "password": PASSWORD,
+                        "grant_type": "password",
+                    })
+                if operation == "list":
+                    return await client.get(f"{api}/tasks", headers=headers)
+                if operation == "create" or not user["task_ids"]:
+                    response = await client.post(
+                        f"{api}/tasks", json={"description": f"Created {n}"}, headers=headers
+                    )
+                    if response.status_code == 200:
+                        user["task_ids"].append(response.json()["id"])
+                    return response
+                if operation == "update":
+                    task_id = rng.choice(user["task_ids"])
+                    return await client.put(
+                        f"{api}/tasks/{task_id}", json={"completed": True}, headers=headers
+                    )
+                task_id = user["task_ids"].pop(rng.randrange(len(user["task_ids"])))
+                return await client.delete(f"{api}/tasks/{task_id}", headers=headers)
+
+            async def worker(client_id: int) -> None:
+                user = users[client_id % len(users)]
+                for n in range(args.requests):
+                    operation = rng.choices(names, cum_weights=cum_weights)[0]
+                    start = time.perf_counter()
+                    response = await request(client_id, n, user, operation)
+                    latencies[operation].append(time.perf_counter() - start)
+                    if response.status_code >= 400:
+                        errors[operation] += 1
+
+            rng = random.Random(args.seed)
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+            elapsed = time.perf_counter() - start
+
+    all_latencies = [value for samples in latencies.values() for value in samples]
+    return {
+        "commit": current_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {
+            "mix": weights,
+            "concurrency": args.concurrency,
+            "requests_per_client": args.requests,
+            "users": args.users,
+            "tasks_per_user": args.tasks,
+            "seed": args.seed,
+            "db_async": settings.DB_ASYNC,
+            "db_profile": settings.DB_PROFILE,
+        },
+        "seconds": round(elapsed, 2),
+        "overall": summarize(all_latencies, sum(errors.values()), elapsed),
+        "operations": {
+            operation: summarize(latencies[operation], errors[operation], elapsed)
+            for operation in OPERATIONS if latencies[operation]
+        },
+    }
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print the relative change of rps and percentiles between two results."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    if before["config"] != after["config"]:
+        print(json.dumps({"warning": "results were measured with different configs"}))
+
+    rows = {"overall": (before["overall"], after["overall"])}
+    for operation in OPERATIONS:
+        if operation in before["operations"] and operation in after["operations"]:
+            rows[operation] = (before["operations"][operation], after["operations"][operation])
+    for name, (old, new) in rows.items():
+        change = {"operation": name, "commits": [before["commit"], after["commit"]]}
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            change[metric] = [old[metric], new[metric]]
+            if old[metric]:
+                change[f"{metric}_change_pct"] = round((new[metric] / old[metric] - 1) * 100, 1)
+        print(json.dumps(change))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--mix", type=parse_mix, default=MIXES["mixed"],
+        help=f"one of {', '.join(MIXES)} or op=weight,... with ops {', '.join(OPERATIONS)}",
+    )
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=100, help="requests per client")
+    parser.add_argument("--users", type=int, default=10, help="seeded users")
+    parser.add_argument("--tasks", type=int, default=100, help="tasks seeded per user")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the mix")
+    parser.add_argument("--output", help="save the results as JSON to this path")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two saved results"
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings and engines are built on import, so point them at the
+        # scratch database before anything from app is imported
+        if "app.core.config" in sys.modules:
+            parser.error("app must not be imported before the database is configured")
+        os.environ["SQLITE_URL"] = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+        results = asyncio.run(run_load(args))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_search.py
+"""
+Compare FTS5 task search against LIKE '%word%' scans.
+
+Seeds one user with ``--rows`` tasks of random words, then times a common
+word, a rare word and a prefix query both ways, returning the first page
+of results.
+
+Usage:
+    python -m benchmarks.bench_search --rows 1000000 --repeat 5
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import task as crud_task
+from app.db.base import Base
+from app.db.search import build_match_query
+from app.models.user import User
+
+SEED_CHUNK = 10000
+
+
+def seed(SessionLocal: sessionmaker, rows: int) -> tuple:
+    """Create a user owning ``rows`` tasks; return its id and the vocabulary."""
+    rng = random.Random(0)
+    vocabulary = [
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+        for _ in range(20000)
+    ]
+    # Zipf-like weights so some words are common and most are rare
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    with SessionLocal() as db:
+        user = User(username="benchuser", hashed_password="x")
+        db.add(user)
+        db.commit()
+        for start in range(0, rows, SEED_CHUNK):
+            crud_task.create_tasks_bulk(db, user.id, [
+                " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(3, 10)))
+                for _ in range(min(SEED_CHUNK, rows - start))
+            ])
+        return user.id, vocabulary
+
+
+def time_query(fn, repeat: int) -> dict:
+    """Run ``fn`` ``repeat`` times; report its median latency and result size."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        found = fn()
+        timings.append(time.perf_counter() - start)
+    return {"median_ms": round(statistics.median(timings) * 1000, 2), "results": found}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1000000, help="tasks to seed")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query")
+    parser.add_argument("--limit", type=int, default=100, help="page size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autoflush=False, bind=engine)
+
+        start = time.perf_counter()
+        user_id, vocabulary = seed(SessionLocal, args.rows)
+        print(json.dumps({"seeded_rows": args.rows, "seconds": round(time.perf_counter() - start, 1)}))
+
+        queries = {
+            "common": vocabulary[0],
+            "rare": vocabulary[-1],
+            "prefix": vocabulary[1][:3] + "*",
+        }
+        tasks_table = crud_task.tasks_table
+        with SessionLocal() as db:
+            for kind, query in queries.items():
+                pattern = "%" + query.rstrip("*") + "%"
+                like = time_query(lambda: len(db.execute(
+                    select(tasks_table.c.id)
+                    .where(
+                        tasks_table.c.user_id == user_id,
+                        tasks_table.c.description.like(pattern),
+                    )
+                    .order_by(tasks_table.c.id)
+                    .limit(args.limit)
+                ).all()), args.repeat)
+                fts = time_query(lambda: len(crud_task.search_tasks(
+                    db, user_id, build_match_query(query), offset=0, limit=args.limit
+                )), args.repeat)
+                print(json.dumps({"query": kind, "q": query, "like": like, "fts": fts}))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_serialization.py
+"""
+Compare CPU time of the default and the orjson task list responses.
+
+Seeds one user with ``--rows`` tasks, then builds a response body for all
+of them both ways:
+
+- default: ORM instances validated by the read_tasks ``response_model``
+  and encoded by JSONResponse, exactly as FastAPI serializes the route
+- fast: Core rows from list_task_rows encoded by RowsJSONResponse
+
+Query and encoding CPU time are reported separately, per response.
+
+Usage:
+    python -m benchmarks.bench_serialization --rows 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.responses import RowsJSONResponse
+from app.crud import task as crud_task
+from app.db.base import Base
+from app.main import app
+from app.models.user import User
+
+
+def read_tasks_field():
+    """Return the response field FastAPI validates read_tasks output with."""
+    for route in app.routes:
+        if getattr(route, "name", None) == "read_tasks":
+            return route.secure_cloned_response_field
+    raise LookupError("read_tasks route not found")
+
+
+def default_body(tasks: list, field) -> bytes:
+    content = asyncio.run(serialize_response(field=field, response_content=tasks))
+    return JSONResponse(content).body
+
+
+def fast_body(rows: list) -> bytes:
+    return RowsJSONResponse(rows, crud_task.TASK_ROW_FIELDS).body
+
+
+def cpu_ms(fn, repeat: int) -> tuple:
+    """Run ``fn`` ``repeat`` times; return its median CPU milliseconds and last result."""
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        result = fn()
+        timings.append(time.process_time() - start)
+    return round(statistics.median(timings) * 1000, 2), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10000, help="tasks per response")
+    parser.add_argument("--repeat", type=int, default=20, help="responses per mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autoflush=False, bind=engine)
+        with SessionLocal() as db:
+            user = User(username="benchuser", hashed_password="x")
+            db.add(user)
+            db.commit()
+            user_id = user.id
+            crud_task.create_tasks_bulk(
+                db, user_id, [f"Benchmark task number {i}" for i in range(args.rows)]
+            )
+
+        field = read_tasks_field()
+
+        def load(fn):
+            # A fresh session per response, as each request gets one
+            with SessionLocal() as db:
+                return fn(db, user_id, limit=args.rows)
+
+        default_query, tasks = cpu_ms(lambda: load(crud_task.list_tasks), args.repeat)
+        default_encode, default = cpu_ms(lambda: default_body(tasks, field), args.repeat)
+        fast_query, rows = cpu_ms(lambda: load(crud_task.list_task_rows), args.repeat)
+        fast_encode, fast = cpu_ms(lambda: fast_body(rows), args.repeat)
+        assert json.loads(default) == json.loads(fast)
+
+        for mode, query, encode, body in (
+            ("default", default_query, default_encode, default),
+            ("fast", fast_query, fast_encode, fast),
+        ):
+            print(json.dumps({
+                "mode": mode,
+                "tasks": args.rows,
+                "query_cpu_ms": query,
+                "encode_cpu_ms": encode,
+                "total_cpu_ms": round(query + encode, 2),
+                "bytes": len(body),
+            }))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
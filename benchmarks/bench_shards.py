@@ -0,0 +1,139 @@
+# benchmarks/bench_shards.py
+"""
+Measure task write throughput against the number of user shards.
+
+For each shard count, seeds users spread over the shards like registration
+does, then runs ``--workers`` processes, each standing in for a server
+worker that creates tasks one commit at a time for its users, and reports
+the committed tasks per second. With one shard every commit waits for the
+single writer lock; with more, writers of different shards commit in
+parallel, so throughput grows with the shard count until the CPUs or the
+disk are saturated.
+
+Usage:
+    python -m benchmarks.bench_shards --shards 1 2 4 --workers 8 --seconds 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+
+def seed(users: int) -> None:
+    """Create the schema in every shard and register ``users`` users."""
+    from app.crud.shard import create_shard_user, set_user_shard
+    from app.crud.user import create_user
+    from app.db.base import get_session_factory, get_shard, init_database, place_user
+
+    init_database()
+    with get_session_factory()() as db:
+        for i in range(users):
+            user = create_user(db, f"benchuser{i}", "not-a-hash")
+            shard = place_user(user.id)
+            if shard != 0:
+                with get_shard(shard).session_factory() as shard_db:
+                    create_shard_user(shard_db, user.id, user.username)
+                set_user_shard(db, user.id, shard)
+
+
+def write(worker: int, workers: int, seconds: float) -> int:
+    """
+    Create tasks for this worker's users until time is up; return how many.
+
+    Prints "ready" once set up and starts writing on the next input line,
+    so every worker writes during the same period.
+    """
+    from app.crud.shard import get_user_shard
+    from app.crud.task import create_task
+    from app.db.base import get_session_factory, get_shard
+    from app.models.user import User
+    from sqlalchemy import select
+
+    with get_session_factory()() as db:
+        user_ids = db.scalars(select(User.id).order_by(User.id)).all()[worker::workers]
+        sessions = []
+        for user_id in user_ids:
+            shard, _ = get_user_shard(db, user_id)
+            factory = get_session_factory() if shard == 0 else get_shard(shard).session_factory
+            sessions.append((user_id, factory()))
+    print("ready", flush=True)
+    sys.stdin.readline()
+
+    created = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for user_id, session in sessions:
+            create_task(session, user_id, f"task {created}")
+            created += 1
+    for _, session in sessions:
+        session.close()
+    return created
+
+
+def run_shards(shards: int, args: argparse.Namespace) -> dict:
+    """Seed fresh database files for a shard count and time the writers."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            SQLITE_URL=f"sqlite:///{os.path.join(tmp, 'shard0.db')}",
+            DB_SHARD_URLS=json.dumps([
+                f"sqlite:///{os.path.join(tmp, f'shard{index}.db')}"
+                for index in range(1, shards)
+            ]),
+        )
+        command = [sys.executable, "-m", "benchmarks.bench_shards"]
+        subprocess.run(
+            command + ["--seed", str(args.users)], env=env, check=True, capture_output=True
+        )
+        children = [
+            subprocess.Popen(
+                command + ["--worker", str(worker), "--workers", str(args.workers),
+                           "--seconds", str(args.seconds)],
+                env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+            )
+            for worker in range(args.workers)
+        ]
+        for child in children:
+            child.stdout.readline()
+        start = time.perf_counter()
+        for child in children:
+            child.stdin.write("go\n")
+            child.stdin.flush()
+        counts: List[int] = [int(child.communicate()[0].strip().splitlines()[-1])
+                             for child in children]
+        elapsed = time.perf_counter() - start
+    return {
+        "shards": shards,
+        "workers": args.workers,
+        "tasks": sum(counts),
+        "writes_per_second": round(sum(counts) / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4], help="shard counts")
+    parser.add_argument("--workers", type=int, default=8, help="writer processes")
+    parser.add_argument("--users", type=int, default=64, help="users seeded")
+    parser.add_argument("--seconds", type=float, default=5.0, help="time each writer runs")
+    parser.add_argument("--seed", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        seed(args.seed)
+        return
+    if args.worker is not None:
+        print(write(args.worker, args.workers, args.seconds))
+        return
+
+    for shards in args.shards:
+        print(json.dumps(run_shards(shards, args)))
+
+
+if __name__ == "__main__":
+    main()
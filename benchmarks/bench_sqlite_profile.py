@@ -0,0 +1,101 @@
+# benchmarks/bench_sqlite_profile.py
+"""
+Measure read/write throughput of each SQLite profile under concurrent load.
+
+Writer threads create tasks one commit at a time while reader threads list
+pages of tasks, all against a fresh database file per profile.
+
+Usage:
+    python -m benchmarks.bench_sqlite_profile --writers 4 --readers 4 --ops 200
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.crud import task as crud_task
+from app.db.base import Base
+from app.db.sqlite import SQLITE_PROFILES, apply_sqlite_profile
+from app.models.user import User
+
+
+def run_profile(name: str, writers: int, readers: int, ops: int) -> dict:
+    """Run the mixed load against one profile and report throughput."""
+    profile = SQLITE_PROFILES[name]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            connect_args={"check_same_thread": False},
+            pool_size=profile.pool_size or settings.DB_POOL_SIZE,
+            max_overflow=(
+                settings.DB_MAX_OVERFLOW if profile.max_overflow is None
+                else profile.max_overflow
+            ),
+        )
+        apply_sqlite_profile(engine, profile)
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autoflush=False, bind=engine)
+        with SessionLocal() as db:
+            user = User(username="benchuser", hashed_password="x")
+            db.add(user)
+            db.commit()
+            user_id = user.id
+            crud_task.create_tasks_bulk(db, user_id, [f"Seed {i}" for i in range(1000)])
+
+        counts = {"writes": 0, "reads": 0, "errors": 0}
+        finished = {"writes": 0.0, "reads": 0.0}
+        lock = threading.Lock()
+
+        def work(kind: str) -> None:
+            for i in range(ops):
+                try:
+                    with SessionLocal() as db:
+                        if kind == "writes":
+                            crud_task.create_task(db, user_id, f"Task {i}")
+                        else:
+                            crud_task.list_tasks(db, user_id, limit=50)
+                    key = kind
+                except OperationalError:
+                    key = "errors"
+                with lock:
+                    counts[key] += 1
+            with lock:
+                finished[kind] = max(finished[kind], time.perf_counter() - start)
+
+        threads = [threading.Thread(target=work, args=("writes",)) for _ in range(writers)]
+        threads += [threading.Thread(target=work, args=("reads",)) for _ in range(readers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {
+        "profile": name,
+        "writes_per_s": round(counts["writes"] / finished["writes"], 1) if writers else 0,
+        "reads_per_s": round(counts["reads"] / finished["reads"], 1) if readers else 0,
+        "errors": counts["errors"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--writers", type=int, default=4, help="writer threads")
+    parser.add_argument("--readers", type=int, default=4, help="reader threads")
+    parser.add_argument("--ops", type=int, default=200, help="operations per thread")
+    args = parser.parse_args()
+
+    for name in SQLITE_PROFILES:
+        print(json.dumps(run_profile(name, args.writers, args.readers, args.ops)))
+
+
+if __name__ == "__main__":
+    main()
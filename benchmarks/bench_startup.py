@@ -0,0 +1,113 @@
+# benchmarks/bench_startup.py
+"""
+Measure cold start: import, startup and time to first request.
+
+Every run is a fresh interpreter against a database seeded beforehand, as
+when a new worker is spawned next to running ones. Each child times
+importing ``app.main``, running the application's lifespan startup, an
+authenticated ``GET /tasks`` (first database use) and a ``POST /login``
+(first password verification). The parent also reports the wall time of
+the whole process, interpreter start included.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+USERNAME = "startupuser"
+PASSWORD = "StartupPass123"
+
+
+def seed() -> None:
+    """Create the schema and one user."""
+    from app.core.security import get_password_hash
+    from app.db.base import get_session_factory, init_database
+    from app.models.user import User
+
+    init_database()
+    with get_session_factory()() as db:
+        db.add(User(username=USERNAME, hashed_password=get_password_hash(PASSWORD)))
+        db.commit()
+
+
+async def measure() -> dict:
+    """Time import, startup and the first requests in this fresh process."""
+    timings = {}
+    start = time.perf_counter()
+    import httpx
+    from app.main import app
+    timings["import_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings["startup_ms"] = (time.perf_counter() - start) * 1000
+
+        from app.core.config import settings
+        from app.core.security import create_access_token
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': USERNAME})}"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            response = await client.get(f"{settings.API_V1_STR}/tasks", headers=headers)
+            timings["first_list_ms"] = (time.perf_counter() - start) * 1000
+            assert response.status_code == 200, response.text
+
+            start = time.perf_counter()
+            response = await client.post(f"{settings.API_V1_STR}/login", data={
+                "username": USERNAME, "password": PASSWORD, "grant_type": "password",
+            })
+            timings["first_login_ms"] = (time.perf_counter() - start) * 1000
+            assert response.status_code == 200, response.text
+
+    timings["first_request_ms"] = (
+        timings["import_ms"] + timings["startup_ms"] + timings["first_list_ms"]
+    )
+    return {name: round(value, 1) for name, value in timings.items()}
+
+
+def run_child(mode: str, env: dict) -> str:
+    return subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", mode],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10, help="fresh processes to start")
+    parser.add_argument("--child", choices=("seed", "measure"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "seed":
+        seed()
+        return
+    if args.child == "measure":
+        print(json.dumps(asyncio.run(measure())))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SQLITE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}")
+        run_child("seed", env)
+        runs = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            output = run_child("measure", env)
+            result = json.loads(output.strip().splitlines()[-1])
+            result["process_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            runs.append(result)
+
+    print(json.dumps({
+        name: round(statistics.median(run[name] for run in runs), 1) for name in runs[0]
+    }))
+
+
+if __name__ == "__main__":
+    main()
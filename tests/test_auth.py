@@ -6,16 +6,22 @@ import os
 import pytest
 import logging
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, select
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.engine import Engine
 # Import models and dependencies
 from app.db.base import Base, init_database
 from app.main import app
 from app.core.config import settings
-from app.db.base import get_db
+from app.db.base import get_db, get_async_db, ThreadedSession
 from app.models.user import User
+from app.crud.user import negative_username_cache, user_cache
 from app.models.task import Task
+from app.models.refresh_token import RefreshToken
+from app.models.task_import import TaskImport
+from app.models.user_task_stats import UserTaskStats
+from app.models.task_change import TaskChangeSequence, TaskTombstone
+from app.models.shard import TaskIdSequence, UserShard
 from app.schemas.token import Token
 
 # Setup logging
@@ -73,6 +79,15 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    """Get test database session for async endpoints."""
+    db = ThreadedSession(TestingSessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
 @pytest.fixture(autouse=True)
 def setup_db():
     """Create tables before tests and drop them after."""
@@ -91,7 +106,25 @@ def setup_db():
         logger.info("Created Users table")
         Task.__table__.create(engine, checkfirst=True)
         logger.info("Created Tasks table")
+        RefreshToken.__table__.create(engine, checkfirst=True)
+        logger.info("Created RefreshTokens table")
+        TaskImport.__table__.create(engine, checkfirst=True)
+        logger.info("Created TaskImports table")
+        UserTaskStats.__table__.create(engine, checkfirst=True)
+        logger.info("Created UserTaskStats table")
+        TaskTombstone.__table__.create(engine, checkfirst=True)
+        TaskChangeSequence.__table__.create(engine, checkfirst=True)
+        logger.info("Created task change tracking tables")
+        TaskIdSequence.__table__.create(engine, checkfirst=True)
+        UserShard.__table__.create(engine, checkfirst=True)
+        logger.info("Created sharding tables")
         app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        # cached users would outlive the dropped tables
+        user_cache.clear()
+        negative_username_cache.clear()
+        # every test starts with full login and registration buckets
+        app.state.rate_limit_store.clear()
         # run the test
         yield
     except Exception as e:
@@ -100,6 +133,8 @@ def setup_db():
     finally:
         # drop Tables
         Base.metadata.drop_all(bind=engine)
+        # close pooled connections so they don't outlive the removed file
+        engine.dispose()
         if os.path.exists(TEST_DB_PATH):
             os.remove(TEST_DB_PATH)
             logger.info("Test database file removed")
@@ -199,6 +234,28 @@ def test_login_wrong_password():
     assert "WWW-Authenticate" in response.headers
     assert response.headers["WWW-Authenticate"] == "Bearer"
 
+def test_login_hashing_busy(monkeypatch):
+    """Test login answers 503 with Retry-After when the hashing queue is full"""
+    client.post(
+        get_api_url("/register"),
+        json={
+            "username": "testuser",
+            "password": "TestPass123"
+        }
+    )
+    monkeypatch.setattr(settings, "PASSWORD_HASH_QUEUE_LIMIT", 0)
+
+    response = client.post(
+        get_api_url("/login"),
+        data={
+            "username": "testuser",
+            "password": "TestPass123",
+            "grant_type": "password"
+        }
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.PASSWORD_HASH_RETRY_AFTER)
+
 def test_invalid_token():
     """Test accessing protected endpoint with invalid token"""
     logger.info(f"inside test_invalid_token...")
@@ -214,3 +271,199 @@ def test_invalid_token():
     assert response.headers["WWW-Authenticate"] == "Bearer"
     assert "Could not validate credentials" in response.json()["detail"]
 
+
+def test_current_user_cache():
+    """Test that authenticated lookups are cached and invalidated on password change"""
+    client.post(
+        get_api_url("/register"),
+        json={
+            "username": "testuser",
+            "password": "TestPass123"
+        }
+    )
+    response = client.post(
+        get_api_url("/login"),
+        data={
+            "username": "testuser",
+            "password": "TestPass123",
+            "grant_type": "password"
+        }
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    hits = user_cache.hits
+    client.get(get_api_url("/tasks"), headers=headers)
+    client.get(get_api_url("/tasks"), headers=headers)
+    assert user_cache.hits == hits + 1
+    assert user_cache.get("testuser").username == "testuser"
+
+    # Changing the password through the ORM drops the cached entry
+    db = TestingSessionLocal()
+    try:
+        user = db.query(User).filter(User.username == "testuser").first()
+        user.hashed_password = "changed"
+        db.commit()
+    finally:
+        db.close()
+    assert user_cache.get("testuser") is None
+
+
+def login_refresh_token() -> str:
+    """Register and login testuser, returning the refresh token"""
+    client.post(
+        get_api_url("/register"),
+        json={
+            "username": "testuser",
+            "password": "TestPass123"
+        }
+    )
+    response = client.post(
+        get_api_url("/login"),
+        data={
+            "username": "testuser",
+            "password": "TestPass123",
+            "grant_type": "password"
+        }
+    )
+    return response.json()["refresh_token"]
+
+
+def test_refresh_token_rotation():
+    """Test that a refresh token yields new tokens and is rotated"""
+    refresh_token = login_refresh_token()
+
+    response = client.post(
+        get_api_url("/token/refresh"), json={"refresh_token": refresh_token}
+    )
+    assert response.status_code == 200
+    data = Token(**response.json())
+    assert data.refresh_token != refresh_token
+
+    # The new access token works
+    headers = {"Authorization": f"Bearer {data.access_token}"}
+    assert client.get(get_api_url("/tasks"), headers=headers).status_code == 200
+
+    # The new refresh token can be used once more
+    response = client.post(
+        get_api_url("/token/refresh"), json={"refresh_token": data.refresh_token}
+    )
+    assert response.status_code == 200
+
+
+def test_refresh_token_reuse_revokes_family():
+    """Test that reusing a rotated refresh token revokes its successors"""
+    refresh_token = login_refresh_token()
+    response = client.post(
+        get_api_url("/token/refresh"), json={"refresh_token": refresh_token}
+    )
+    new_refresh_token = response.json()["refresh_token"]
+
+    # Replaying the old token is detected
+    response = client.post(
+        get_api_url("/token/refresh"), json={"refresh_token": refresh_token}
+    )
+    assert response.status_code == 401
+
+    # ... and the token issued from it is revoked as well
+    response = client.post(
+        get_api_url("/token/refresh"), json={"refresh_token": new_refresh_token}
+    )
+    assert response.status_code == 401
+
+
+def test_refresh_token_unknown():
+    """Test that an unknown refresh token is rejected"""
+    response = client.post(
+        get_api_url("/token/refresh"), json={"refresh_token": "not-a-token"}
+    )
+    assert response.status_code == 401
+
+
+def test_delete_expired_refresh_tokens():
+    """Test that pruning keeps only tokens still usable or needed to detect reuse"""
+    from datetime import datetime, timedelta
+    from app.crud.refresh_token import delete_expired_refresh_tokens
+
+    now = datetime(2030, 1, 1)
+    later, earlier = now + timedelta(days=1), now - timedelta(days=1)
+    rows = [
+        ("live", "live-current", later, False),
+        ("live", "live-rotated", later, True),
+        ("live", "live-expired", earlier, True),
+        ("revoked", "revoked-family", later, True),
+        ("expired", "expired-family", earlier, False),
+    ]
+    with TestingSessionLocal() as db:
+        user = User(username="pruneuser", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(
+            RefreshToken(token_hash=token_hash, family_id=family_id, user_id=user.id,
+                         expires_at=expires_at, revoked=revoked)
+            for family_id, token_hash, expires_at, revoked in rows
+        )
+        db.commit()
+
+        assert delete_expired_refresh_tokens(db, now) == 3
+        remaining = db.scalars(select(RefreshToken.token_hash)).all()
+    assert sorted(remaining) == ["live-current", "live-rotated"]
+
+
+def test_change_password_revokes_refresh_tokens():
+    """Test that changing the password revokes the user's refresh tokens"""
+    refresh_token = login_refresh_token()
+    response = client.post(
+        get_api_url("/login"),
+        data={"username": "testuser", "password": "TestPass123", "grant_type": "password"}
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = client.post(
+        get_api_url("/password"),
+        json={"current_password": "WrongPass123", "new_password": "NewPass456"},
+        headers=headers
+    )
+    assert response.status_code == 400
+    response = client.post(
+        get_api_url("/password"),
+        json={"current_password": "TestPass123", "new_password": "NewPass456"},
+        headers=headers
+    )
+    assert response.status_code == 204
+
+    response = client.post(
+        get_api_url("/token/refresh"), json={"refresh_token": refresh_token}
+    )
+    assert response.status_code == 401
+    old_login = {"username": "testuser", "password": "TestPass123", "grant_type": "password"}
+    assert client.post(get_api_url("/login"), data=old_login).status_code == 401
+    new_login = {**old_login, "password": "NewPass456"}
+    assert client.post(get_api_url("/login"), data=new_login).status_code == 200
+
+
+def test_login_rehashes_outdated_hash():
+    """Test that login replaces a hash made with another cost than the policy's"""
+    from passlib.context import CryptContext
+
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("TestPass123")
+    with TestingSessionLocal() as db:
+        db.add(User(username="olduser", hashed_password=old_hash))
+        db.commit()
+
+    response = client.post(
+        get_api_url("/login"),
+        data={"username": "olduser", "password": "TestPass123", "grant_type": "password"}
+    )
+    assert response.status_code == 200
+    with TestingSessionLocal() as db:
+        new_hash = db.query(User).filter(User.username == "olduser").one().hashed_password
+    assert new_hash != old_hash
+    assert new_hash.startswith(f"$2b${settings.PASSWORD_ROUNDS['bcrypt']:02d}$")
+
+    # The new hash follows the policy and is kept on the next login
+    client.post(
+        get_api_url("/login"),
+        data={"username": "olduser", "password": "TestPass123", "grant_type": "password"}
+    )
+    with TestingSessionLocal() as db:
+        assert db.query(User).filter(User.username == "olduser").one().hashed_password == new_hash
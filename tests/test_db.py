@@ -0,0 +1,41 @@
+# tests/test_db.py
+"""
+Tests for SQLite engine profiles.
+"""
+import pytest
+from sqlalchemy import create_engine
+
+from app.db.sqlite import (
+    SQLiteProfile,
+    apply_sqlite_profile,
+    get_sqlite_profile,
+    optimize_database,
+)
+
+
+def test_production_profile_pragmas(tmp_path):
+    """Test that the production profile is applied to new connections"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    apply_sqlite_profile(engine, get_sqlite_profile("production"))
+    try:
+        with engine.connect() as connection:
+            pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            assert pragma("journal_mode") == "wal"
+            assert pragma("synchronous") == 1  # NORMAL
+            assert pragma("busy_timeout") == 5000
+            assert pragma("cache_size") == -64 * 1024
+        optimize_database(engine)
+    finally:
+        engine.dispose()
+
+
+def test_default_profile_has_no_pragmas():
+    """Test that the default profile leaves SQLite untouched"""
+    assert get_sqlite_profile("default").pragmas() == []
+    assert SQLiteProfile(synchronous="OFF").pragmas() == ["PRAGMA synchronous=OFF"]
+
+
+def test_unknown_profile():
+    """Test that an unknown profile name is rejected"""
+    with pytest.raises(ValueError):
+        get_sqlite_profile("turbo")
@@ -0,0 +1,62 @@
+# tests/test_events.py
+"""
+Tests for the task event broker and stream encoding.
+"""
+import asyncio
+
+from app.core.events import OVERFLOW_EVENT, InProcessBroker, sse_stream
+
+
+def test_broker_delivers_to_user_subscribers():
+    """Test that events reach every subscriber of the user and no one else"""
+    async def scenario():
+        broker = InProcessBroker(queue_size=10)
+        first = broker.subscribe(1)
+        second = broker.subscribe(1)
+        other = broker.subscribe(2)
+        await broker.publish(1, {"type": "task.deleted", "id": 5})
+        assert await first.get(0.1) == {"type": "task.deleted", "id": 5}
+        assert await second.get(0.1) == {"type": "task.deleted", "id": 5}
+        assert await other.get(0.01) is None
+
+        broker.unsubscribe(1, first)
+        assert broker.subscriber_count(1) == 1
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_overflows():
+    """Test that a full subscriber is dropped instead of blocking publishers"""
+    async def scenario():
+        broker = InProcessBroker(queue_size=2)
+        subscription = broker.subscribe(1)
+        for i in range(3):
+            await broker.publish(1, {"type": "task.deleted", "id": i})
+        assert broker.subscriber_count(1) == 0
+
+        # Queued events are still delivered, then the overflow notice
+        assert (await subscription.get(0.1))["id"] == 0
+        assert (await subscription.get(0.1))["id"] == 1
+        assert await subscription.get(0.1) is OVERFLOW_EVENT
+
+    asyncio.run(scenario())
+
+
+def test_sse_stream_heartbeat_and_overflow():
+    """Test SSE encoding of heartbeats, events and the final overflow"""
+    async def scenario():
+        broker = InProcessBroker(queue_size=1)
+        subscription = broker.subscribe(1)
+        stream = sse_stream(broker, 1, subscription, heartbeat=0.01)
+        assert await stream.__anext__() == b": ping\n\n"
+
+        await broker.publish(1, {"type": "task.deleted", "id": 7})
+        await broker.publish(1, {"type": "task.deleted", "id": 8})
+        assert await stream.__anext__() == (
+            b'event: task.deleted\ndata: {"type": "task.deleted", "id": 7}\n\n'
+        )
+        messages = [message async for message in stream]
+        assert messages == [b'event: overflow\ndata: {"type": "overflow"}\n\n']
+        assert broker.subscriber_count(1) == 0
+
+    asyncio.run(scenario())
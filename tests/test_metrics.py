@@ -0,0 +1,100 @@
+# tests/test_metrics.py
+"""
+Tests for the Prometheus metrics endpoint.
+"""
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.metrics import Gauge, Histogram, MetricsRegistry
+from app.main import app
+from .test_auth import setup_db
+
+client = TestClient(app)
+
+
+def parse_samples(text: str) -> dict:
+    """Map each sample line's name and labels to its value"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            key, value = line.rsplit(" ", 1)
+            samples[key] = float(value)
+    return samples
+
+
+def test_histogram_rendering():
+    """Test cumulative buckets, sum and count in the text format"""
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("job_seconds", "Job time", ("job",), buckets=(0.1, 1.0)))
+    gauge = registry.register(Gauge("jobs_running", "Running jobs"))
+    histogram.observe(0.05, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(5, "a")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    text = registry.render()
+    assert "# TYPE job_seconds histogram" in text
+    samples = parse_samples(text)
+    assert samples['job_seconds_bucket{job="a",le="0.1"}'] == 1
+    assert samples['job_seconds_bucket{job="a",le="1.0"}'] == 2
+    assert samples['job_seconds_bucket{job="a",le="+Inf"}'] == 3
+    assert samples['job_seconds_count{job="a"}'] == 3
+    assert samples['job_seconds_sum{job="a"}'] == 5.55
+    assert samples["jobs_running"] == 1
+
+
+def test_metrics_endpoint():
+    """Test route latency, pool, hashing and cache metrics after some traffic"""
+    credentials = {"username": "metricsuser", "password": "TestPass123"}
+    client.post(f"{settings.API_V1_STR}/register", json=credentials)
+    token = client.post(
+        f"{settings.API_V1_STR}/login", data={**credentials, "grant_type": "password"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    task_id = client.post(
+        f"{settings.API_V1_STR}/tasks", json={"description": "Measured"}, headers=headers
+    ).json()["id"]
+    client.get(f"{settings.API_V1_STR}/tasks/{task_id}", headers=headers)
+    client.get(f"{settings.API_V1_STR}/tasks/{task_id + 1}", headers=headers)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = parse_samples(response.text)
+
+    route = f"{settings.API_V1_STR}/tasks/{{task_id}}"
+    assert samples[f'http_request_duration_seconds_count{{method="GET",route="{route}",status="200"}}'] >= 1
+    assert samples[f'http_request_duration_seconds_count{{method="GET",route="{route}",status="404"}}'] >= 1
+    # The scrape itself is in flight
+    assert samples['http_requests_in_progress{method="GET"}'] == 1
+    assert samples["password_hash_queue_seconds_count"] >= 2
+    assert samples["password_hash_duration_seconds_count"] >= 2
+    assert samples["db_pool_wait_seconds_count"] >= 1
+    assert 'db_pool_utilization{engine="sync"}' in samples
+    assert 0 <= samples['cache_hit_ratio{cache="user"}'] <= 1
+    assert samples['cache_hits_total{cache="token"}'] >= 1
+
+
+def test_sample_names_match_types():
+    """Test that every sample belongs to the family named by a TYPE line"""
+    credentials = {"username": "typesuser", "password": "TestPass123"}
+    client.post(f"{settings.API_V1_STR}/register", json=credentials)
+    client.post(f"{settings.API_V1_STR}/login", data={**credentials, "grant_type": "password"})
+
+    text = client.get("/metrics").text
+    types = {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            name, kind = line.split()[2:]
+            types[name] = kind
+    assert types["cache_hits_total"] == "counter"
+    assert types["cache_misses_total"] == "counter"
+    for key in parse_samples(text):
+        name = key.split("{", 1)[0]
+        base = name
+        for suffix in ("_bucket", "_sum", "_count"):
+            if name.endswith(suffix) and types.get(name[:-len(suffix)]) == "histogram":
+                base = name[:-len(suffix)]
+        assert base in types, f"{name} has no TYPE line"
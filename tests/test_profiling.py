@@ -0,0 +1,83 @@
+# tests/test_profiling.py
+"""
+Tests for request profiling.
+"""
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.profiling import SlowRequestLog, _current_profile, instrument_engine, span
+from app.db.base import get_async_db, get_db
+from app.main import create_application
+from .test_auth import engine, override_get_async_db, override_get_db, setup_db
+
+
+def parse_server_timing(header: str) -> dict:
+    """Map Server-Timing entry names to their durations in ms"""
+    entries = {}
+    for entry in header.split(", "):
+        name, *params = entry.split(";")
+        entries[name] = float(params[0].removeprefix("dur="))
+    return entries
+
+
+def test_slow_request_log_keeps_slowest():
+    """Test that the log keeps only the slowest requests, slowest first"""
+    log = SlowRequestLog(maxsize=3)
+    for seconds in [0.5, 0.1, 0.9, 0.3, 0.7]:
+        log.record(seconds, {"seconds": seconds})
+    assert [entry["seconds"] for entry in log.snapshot()] == [0.9, 0.7, 0.5]
+
+    log.clear()
+    assert log.snapshot() == []
+
+
+def test_span_without_profile_is_noop():
+    """Test that spans outside a profiled request record nothing"""
+    assert _current_profile.get() is None
+    with span("sql"):
+        pass
+
+
+def test_profiled_requests(monkeypatch):
+    """Test Server-Timing headers and the slow request endpoint"""
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_SLOW_REQUESTS", 2)
+    app = create_application()
+    # Requests run on the test engine, not the ones instrumented at startup
+    instrument_engine(engine)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    client = TestClient(app)
+
+    credentials = {"username": "profileuser", "password": "TestPass123"}
+    response = client.post(f"{settings.API_V1_STR}/register", json=credentials)
+    timing = parse_server_timing(response.headers["Server-Timing"])
+    assert {"deps", "handler", "encode", "bcrypt", "sql", "total"} <= set(timing)
+    assert timing["total"] >= timing["bcrypt"]
+
+    token = client.post(
+        f"{settings.API_V1_STR}/login", data={**credentials, "grant_type": "password"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get(f"{settings.API_V1_STR}/tasks", headers=headers)
+    assert response.status_code == 200
+    timing = parse_server_timing(response.headers["Server-Timing"])
+    assert {"jwt", "sql", "handler"} <= set(timing)
+    assert 'sql;dur=' in response.headers["Server-Timing"]
+
+    slowest = client.get(f"{settings.API_V1_STR}/debug/slow-requests").json()
+    assert len(slowest) == 2
+    assert slowest[0]["total_ms"] >= slowest[1]["total_ms"]
+    assert {entry["path"] for entry in slowest} <= {
+        f"{settings.API_V1_STR}/register", f"{settings.API_V1_STR}/login",
+    }
+    assert "bcrypt" in slowest[0]["spans"]
+
+
+def test_profiling_disabled_by_default():
+    """Test that the default application adds no profiling"""
+    app = create_application()
+    client = TestClient(app)
+    response = client.get("/")
+    assert "Server-Timing" not in response.headers
+    assert client.get(f"{settings.API_V1_STR}/debug/slow-requests").status_code == 404
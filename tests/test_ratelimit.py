@@ -0,0 +1,120 @@
+# tests/test_ratelimit.py
+"""
+Tests for the login and registration rate limits.
+"""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import auth
+from app.core.config import settings
+from app.core.ratelimit import MemoryRateLimitStore, RateLimit
+from app.main import app
+from .test_auth import setup_db
+
+client = TestClient(app)
+
+
+class FakeTimer:
+    """Manually advanced clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_refill():
+    """Test bursts up to the capacity, then one attempt per refilled token"""
+    timer = FakeTimer()
+    store = MemoryRateLimitStore(shards=4, timer=timer)
+    limit = RateLimit(attempts=3, period_seconds=30)
+
+    results = [asyncio.run(store.take("ip:a", limit)) for _ in range(4)]
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert results[2].remaining == 0
+    assert results[3].retry_after == 10
+    assert results[3].reset == 30
+    # Other keys have their own bucket
+    assert asyncio.run(store.take("ip:b", limit)).allowed
+
+    timer.now = 10
+    assert asyncio.run(store.take("ip:a", limit)).allowed
+    assert not asyncio.run(store.take("ip:a", limit)).allowed
+
+
+def test_token_bucket_eviction():
+    """Test that refilled buckets expire and shards stay bounded"""
+    timer = FakeTimer()
+    store = MemoryRateLimitStore(shards=1, max_keys=3, timer=timer)
+    limit = RateLimit(attempts=2, period_seconds=10)
+
+    for key in ("a", "b", "c", "d"):
+        asyncio.run(store.take(key, limit))
+    assert len(store) == 3
+
+    # Every bucket is full again after 5 seconds, so the next take evicts them
+    timer.now = 6
+    asyncio.run(store.take("e", limit))
+    assert len(store) == 1
+
+
+def test_login_rate_limited_per_username(monkeypatch):
+    """Test that a username out of attempts gets 429 without verifying its password"""
+    client.post(
+        f"{settings.API_V1_STR}/register",
+        json={"username": "limiteduser", "password": "TestPass123"},
+    )
+    monkeypatch.setattr(settings, "RATE_LIMIT_USERNAME_ATTEMPTS", 2)
+    form = {"username": "limiteduser", "password": "wrongpass", "grant_type": "password"}
+    for _ in range(2):
+        assert client.post(f"{settings.API_V1_STR}/login", data=form).status_code == 401
+
+    async def fail_verify(*args):
+        raise AssertionError("password verified despite the rate limit")
+
+    monkeypatch.setattr(auth, "verify_and_update_async", fail_verify)
+    response = client.post(f"{settings.API_V1_STR}/login", data=form)
+    assert response.status_code == 429
+    assert response.headers["X-RateLimit-Limit"] == "2"
+    assert response.headers["X-RateLimit-Remaining"] == "0"
+    assert int(response.headers["Retry-After"]) >= 1
+    assert int(response.headers["X-RateLimit-Reset"]) >= int(response.headers["Retry-After"])
+
+    # Another username is not affected
+    other = {"username": "otheruser", "password": "wrongpass", "grant_type": "password"}
+    assert client.post(f"{settings.API_V1_STR}/login", data=other).status_code == 401
+
+
+def test_register_rate_limited_per_ip(monkeypatch):
+    """Test that a client IP out of attempts is rejected before the endpoint runs"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_IP_ATTEMPTS", 1)
+    response = client.post(
+        f"{settings.API_V1_STR}/register",
+        json={"username": "ipuser1", "password": "TestPass123"},
+    )
+    assert response.status_code == 200
+    response = client.post(
+        f"{settings.API_V1_STR}/register",
+        json={"username": "ipuser2", "password": "TestPass123"},
+    )
+    assert response.status_code == 429
+    assert response.headers["X-RateLimit-Limit"] == "1"
+
+    # Other endpoints are not limited
+    assert client.get("/").status_code == 200
+
+
+def test_rate_limited_cross_origin(monkeypatch):
+    """Test that 429 responses to browsers carry readable CORS headers"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_IP_ATTEMPTS", 1)
+    origin = {"Origin": "https://app.example.com"}
+    form = {"username": "corsuser", "password": "wrongpass", "grant_type": "password"}
+    assert client.post(f"{settings.API_V1_STR}/login", data=form, headers=origin).status_code == 401
+
+    response = client.post(f"{settings.API_V1_STR}/login", data=form, headers=origin)
+    assert response.status_code == 429
+    assert response.headers["Access-Control-Allow-Origin"] in ("*", origin["Origin"])
+    exposed = response.headers["Access-Control-Expose-Headers"].lower()
+    assert "retry-after" in exposed and "x-ratelimit-reset" in exposed
@@ -9,8 +9,13 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import pytest
 import jwt
 from jwt.exceptions import InvalidTokenError
+import asyncio
+from app.core import security
 from app.core.security import create_access_token, verify_token, get_password_hash, verify_password
+from app.core.security import hash_password_async, verify_password_async
+from app.core import hashing
 from app.core.config import settings
+from app.core.errors import HashingBusyError
 from datetime import timedelta
 
 
@@ -24,6 +29,47 @@ def test_password_hash():
     assert verify_password(password, hashed)
     assert not verify_password("wrongpassword", hashed)
 
+def test_password_hash_async():
+    """Test password hashing and verification in the hashing pool"""
+    password = "testpassword"
+    hashed = asyncio.run(hash_password_async(password))
+    assert asyncio.run(verify_password_async(password, hashed))
+    assert not asyncio.run(verify_password_async("wrongpassword", hashed))
+    # hashes from the pool are interchangeable with inline ones
+    assert verify_password(password, hashed)
+
+
+def test_hashing_policy_upgrades():
+    """Test that hashes of other schemes or costs are flagged and rehashed"""
+    try:
+        hashing.configure(["pbkdf2_sha256"], {"pbkdf2_sha256": 1000})
+        old_hash = hashing.get_password_hash("testpassword")
+        assert not hashing.needs_update(old_hash)
+
+        # Cost changed: same scheme, new rounds
+        hashing.configure(["pbkdf2_sha256"], {"pbkdf2_sha256": 2000})
+        assert hashing.needs_update(old_hash)
+        verified, new_hash = hashing.verify_and_update("testpassword", old_hash)
+        assert verified and new_hash.startswith("$pbkdf2-sha256$2000$")
+
+        # Scheme changed: the old one is still accepted, then replaced
+        hashing.configure(["sha256_crypt", "pbkdf2_sha256"], {"sha256_crypt": 5000})
+        verified, new_hash = hashing.verify_and_update("testpassword", old_hash)
+        assert verified and new_hash.startswith("$5$")
+        assert hashing.verify_and_update("wrongpassword", old_hash) == (False, None)
+        assert hashing.verify_and_update("testpassword", new_hash) == (True, None)
+    finally:
+        hashing._policy = None
+        hashing._pwd_context.reset()
+
+
+def test_password_hash_async_queue_full(monkeypatch):
+    """Test that hashing is refused once the queue limit is reached"""
+    monkeypatch.setattr(settings, "PASSWORD_HASH_QUEUE_LIMIT", 1)
+    monkeypatch.setattr(security, "_hash_pending", 1)
+    with pytest.raises(HashingBusyError):
+        asyncio.run(hash_password_async("testpassword"))
+
 def test_token_payload_content():
     """Test that created token includes all expected data in the payload"""
     data = {"sub": "testuser", "role": "admin"}
@@ -72,3 +118,24 @@ def test_empty_token_data():
     """Test creating token with empty data"""
     with pytest.raises(ValueError):
         create_access_token({})  # Empty data should raise error
+
+def test_token_cache_hit():
+    """Test that verifying the same token twice is served from the cache"""
+    token = create_access_token({"sub": "cacheuser"})
+    hits = security.token_cache.hits
+    assert verify_token(token)["sub"] == "cacheuser"
+    payload = verify_token(token)
+    assert payload["sub"] == "cacheuser"
+    assert security.token_cache.hits == hits + 1
+    # callers get their own copy of the cached payload
+    payload["sub"] = "changed"
+    assert verify_token(token)["sub"] == "cacheuser"
+
+def test_token_cache_cleared_on_key_rotation(monkeypatch):
+    """Test that rotating the secret key invalidates cached tokens"""
+    token = create_access_token({"sub": "testuser"})
+    verify_token(token)
+    monkeypatch.setattr(settings, "SECRET_KEY", "rotated-secret-key-" + "0" * 32)
+    with pytest.raises(InvalidTokenError):
+        verify_token(token)
+
@@ -0,0 +1,170 @@
+# tests/test_shards.py
+"""
+Tests for users sharded over several SQLite files.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.crud.user import user_cache
+from app.db import base as db_base
+from app.db.changes import create_task_changes_triggers
+from app.db.search import create_task_search
+from app.db.shards import (
+    TASK_ID_SPAN,
+    check_shard_map,
+    move_users,
+    plan_rebalance,
+    start_task_id_range,
+)
+from app.db.stats import create_task_stats_triggers
+from app.main import app
+from app.models.shard import UserShard
+from app.models.task import Task
+from app.models.user import User
+from .test_auth import engine, setup_db
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def shard_engine(setup_db, tmp_path, monkeypatch):
+    """Add a second shard next to the test database and yield its engine"""
+    monkeypatch.setattr(settings, "DB_SHARD_URLS", [f"sqlite:///{tmp_path}/shard1.db"])
+    db_base._shards.reset()
+    shard = db_base.get_shard(1)
+    db_base.Base.metadata.create_all(bind=shard.engine)
+    with shard.engine.begin() as connection:
+        create_task_search(connection)
+        create_task_stats_triggers(connection)
+        create_task_changes_triggers(connection)
+        start_task_id_range(connection, 1)
+    yield shard.engine
+    shard.engine.dispose()
+    db_base._shards.reset()
+
+
+def register_and_login(username: str) -> dict:
+    client.post(
+        f"{settings.API_V1_STR}/register",
+        json={"username": username, "password": "TestPass123"},
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/login",
+        data={"username": username, "password": "TestPass123", "grant_type": "password"},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def count_tasks(on_engine) -> int:
+    with on_engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(Task.__table__)).scalar()
+
+
+def test_users_placed_on_shards(shard_engine):
+    """Test that new users are spread over the shards and their tasks follow them"""
+    # User ids 1 and 2 land in shards 1 and 0
+    sharded = register_and_login("shardeduser")
+    main = register_and_login("mainuser")
+    with engine.connect() as connection:
+        assert connection.execute(select(UserShard.shard, UserShard.moving)).all() == [(1, False)]
+    with shard_engine.connect() as connection:
+        # Stub row for the foreign keys, without the password
+        stub = connection.execute(select(User.username, User.hashed_password)).all()
+        assert stub == [("shardeduser", None)]
+
+    sharded_ids = [
+        client.post(f"{settings.API_V1_STR}/tasks", json={"description": "sharded"},
+                    headers=sharded).json()["id"],
+        *[row["id"] for row in client.post(
+            f"{settings.API_V1_STR}/tasks/bulk",
+            json=[{"description": "bulk 1"}, {"description": "bulk 2"}],
+            headers=sharded,
+        ).json()],
+    ]
+    main_id = client.post(
+        f"{settings.API_V1_STR}/tasks", json={"description": "main"}, headers=main
+    ).json()["id"]
+    # Task ids come from each shard's own range
+    assert all(TASK_ID_SPAN < task_id < 2 * TASK_ID_SPAN for task_id in sharded_ids)
+    assert main_id < TASK_ID_SPAN
+    assert count_tasks(shard_engine) == 3
+    assert count_tasks(engine) == 1
+
+    response = client.get(f"{settings.API_V1_STR}/tasks", headers=sharded)
+    assert sorted(task["id"] for task in response.json()) == sorted(sharded_ids)
+    response = client.get(f"{settings.API_V1_STR}/tasks/stats", headers=sharded)
+    assert response.json()["total"] == 3
+    response = client.get(f"{settings.API_V1_STR}/tasks", headers=main)
+    assert [task["id"] for task in response.json()] == [main_id]
+
+
+def test_move_user_between_shards(shard_engine):
+    """Test that moved users keep their task ids and see every moved change"""
+    headers = register_and_login("movinguser")
+    task_ids = [
+        client.post(f"{settings.API_V1_STR}/tasks", json={"description": f"task {i}"},
+                    headers=headers).json()["id"]
+        for i in range(3)
+    ]
+    client.delete(f"{settings.API_V1_STR}/tasks/{task_ids[0]}", headers=headers)
+    cursor = client.get(f"{settings.API_V1_STR}/tasks/changes", headers=headers).json()["cursor"]
+
+    def during_wait(seconds: float) -> None:
+        # Users being moved are refused once their cached lookup expires
+        user_cache.clear()
+        response = client.get(f"{settings.API_V1_STR}/tasks", headers=headers)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+    results = move_users(engine, [engine, shard_engine], {1: 0}, 5.0, sleep=during_wait)
+    assert results == [{"user_id": 1, "from": 1, "to": 0, "tasks": 2, "tombstones": 1, "imports": 0}]
+    user_cache.clear()
+
+    assert count_tasks(shard_engine) == 0
+    response = client.get(f"{settings.API_V1_STR}/tasks", headers=headers)
+    assert response.status_code == 200
+    assert sorted(task["id"] for task in response.json()) == task_ids[1:]
+    # Delta sync from before the move reports every moved task and tombstone
+    changes = client.get(
+        f"{settings.API_V1_STR}/tasks/changes?since={cursor}", headers=headers
+    ).json()["changes"]
+    assert sorted(change["id"] for change in changes) == task_ids
+    response = client.get(f"{settings.API_V1_STR}/tasks/stats", headers=headers)
+    assert response.json()["total"] == 2
+    # New tasks keep using the main database's range
+    response = client.post(
+        f"{settings.API_V1_STR}/tasks", json={"description": "after move"}, headers=headers
+    )
+    assert response.json()["id"] < TASK_ID_SPAN
+
+
+def test_unconfigured_shard(shard_engine):
+    """Test that users mapped to a removed shard get 503 and fail the startup check"""
+    headers = register_and_login("lostuser")
+    with engine.connect() as connection:
+        check_shard_map(connection, 2)
+    with engine.begin() as connection:
+        connection.execute(update(UserShard.__table__).values(shard=5))
+    user_cache.clear()
+
+    response = client.get(f"{settings.API_V1_STR}/tasks", headers=headers)
+    assert response.status_code == 503
+    assert response.json()["detail"] == "User data shard is not configured"
+    with pytest.raises(ValueError, match="shard 5 is not configured"):
+        db_base.get_shard(5)
+    with engine.connect() as connection:
+        with pytest.raises(ValueError, match=r"shards \[5\]"):
+            check_shard_map(connection, 2)
+
+
+def test_plan_rebalance():
+    """Test that rebalancing evens out users per shard, moving the newest"""
+    shard_map = {user_id: (0, False) for user_id in range(1, 6)}
+    shard_map[6] = (1, False)
+    moves = plan_rebalance(shard_map, 3)
+    assert moves == {5: 2, 4: 1, 3: 2}
+    assert plan_rebalance({1: (0, False), 2: (1, False)}, 2) == {}
+    with pytest.raises(ValueError):
+        plan_rebalance({1: (3, False)}, 2)
@@ -0,0 +1,87 @@
+# tests/test_slow_queries.py
+"""
+Tests for the slow query log and its admin endpoint.
+"""
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.db import base as db_base
+from app.db.slow_queries import SlowQueryLog, full_scans, parameters_shape, read_log
+from app.main import app
+from .test_auth import engine, setup_db
+from .test_tasks import get_auth_headers
+
+client = TestClient(app)
+
+
+def get_api_url(path: str) -> str:
+    """Get full API URL for given path"""
+    return f"{settings.API_V1_STR}{path}"
+
+
+def test_full_scans():
+    """Test that only plan steps reading a whole table are flagged"""
+    assert full_scans([
+        "SCAN tasks",
+        "SEARCH users USING INDEX ix_users_username (username=?)",
+        "SCAN tasks USING INDEX ix_tasks_user_id_id",
+        "SCAN tasks_fts VIRTUAL TABLE INDEX 0:M1",
+        "SCAN CONSTANT ROW",
+        "SCAN sqlite_master",
+    ]) == ["tasks"]
+
+
+def test_parameters_shape():
+    """Test that parameter values are reduced to their types"""
+    assert parameters_shape((1, "x", None), False) == ["int", "str", "NoneType"]
+    assert parameters_shape({"user_id": 1}, False) == {"user_id": "int"}
+    assert parameters_shape([(1, "a"), (2, "b")], True) == {"rows": 2, "row": ["int", "str"]}
+
+
+def test_slow_query_log(monkeypatch, tmp_path):
+    """Test plan capture, slow executions, the admin endpoint and the log file"""
+    path = str(tmp_path / "slow.jsonl")
+    log = SlowQueryLog(threshold_ms=0, max_statements=100, path=path)
+    log.instrument(engine)
+    monkeypatch.setattr(db_base, "slow_query_log", log)
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", ["slowadmin"])
+    try:
+        headers = get_auth_headers("slowadmin")
+        client.post(get_api_url("/tasks"), json={"description": "Indexed"}, headers=headers)
+        client.get(get_api_url("/tasks"), headers=headers)
+        with engine.connect() as connection:
+            connection.exec_driver_sql("SELECT * FROM tasks WHERE version > 1").all()
+
+        response = client.get(get_api_url("/admin/slow-queries"), headers=headers)
+        assert response.status_code == 200
+        entries = response.json()
+        assert entries[0]["statement"] == "SELECT * FROM tasks WHERE version > 1"
+        assert entries[0]["full_scans"] == ["tasks"]
+        assert entries[0]["slow_count"] == 1
+
+        listing = next(
+            entry for entry in entries
+            if entry["statement"].startswith("SELECT tasks.id") and "LIMIT" in entry["statement"]
+        )
+        assert listing["full_scans"] == []
+        assert any("USING INDEX ix_tasks_user_id_id" in step for step in listing["plan"])
+        assert listing["last_parameters"] == ["int", "int", "int"]
+
+        assert {entry["statement"] for entry in read_log(path)} == {
+            entry["statement"] for entry in entries
+        }
+
+        other_headers = get_auth_headers("slowuser")
+        response = client.get(get_api_url("/admin/slow-queries"), headers=other_headers)
+        assert response.status_code == 403
+    finally:
+        log.uninstrument(engine)
+
+
+def test_slow_query_log_disabled(monkeypatch):
+    """Test that the endpoint reports a disabled log"""
+    assert db_base.slow_query_log is None
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", ["disabledadmin"])
+    headers = get_auth_headers("disabledadmin")
+    response = client.get(get_api_url("/admin/slow-queries"), headers=headers)
+    assert response.status_code == 404
@@ -2,13 +2,28 @@
 """
 Tests for task management endpoints.
 """
+import asyncio
+import csv
+import io
+import json
+import sys
+
 import pytest
 from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
 
-from app.main import app
+from app.main import app, create_application
+from app.core.responses import RowsJSONResponse
 from app.core.config import settings
-from .test_auth import setup_db, override_get_db  # Reuse auth test fixtures
+from app.db.base import get_async_db
+from app.core.events import EventBroker, InProcessBroker
+from app.db.changes import compact_tombstones
+from app.db.stats import reconcile_task_stats
+from .test_auth import engine, setup_db, override_get_db  # Reuse auth test fixtures
 
 client = TestClient(app)
 
@@ -105,3 +120,747 @@ def test_create_task_empty_description():
 
     # Verify response
     assert response.status_code == 422  # Validation error
+
+
+def test_update_task_blank_description():
+    """Test that updating a task to a blank description is rejected before writing"""
+    headers = get_auth_headers("blankupdateuser")
+    task_id = client.post(
+        get_api_url("/tasks"), json={"description": "Keep me"}, headers=headers
+    ).json()["id"]
+
+    response = client.put(
+        get_api_url(f"/tasks/{task_id}"), json={"description": "   "}, headers=headers
+    )
+    assert response.status_code == 422
+
+    # The stored task is untouched and still lists
+    response = client.get(get_api_url("/tasks"), headers=headers)
+    assert response.status_code == 200
+    assert [task["description"] for task in response.json()] == ["Keep me"]
+
+
+def get_auth_headers(username: str) -> dict:
+    """Register and login a user, returning the Authorization header"""
+    client.post(
+        get_api_url("/register"),
+        json={"username": username, "password": "TestPass123"}
+    )
+    login_response = client.post(
+        get_api_url("/login"),
+        data={
+            "username": username,
+            "password": "TestPass123",
+            "grant_type": "password"
+        }
+    )
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_get_tasks_keyset_pagination():
+    """Test paging through tasks with the next cursor header"""
+    headers = get_auth_headers("pageuser")
+    created_ids = []
+    for i in range(5):
+        response = client.post(
+            get_api_url("/tasks"),
+            json={"description": f"Task {i}"},
+            headers=headers
+        )
+        created_ids.append(response.json()["id"])
+
+    # First page
+    response = client.get(get_api_url("/tasks?limit=2"), headers=headers)
+    assert response.status_code == 200
+    assert [task["id"] for task in response.json()] == created_ids[:2]
+    cursor = response.headers["X-Next-Cursor"]
+
+    # Follow cursors until the last page
+    seen_ids = [task["id"] for task in response.json()]
+    while cursor:
+        response = client.get(
+            get_api_url(f"/tasks?limit=2&after_id={cursor}"),
+            headers=headers
+        )
+        assert response.status_code == 200
+        seen_ids.extend(task["id"] for task in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+    assert seen_ids == created_ids
+
+
+def test_get_tasks_filters():
+    """Test filtering tasks by completion status and description prefix"""
+    headers = get_auth_headers("filteruser")
+    for description in ["Buy milk", "Buy bread", "Call mom"]:
+        client.post(
+            get_api_url("/tasks"),
+            json={"description": description},
+            headers=headers
+        )
+    tasks = client.get(get_api_url("/tasks"), headers=headers).json()
+    client.put(
+        get_api_url(f"/tasks/{tasks[0]['id']}"),
+        json={"completed": True},
+        headers=headers
+    )
+
+    response = client.get(get_api_url("/tasks?completed=true"), headers=headers)
+    assert [task["description"] for task in response.json()] == ["Buy milk"]
+
+    response = client.get(
+        get_api_url("/tasks?completed=false&description_prefix=Buy"),
+        headers=headers
+    )
+    assert [task["description"] for task in response.json()] == ["Buy bread"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_tasks_fast_json(monkeypatch):
+    """Test that the orjson fast path returns the same page and headers"""
+    headers = get_auth_headers("fastjsonuser")
+    for description in ["Fast one", "Fast two", "Fast three"]:
+        client.post(
+            get_api_url("/tasks"),
+            json={"description": description},
+            headers=headers
+        )
+    first_id = client.get(get_api_url("/tasks"), headers=headers).json()[0]["id"]
+    client.put(
+        get_api_url(f"/tasks/{first_id}"), json={"completed": True}, headers=headers
+    )
+    expected = client.get(get_api_url("/tasks?limit=2"), headers=headers)
+
+    monkeypatch.setattr(settings, "TASKS_FAST_JSON", True)
+    response = client.get(get_api_url("/tasks?limit=2"), headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == expected.json()
+    assert response.headers["X-Next-Cursor"] == expected.headers["X-Next-Cursor"]
+    assert response.headers["ETag"] == expected.headers["ETag"]
+    assert int(response.headers["content-length"]) == len(response.content)
+
+    response = client.get(
+        get_api_url("/tasks?limit=2"),
+        headers={**headers, "If-None-Match": expected.headers["ETag"]}
+    )
+    assert response.status_code == 304
+
+
+def test_fast_json_requires_orjson(monkeypatch):
+    """Test that the fast path reports a missing orjson as a configuration error"""
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    monkeypatch.setattr(settings, "TASKS_FAST_JSON", True)
+    with pytest.raises(RuntimeError, match="orjson is not installed"):
+        RowsJSONResponse([(1, "Task")], ["id", "description"])
+    with pytest.raises(RuntimeError, match="orjson is not installed"):
+        create_application()
+
+
+def test_get_tasks_only_own():
+    """Test that users only see their own tasks"""
+    owner_headers = get_auth_headers("owneruser")
+    other_headers = get_auth_headers("otheruser")
+    client.post(
+        get_api_url("/tasks"),
+        json={"description": "Private task"},
+        headers=owner_headers
+    )
+
+    response = client.get(get_api_url("/tasks"), headers=other_headers)
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_bulk_create_update_delete():
+    """Test bulk create, update and delete of tasks"""
+    headers = get_auth_headers("bulkuser")
+
+    # Bulk create
+    response = client.post(
+        get_api_url("/tasks/bulk"),
+        json=[{"description": f"Bulk task {i}"} for i in range(3)],
+        headers=headers
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status"] for result in results] == ["created"] * 3
+    assert [result["task"]["description"] for result in results] == [
+        "Bulk task 0", "Bulk task 1", "Bulk task 2"
+    ]
+    ids = [result["id"] for result in results]
+
+    # Bulk update, including an unknown id
+    response = client.patch(
+        get_api_url("/tasks/bulk"),
+        json=[
+            {"id": ids[0], "completed": True},
+            {"id": ids[1], "description": "Renamed", "completed": True},
+            {"id": 999999, "completed": True},
+        ],
+        headers=headers
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status"] for result in results] == ["updated", "updated", "not_found"]
+    assert results[0]["task"]["completed"] is True
+    assert results[0]["task"]["description"] == "Bulk task 0"
+    assert results[1]["task"]["description"] == "Renamed"
+
+    # Bulk delete
+    response = client.request(
+        "DELETE", get_api_url("/tasks/bulk"), json=[ids[0], ids[2], 999999], headers=headers
+    )
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()] == ["deleted", "deleted", "not_found"]
+
+    tasks = client.get(get_api_url("/tasks"), headers=headers).json()
+    assert [task["id"] for task in tasks] == [ids[1]]
+
+
+def test_bulk_create_is_atomic():
+    """Test that one invalid item rejects the whole bulk create"""
+    headers = get_auth_headers("atomicuser")
+    response = client.post(
+        get_api_url("/tasks/bulk"),
+        json=[{"description": "Valid"}, {"description": "  "}],
+        headers=headers
+    )
+    assert response.status_code == 422
+    assert client.get(get_api_url("/tasks"), headers=headers).json() == []
+
+
+def test_bulk_update_blank_description():
+    """Test that one blank description rejects the whole bulk update before writing"""
+    headers = get_auth_headers("bulkblankuser")
+    ids = [row["id"] for row in client.post(
+        get_api_url("/tasks/bulk"),
+        json=[{"description": "First"}, {"description": "Second"}],
+        headers=headers
+    ).json()]
+    response = client.patch(
+        get_api_url("/tasks/bulk"),
+        json=[{"id": ids[0], "description": "Renamed"}, {"id": ids[1], "description": ""}],
+        headers=headers
+    )
+    assert response.status_code == 422
+
+    response = client.get(get_api_url("/tasks"), headers=headers)
+    assert response.status_code == 200
+    assert sorted(task["description"] for task in response.json()) == ["First", "Second"]
+
+
+def test_bulk_update_empty_item(monkeypatch):
+    """Test that a bulk update item without fields is rejected, not reported updated"""
+    broker = RecordingBroker()
+    monkeypatch.setattr(app.state, "event_broker", broker)
+    headers = get_auth_headers("bulkemptyuser")
+    task_id = client.post(
+        get_api_url("/tasks"), json={"description": "Unchanged"}, headers=headers
+    ).json()["id"]
+    broker.events.clear()
+    response = client.patch(
+        get_api_url("/tasks/bulk"),
+        json=[{"id": task_id, "completed": True}, {"id": task_id}],
+        headers=headers
+    )
+    assert response.status_code == 422
+    assert broker.events == []
+
+
+def test_bulk_does_not_touch_other_users_tasks():
+    """Test that bulk update and delete ignore tasks owned by other users"""
+    owner_headers = get_auth_headers("bulkowner")
+    other_headers = get_auth_headers("bulkother")
+    task_id = client.post(
+        get_api_url("/tasks"), json={"description": "Mine"}, headers=owner_headers
+    ).json()["id"]
+
+    response = client.patch(
+        get_api_url("/tasks/bulk"),
+        json=[{"id": task_id, "completed": True}],
+        headers=other_headers
+    )
+    assert response.json()[0]["status"] == "not_found"
+    response = client.request(
+        "DELETE", get_api_url("/tasks/bulk"), json=[task_id], headers=other_headers
+    )
+    assert response.json()[0]["status"] == "not_found"
+
+    task = client.get(get_api_url(f"/tasks/{task_id}"), headers=owner_headers).json()
+    assert task["completed"] is False
+
+
+def test_task_list_etag():
+    """Test conditional GET on the task collection"""
+    headers = get_auth_headers("etaglistuser")
+    client.post(get_api_url("/tasks"), json={"description": "First"}, headers=headers)
+
+    response = client.get(get_api_url("/tasks"), headers=headers)
+    etag = response.headers["ETag"]
+    response = client.get(
+        get_api_url("/tasks"), headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # Other query parameters give a different tag
+    response = client.get(get_api_url("/tasks?completed=true"), headers=headers)
+    assert response.headers["ETag"] != etag
+
+    # Any change to the collection invalidates the tag
+    task_id = client.post(
+        get_api_url("/tasks"), json={"description": "Second"}, headers=headers
+    ).json()["id"]
+    response = client.get(
+        get_api_url("/tasks"), headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    client.delete(get_api_url(f"/tasks/{task_id}"), headers=headers)
+    response = client.get(
+        get_api_url("/tasks"), headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+
+def test_task_etag_preconditions():
+    """Test conditional GET and If-Match on a single task"""
+    headers = get_auth_headers("etaguser")
+    response = client.post(
+        get_api_url("/tasks"), json={"description": "Versioned"}, headers=headers
+    )
+    task_id = response.json()["id"]
+    etag = response.headers["ETag"]
+
+    response = client.get(
+        get_api_url(f"/tasks/{task_id}"), headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    response = client.put(
+        get_api_url(f"/tasks/{task_id}"),
+        json={"completed": True},
+        headers={**headers, "If-Match": etag}
+    )
+    assert response.status_code == 200
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+
+    # The old tag is stale now
+    response = client.put(
+        get_api_url(f"/tasks/{task_id}"),
+        json={"description": "Lost update"},
+        headers={**headers, "If-Match": etag}
+    )
+    assert response.status_code == 412
+    response = client.delete(
+        get_api_url(f"/tasks/{task_id}"), headers={**headers, "If-Match": etag}
+    )
+    assert response.status_code == 412
+
+    response = client.delete(
+        get_api_url(f"/tasks/{task_id}"), headers={**headers, "If-Match": new_etag}
+    )
+    assert response.status_code == 200
+
+
+def test_export_tasks(monkeypatch):
+    """Test streaming a user's tasks as NDJSON and CSV"""
+    monkeypatch.setattr(settings, "TASKS_EXPORT_BATCH_SIZE", 2)
+    headers = get_auth_headers("exportuser")
+    client.post(
+        get_api_url("/tasks/bulk"),
+        json=[{"description": f"Export, task {i}"} for i in range(5)],
+        headers=headers
+    )
+    client.post(
+        get_api_url("/tasks"), json={"description": "Not mine"},
+        headers=get_auth_headers("exportother")
+    )
+
+    response = client.get(get_api_url("/tasks/export"), headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["description"] for row in rows] == [f"Export, task {i}" for i in range(5)]
+    assert rows[0]["completed"] is False
+
+    response = client.get(get_api_url("/tasks/export?format=csv"), headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["description"] for row in rows] == [f"Export, task {i}" for i in range(5)]
+    assert rows[0]["completed"] == "false"
+
+    response = client.get(get_api_url("/tasks/export?format=xml"), headers=headers)
+    assert response.status_code == 422
+
+
+def test_import_tasks_ndjson(monkeypatch):
+    """Test importing NDJSON with line errors and chunked batches"""
+    monkeypatch.setattr(settings, "TASKS_IMPORT_BATCH_SIZE", 2)
+    headers = get_auth_headers("importuser")
+    body = "\n".join([
+        json.dumps({"description": "One"}),
+        json.dumps({"description": "Two", "completed": True}),
+        "",
+        json.dumps({"description": "   "}),
+        "not json",
+        json.dumps({"description": "Three"}),
+    ])
+
+    response = client.post(
+        get_api_url("/tasks/import"), content=body.encode(), headers=headers
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 3
+    assert result["failed"] == 2
+    assert result["checkpoint"] == 6
+    assert [error["line"] for error in result["errors"]] == [4, 5]
+    assert "Description cannot be empty" in result["errors"][0]["error"]
+
+    tasks = client.get(get_api_url("/tasks"), headers=headers).json()
+    assert [(task["description"], task["completed"]) for task in tasks] == [
+        ("One", False), ("Two", True), ("Three", False)
+    ]
+
+
+def test_import_tasks_csv_round_trip():
+    """Test that a CSV export can be imported back"""
+    headers = get_auth_headers("csvimportuser")
+    client.post(
+        get_api_url("/tasks/import?format=csv"),
+        content=b'description,completed\n"Multi\nline, task",true\nPlain,\n',
+        headers=headers
+    )
+    exported = client.get(get_api_url("/tasks/export?format=csv"), headers=headers)
+
+    other_headers = get_auth_headers("csvimportother")
+    response = client.post(
+        get_api_url("/tasks/import?format=csv"), content=exported.content, headers=other_headers
+    )
+    assert response.json()["imported"] == 2
+    tasks = client.get(get_api_url("/tasks"), headers=other_headers).json()
+    assert [(task["description"], task["completed"]) for task in tasks] == [
+        ("Multi\nline, task", True), ("Plain", False)
+    ]
+
+    response = client.post(
+        get_api_url("/tasks/import?format=csv"), content=b"title\nOops\n", headers=headers
+    )
+    assert response.status_code == 400
+
+
+def test_import_tasks_resume():
+    """Test resuming an interrupted import with the same import key"""
+    headers = get_auth_headers("resumeuser")
+    lines = [json.dumps({"description": f"Task {i}"}) for i in range(1, 7)]
+    url = get_api_url("/tasks/import?import_key=migration-1")
+
+    # First attempt only got half of the file through
+    response = client.post(url, content="\n".join(lines[:3]).encode(), headers=headers)
+    assert response.json()["checkpoint"] == 3
+
+    response = client.post(url, content="\n".join(lines).encode(), headers=headers)
+    result = response.json()
+    assert result["resumed_from"] == 3
+    assert result["imported"] == 3
+
+    tasks = client.get(get_api_url("/tasks"), headers=headers).json()
+    assert [task["description"] for task in tasks] == [f"Task {i}" for i in range(1, 7)]
+
+
+def test_search_tasks():
+    """Test full-text search with ranking, prefixes, snippets and paging"""
+    headers = get_auth_headers("searchuser")
+    client.post(
+        get_api_url("/tasks/bulk"),
+        json=[
+            {"description": "Buy milk and bread"},
+            {"description": "Buy milk, milk and more milk"},
+            {"description": "Call the milkman"},
+            {"description": "Walk the dog"},
+        ],
+        headers=headers
+    )
+    client.post(
+        get_api_url("/tasks"), json={"description": "Buy milk"},
+        headers=get_auth_headers("searchother")
+    )
+
+    response = client.get(get_api_url("/tasks/search?q=milk"), headers=headers)
+    assert response.status_code == 200
+    results = response.json()
+    # Denser matches rank first; other users' tasks never match
+    assert [result["description"] for result in results] == [
+        "Buy milk, milk and more milk", "Buy milk and bread"
+    ]
+    assert "<mark>milk</mark>" in results[0]["snippet"]
+
+    response = client.get(get_api_url("/tasks/search?q=milk*"), headers=headers)
+    assert len(response.json()) == 3
+
+    response = client.get(get_api_url("/tasks/search?q=buy bread"), headers=headers)
+    assert [result["description"] for result in response.json()] == ["Buy milk and bread"]
+
+    # Updates and deletes are reflected in the index
+    task_id = results[1]["id"]
+    client.put(
+        get_api_url(f"/tasks/{task_id}"), json={"description": "Buy bread"}, headers=headers
+    )
+    response = client.get(get_api_url("/tasks/search?q=milk"), headers=headers)
+    assert [result["id"] for result in response.json()] == [results[0]["id"]]
+    client.delete(get_api_url(f"/tasks/{results[0]['id']}"), headers=headers)
+    response = client.get(get_api_url("/tasks/search?q=milk"), headers=headers)
+    assert response.json() == []
+
+    # Paging
+    response = client.get(get_api_url("/tasks/search?q=the&limit=1"), headers=headers)
+    assert response.headers["X-Next-Offset"] == "1"
+    first_id = response.json()[0]["id"]
+    response = client.get(
+        get_api_url("/tasks/search?q=the&limit=1&offset=1"), headers=headers
+    )
+    assert [result["id"] for result in response.json()] != [first_id]
+    assert "X-Next-Offset" not in response.headers
+
+    # Operators are not interpreted
+    response = client.get(get_api_url('/tasks/search?q="NEAR(dog OR'), headers=headers)
+    assert response.status_code == 200
+    assert response.json() == []
+    response = client.get(get_api_url('/tasks/search?q="*('), headers=headers)
+    assert response.status_code == 400
+
+
+def test_task_stats():
+    """Test that task counters follow single, bulk and import changes"""
+    headers = get_auth_headers("statsuser")
+
+    def stats():
+        return client.get(get_api_url("/tasks/stats"), headers=headers).json()
+
+    assert stats() == {"total": 0, "completed": 0, "pending": 0}
+
+    task_id = client.post(
+        get_api_url("/tasks"), json={"description": "Single"}, headers=headers
+    ).json()["id"]
+    ids = [result["id"] for result in client.post(
+        get_api_url("/tasks/bulk"),
+        json=[{"description": f"Bulk {i}"} for i in range(3)],
+        headers=headers
+    ).json()]
+    client.post(
+        get_api_url("/tasks/import"),
+        content=json.dumps({"description": "Imported", "completed": True}).encode(),
+        headers=headers
+    )
+    assert stats() == {"total": 5, "completed": 1, "pending": 4}
+
+    client.put(get_api_url(f"/tasks/{task_id}"), json={"completed": True}, headers=headers)
+    client.patch(
+        get_api_url("/tasks/bulk"),
+        json=[{"id": task_id, "completed": False}, {"id": ids[0], "completed": True}],
+        headers=headers
+    )
+    assert stats() == {"total": 5, "completed": 2, "pending": 3}
+
+    client.request("DELETE", get_api_url("/tasks/bulk"), json=ids[:2], headers=headers)
+    client.delete(get_api_url(f"/tasks/{task_id}"), headers=headers)
+    assert stats() == {"total": 2, "completed": 1, "pending": 1}
+
+
+def test_reconcile_task_stats():
+    """Test recomputing drifted task counters"""
+    headers = get_auth_headers("reconcileuser")
+    client.post(get_api_url("/tasks"), json={"description": "Counted"}, headers=headers)
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE user_task_stats SET total = 42"))
+        drift = reconcile_task_stats(connection)
+    assert [(row["stored_total"], row["total"]) for row in drift] == [(42, 1)]
+
+    response = client.get(get_api_url("/tasks/stats"), headers=headers)
+    assert response.json() == {"total": 1, "completed": 0, "pending": 1}
+
+
+def test_task_changes_delta_sync():
+    """Test syncing only what changed after a cursor, including deletions"""
+    headers = get_auth_headers("syncuser")
+    ids = [result["id"] for result in client.post(
+        get_api_url("/tasks/bulk"),
+        json=[{"description": f"Sync {i}"} for i in range(3)],
+        headers=headers
+    ).json()]
+    client.post(
+        get_api_url("/tasks"), json={"description": "Not mine"},
+        headers=get_auth_headers("syncother")
+    )
+
+    # Full sync, two changes per page
+    response = client.get(get_api_url("/tasks/changes?limit=2"), headers=headers).json()
+    assert [change["id"] for change in response["changes"]] == ids[:2]
+    assert response["has_more"] is True
+    response = client.get(
+        get_api_url(f"/tasks/changes?since={response['cursor']}"), headers=headers
+    ).json()
+    assert [change["id"] for change in response["changes"]] == ids[2:]
+    assert response["has_more"] is False
+    cursor = response["cursor"]
+
+    # Nothing changed since
+    response = client.get(get_api_url(f"/tasks/changes?since={cursor}"), headers=headers)
+    assert response.json() == {"changes": [], "cursor": cursor, "has_more": False}
+
+    client.put(get_api_url(f"/tasks/{ids[0]}"), json={"completed": True}, headers=headers)
+    client.patch(
+        get_api_url("/tasks/bulk"), json=[{"id": ids[0], "description": "Renamed"}],
+        headers=headers
+    )
+    client.delete(get_api_url(f"/tasks/{ids[1]}"), headers=headers)
+    response = client.get(
+        get_api_url(f"/tasks/changes?since={cursor}"), headers=headers
+    ).json()
+    assert [(change["id"], change["deleted"]) for change in response["changes"]] == [
+        (ids[0], False), (ids[1], True)
+    ]
+    assert response["changes"][0]["task"]["description"] == "Renamed"
+    assert response["changes"][0]["task"]["completed"] is True
+    assert response["changes"][1]["task"] is None
+
+    # Expired tombstones are compacted and older cursors are refused
+    with engine.begin() as connection:
+        connection.execute(text(
+            "UPDATE task_tombstones SET deleted_at = datetime('now', '-60 days')"
+        ))
+        assert compact_tombstones(connection, retention_days=30) == 1
+    response = client.get(get_api_url(f"/tasks/changes?since={cursor}"), headers=headers)
+    assert response.status_code == 410
+    response = client.get(get_api_url("/tasks/changes"), headers=headers)
+    assert [change["id"] for change in response.json()["changes"]] == [ids[2], ids[0]]
+
+
+class RecordingBroker(EventBroker):
+    """Broker stand-in keeping every published event"""
+
+    def __init__(self):
+        self.events = []
+
+    async def publish(self, user_id, event):
+        self.events.append(event)
+
+    def subscribe(self, user_id):
+        raise NotImplementedError
+
+    def unsubscribe(self, user_id, subscription):
+        raise NotImplementedError
+
+
+def test_task_changes_are_published(monkeypatch):
+    """Test that every task change is published to the event broker"""
+    broker = RecordingBroker()
+    monkeypatch.setattr(app.state, "event_broker", broker)
+    headers = get_auth_headers("eventuser")
+
+    task_id = client.post(
+        get_api_url("/tasks"), json={"description": "Watched"}, headers=headers
+    ).json()["id"]
+    client.put(get_api_url(f"/tasks/{task_id}"), json={"completed": True}, headers=headers)
+    client.delete(get_api_url(f"/tasks/{task_id}"), headers=headers)
+    bulk_id = client.post(
+        get_api_url("/tasks/bulk"), json=[{"description": "Bulk"}], headers=headers
+    ).json()[0]["id"]
+    client.patch(
+        get_api_url("/tasks/bulk"), json=[{"id": bulk_id, "completed": True}], headers=headers
+    )
+    client.request("DELETE", get_api_url("/tasks/bulk"), json=[bulk_id], headers=headers)
+
+    assert [event["type"] for event in broker.events] == [
+        "task.created", "task.updated", "task.deleted",
+        "tasks.bulk_created", "tasks.bulk_updated", "tasks.bulk_deleted",
+    ]
+    assert broker.events[1]["task"]["completed"] is True
+    assert broker.events[2] == {"type": "task.deleted", "id": task_id}
+    assert broker.events[5] == {"type": "tasks.bulk_deleted", "ids": [bulk_id]}
+
+
+def test_bulk_larger_than_event_queue(monkeypatch):
+    """Test that a bulk call larger than a subscriber's queue keeps it subscribed"""
+    broker = InProcessBroker(queue_size=2)
+    monkeypatch.setattr(app.state, "event_broker", broker)
+    headers = get_auth_headers("bulkeventuser")
+    user_id = client.post(
+        get_api_url("/tasks"), json={"description": "First"}, headers=headers
+    ).json()["user_id"]
+    subscription = broker.subscribe(user_id)
+
+    rows = client.post(
+        get_api_url("/tasks/bulk"),
+        json=[{"description": f"Bulk {i}"} for i in range(5)],
+        headers=headers
+    ).json()
+    assert broker.subscriber_count(user_id) == 1
+    event = asyncio.run(subscription.get(0.1))
+    assert event == {"type": "tasks.bulk_created", "ids": [row["id"] for row in rows]}
+
+
+def test_task_events_websocket(monkeypatch):
+    """Test receiving events and heartbeats over the WebSocket"""
+    monkeypatch.setattr(settings, "EVENTS_HEARTBEAT_SECONDS", 0.05)
+    headers = get_auth_headers("wsuser")
+    token = headers["Authorization"].split()[1]
+    user_id = client.post(
+        get_api_url("/tasks"), json={"description": "Mine"}, headers=headers
+    ).json()["user_id"]
+    broker = app.state.event_broker
+
+    with client.websocket_connect(get_api_url(f"/tasks/events?token={token}")) as websocket:
+        assert websocket.receive_json() == {"type": "ping"}
+        websocket.portal.call(broker.publish, user_id, {"type": "task.deleted", "id": 1})
+        message = websocket.receive_json()
+        while message["type"] == "ping":
+            message = websocket.receive_json()
+        assert message == {"type": "task.deleted", "id": 1}
+    assert broker.subscriber_count(user_id) == 0
+
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect(get_api_url("/tasks/events?token=invalid")):
+            pass
+    assert exc_info.value.code == 1008
+
+
+def test_tasks_with_async_engine():
+    """Test task endpoints running on an aiosqlite AsyncSession"""
+    # NullPool: each TestClient request runs on its own event loop
+    async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    headers = get_auth_headers("asyncuser")
+
+    response = client.post(
+        get_api_url("/tasks"), json={"description": "Async task"}, headers=headers
+    )
+    assert response.status_code == 200
+    task_id = response.json()["id"]
+
+    response = client.put(
+        get_api_url(f"/tasks/{task_id}"), json={"completed": True}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["completed"] is True
+
+    response = client.get(get_api_url("/tasks"), headers=headers)
+    assert [task["id"] for task in response.json()] == [task_id]
+
+    response = client.get(get_api_url("/tasks/export"), headers=headers)
+    assert json.loads(response.text)["id"] == task_id
+
+    response = client.delete(get_api_url(f"/tasks/{task_id}"), headers=headers)
+    assert response.json()["message"] == "Task deleted successfully"
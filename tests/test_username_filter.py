@@ -0,0 +1,129 @@
+# tests/test_username_filter.py
+"""
+Tests for the Bloom filter and negative cache in front of username lookups.
+"""
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.crud.user import negative_username_cache, username_filter
+from app.main import app
+from app.models.user import User
+from .test_auth import TestingSessionLocal, engine, setup_db
+
+client = TestClient(app)
+
+
+def test_bloom_filter():
+    """Test that added items are always found and others rarely are"""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"user{i}")
+    assert len(bloom) == 1000
+    assert all(f"user{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+class FakeTimer:
+    """Manually advanced clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def count_user_queries(statements: list):
+    """Record statements reading the users table"""
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+    return before_cursor_execute
+
+
+def login(username: str, password: str = "TestPass123"):
+    return client.post(
+        f"{settings.API_V1_STR}/login",
+        data={"username": username, "password": password, "grant_type": "password"},
+    )
+
+
+def test_unknown_username_skips_database():
+    """Test that lookups of unregistered usernames do not query users once loaded"""
+    client.post(
+        f"{settings.API_V1_STR}/register",
+        json={"username": "knownuser", "password": "TestPass123"},
+    )
+    statements = []
+    listener = count_user_queries(statements)
+    with TestingSessionLocal() as db:
+        username_filter.load(db)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert login("unknownuser").status_code == 401
+        assert statements == []
+
+        # Users registered after loading are added to the filter
+        response = client.post(
+            f"{settings.API_V1_STR}/register",
+            json={"username": "newuser", "password": "TestPass123"},
+        )
+        assert response.status_code == 200
+        assert login("newuser").status_code == 200
+        assert login("knownuser").status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+        username_filter.reset()
+
+
+def test_username_filter_catches_up(monkeypatch):
+    """Test that users inserted elsewhere are found after the sync interval"""
+    with TestingSessionLocal() as db:
+        username_filter.load(db)
+        # A Core insert bypasses the ORM events, like another worker's insert
+        db.execute(insert(User).values(username="elsewhere", hashed_password="x"))
+        db.commit()
+        try:
+            monkeypatch.setattr(settings, "USERNAME_FILTER_SYNC_SECONDS", 3600)
+            assert not username_filter.may_exist(db, "elsewhere")
+            monkeypatch.setattr(settings, "USERNAME_FILTER_SYNC_SECONDS", 0)
+            assert username_filter.may_exist(db, "elsewhere")
+        finally:
+            username_filter.reset()
+
+
+def test_username_filter_local_insert_keeps_watermark(monkeypatch):
+    """Test that a local insert does not hide lower ids inserted by other workers"""
+    timer = FakeTimer()
+    monkeypatch.setattr(username_filter, "_timer", timer)
+    monkeypatch.setattr(settings, "USERNAME_FILTER_SYNC_SECONDS", 5)
+    with TestingSessionLocal() as db:
+        username_filter.load(db)
+        try:
+            # Another worker commits alice, then this one inserts bob with a higher id
+            db.execute(insert(User).values(username="alice", hashed_password="x"))
+            db.commit()
+            db.add(User(username="bob", hashed_password="x"))
+            db.commit()
+            assert username_filter.may_exist(db, "bob")
+
+            timer.now = 10
+            assert username_filter.may_exist(db, "alice")
+        finally:
+            username_filter.reset()
+
+
+def test_negative_cache_invalidated_on_register():
+    """Test that a cached miss is dropped when the username is registered"""
+    assert login("lateuser").status_code == 401
+    assert negative_username_cache.get("lateuser")
+    response = client.post(
+        f"{settings.API_V1_STR}/register",
+        json={"username": "lateuser", "password": "TestPass123"},
+    )
+    assert response.status_code == 200
+    assert negative_username_cache.get("lateuser") is None
+    assert login("lateuser").status_code == 200